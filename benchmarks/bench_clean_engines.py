@@ -0,0 +1,75 @@
+"""
+Compare rows/s of the row and vectorized clean engines.
+
+Runs entirely in memory on synthetic raw flight documents, so no database is
+needed:
+
+    python benchmarks/bench_clean_engines.py --rows 500000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from flight_pipeline.pipeline.clean import BATCH_SIZE, CLEAN_ENGINES
+
+
+AIRLINES = ["WN", "DL", "AA", "OO", "EV", "UA", "MQ", "B6", "US", "AS", "NK", "F9", "HA", "VX"]
+AIRPORTS = ["ATL", "ORD", "DFW", "DEN", "LAX", "SFO", "PHX", "IAH", "LAS", "MSP", "SEA", "BOS"]
+
+
+def make_raw_flights(rows: int, seed: int = 42) -> List[Dict]:
+    """Generate raw documents shaped like the ``raw_flights`` collection."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(rows):
+        cancelled = int(rng.random() < 0.015)
+        dep = float("nan") if cancelled else float(int(rng.gauss(9, 37)))
+        arr = float("nan") if cancelled or rng.random() < 0.003 else float(int(rng.gauss(4, 39)))
+        docs.append(
+            {
+                "YEAR": 2015,
+                "MONTH": rng.randint(1, 12),
+                "DAY": rng.randint(1, 28),
+                "AIRLINE": rng.choice(AIRLINES),
+                "FLIGHT_NUMBER": rng.randint(1, 7000),
+                "ORIGIN_AIRPORT": rng.choice(AIRPORTS),
+                "DESTINATION_AIRPORT": rng.choice(AIRPORTS),
+                "DEPARTURE_DELAY": dep,
+                "ARRIVAL_DELAY": arr,
+                "CANCELLED": cancelled,
+            }
+        )
+    return docs
+
+
+def time_engine(engine: str, docs: List[Dict], batch_size: int) -> tuple[float, List[Dict]]:
+    transform_batch = CLEAN_ENGINES[engine]
+    output: List[Dict] = []
+
+    start = time.perf_counter()
+    for offset in range(0, len(docs), batch_size):
+        output.extend(transform_batch(docs[offset:offset + batch_size]))
+    return time.perf_counter() - start, output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    docs = make_raw_flights(args.rows)
+    results = {}
+    for engine in CLEAN_ENGINES:
+        elapsed, output = time_engine(engine, docs, args.batch_size)
+        results[engine] = output
+        print(f"{engine:>10} | {elapsed:8.2f}s | {args.rows / elapsed:12,.0f} rows/s")
+
+    identical = results["row"] == results["vectorized"]
+    print(f"Outputs identical: {identical}")
+
+
+if __name__ == "__main__":
+    main()
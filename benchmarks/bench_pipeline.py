@@ -0,0 +1,241 @@
+"""
+Time every pipeline stage on synthetic data and save the timings as JSON.
+
+Generates a dataset with generate_flights.py, then times raw ingestion, the
+clean transforms and stage (sync and async I/O), each gold aggregation and
+the dashboard read paths. Uses a scratch database on a local mongod, or an in-process
+mongomock stand-in with --in-process. The stand-in fills mongomock's gaps
+with tests/mongomock_shims.py and skips the unique dedup index, whose
+mongomock check would dominate every write; its timings check the harness
+and are never compared against a mongod run:
+
+    python benchmarks/bench_pipeline.py --rows 1000000
+    python benchmarks/bench_pipeline.py --rows 100000 --in-process
+    python benchmarks/bench_pipeline.py --baseline benchmarks/results/previous.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db import mongo
+from flight_pipeline.db.frames import load_frame
+from flight_pipeline.pipeline import aggregate
+from flight_pipeline.pipeline import clean as clean_stage
+from flight_pipeline.pipeline.clean import (
+    MAX_RECORDS,
+    run_clean_pipeline,
+    transform_raw_flight,
+    transform_vectorized,
+)
+from flight_pipeline.pipeline.ingest import (
+    ingest_large_csv,
+    ingest_large_csv_parallel,
+    ingest_small_csv,
+)
+
+from generate_flights import write_dataset
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+AGGREGATIONS = [
+    aggregate.aggregate_daily_summary,
+    aggregate.aggregate_airline_performance,
+    aggregate.aggregate_airport_stats,
+    aggregate.aggregate_delay_distribution,
+    aggregate.aggregate_delay_severity,
+    aggregate.aggregate_airline_weekday,
+    aggregate.aggregate_daily_sketches,
+    aggregate.aggregate_rolling_delays,
+    aggregate.aggregate_single_scan,
+]
+
+CLEAN_FIELDS = ["flight_date", "airline", "origin_airport", "arrival_delay", "is_delayed"]
+
+class Recorder:
+    def __init__(self) -> None:
+        self.results: List[Dict] = []
+
+    def time(self, name: str, func: Callable[[], object], rows: int | None = None) -> object:
+        """Run ``func`` once, recording its wall time or the error it raised."""
+        entry: Dict = {
+            "name": name,
+            "status": "ok",
+            "seconds": None,
+            "rows": rows,
+            "rows_per_second": None,
+        }
+        value = None
+        start = time.perf_counter()
+        try:
+            value = func()
+        except Exception as exc:
+            entry["status"] = "error"
+            entry["error"] = f"{type(exc).__name__}: {exc}"
+        else:
+            entry["seconds"] = round(time.perf_counter() - start, 4)
+            if rows and entry["seconds"]:
+                entry["rows_per_second"] = round(rows / entry["seconds"])
+
+        self.results.append(entry)
+        status = entry.get("error") or f"{entry['seconds']:.2f}s"
+        print(f"{name:<45} {status}")
+        return value
+
+
+def skip_dedup_index(clean) -> None:
+    """In-process stand-in for create_dedup_index: upserts still dedupe."""
+    print("mongomock: skipping the unique dedup index; clean timings are not comparable")
+
+
+def find_to_dataframe(collection) -> pd.DataFrame:
+    """The dashboard's original read path: every field, one dict per row."""
+    return pd.DataFrame(list(collection.find({}, {"_id": 0})))
+
+
+def compare(report: Dict, baseline_path: Path, tolerance: float) -> int:
+    """
+    Print timing changes against a saved run; returns the regression count.
+
+    Only runs on the same backend are compared, and only stages timed
+    successfully in both.
+    """
+    saved = json.loads(baseline_path.read_text())
+    if saved.get("backend") != report["backend"]:
+        print(
+            f"\nNot compared: {baseline_path} ran on {saved.get('backend')}, "
+            f"this run on {report['backend']}"
+        )
+        return 0
+
+    baseline = {
+        entry["name"]: entry["seconds"]
+        for entry in saved["results"]
+        # Runs saved before statuses existed only have seconds
+        if entry.get("status", "ok") == "ok"
+    }
+
+    regressions = 0
+    print(f"\nAgainst {baseline_path}:")
+    for entry in report["results"]:
+        before = baseline.get(entry["name"])
+        if not before or entry["seconds"] is None:
+            continue
+
+        change = entry["seconds"] / before - 1
+        flag = ""
+        if change > tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{entry['name']:<45} {before:8.2f}s -> {entry['seconds']:8.2f}s ({change:+.0%}){flag}")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", type=Path, help="reuse or keep the generated CSVs here")
+    parser.add_argument("--uri", default=mongo_settings.uri)
+    parser.add_argument("--database", default="flight_delay_bench")
+    parser.add_argument("--in-process", action="store_true", help="use mongomock, no server")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    # Never touch the real pipeline database
+    mongo_settings.database = args.database
+    mongo_settings.uri = args.uri
+    if args.in_process:
+        import mongomock
+
+        sys.path.insert(0, str(Path(__file__).parents[1] / "tests"))
+        import mongomock_shims
+
+        mongomock_shims.install()
+        clean_stage.create_dedup_index = skip_dedup_index
+        client = mongomock.MongoClient()
+        mongo.get_mongo_client = lambda: client
+
+    db = mongo.get_database()
+    recorder = Recorder()
+
+    data_dir = args.data_dir or Path(tempfile.mkdtemp(prefix="flights-"))
+    if not (data_dir / "flights.csv").exists():
+        recorder.time("generate_dataset", lambda: write_dataset(data_dir, args.rows, args.seed), args.rows)
+
+    raw = db[mongo_settings.raw_flights]
+    flights_csv = data_dir / "flights.csv"
+    if not args.in_process:
+        # mongomock has no async client; each run starts from an empty collection
+        from flight_pipeline.pipeline.async_io import ingest_flights_async
+
+        raw.delete_many({})
+        recorder.time("ingest_large_csv_parallel", lambda: ingest_large_csv_parallel(flights_csv, raw), args.rows)
+        raw.delete_many({})
+        recorder.time("ingest_flights_async", lambda: ingest_flights_async(flights_csv), args.rows)
+    raw.delete_many({})
+    recorder.time("ingest_large_csv", lambda: ingest_large_csv(flights_csv, raw), args.rows)
+
+    # Clean enriches flights from these, as in a pipeline run
+    dimensions = {"airlines.csv": mongo_settings.raw_airlines, "airports.csv": mongo_settings.raw_airports}
+    for file_name, name in dimensions.items():
+        db[name].delete_many({})
+        recorder.time(f"ingest_small_csv {name}", lambda: ingest_small_csv(data_dir / file_name, db[name]))
+
+    docs = list(raw.find().limit(MAX_RECORDS))
+    recorder.time("transform_raw_flight", lambda: [transform_raw_flight(doc) for doc in docs], len(docs))
+    recorder.time("transform_vectorized", lambda: transform_vectorized(docs), len(docs))
+    if not args.in_process:
+        recorder.time(
+            f"run_clean_pipeline async x{pipeline_settings.async_in_flight}",
+            lambda: run_clean_pipeline(io="async"),
+            len(docs),
+        )
+    recorder.time("run_clean_pipeline", run_clean_pipeline, len(docs))
+
+    clean = db[mongo_settings.clean_flights]
+    clean_rows = clean.count_documents({})
+    for func in AGGREGATIONS:
+        recorder.time(func.__name__, lambda: func(db), clean_rows)
+
+    recorder.time("load_df clean_flights", lambda: find_to_dataframe(clean), clean_rows)
+    recorder.time("load_frame clean_flights", lambda: load_frame(clean, CLEAN_FIELDS), clean_rows)
+    for name in (mongo_settings.agg_daily_summary, mongo_settings.agg_airline_perf, mongo_settings.agg_airport_stats):
+        recorder.time(f"load_df {name}", lambda: find_to_dataframe(db[name]))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "backend": "mongomock" if args.in_process else "mongod",
+        # Skipped in-process, where its uniqueness check dominates the writes
+        "dedup_index": not args.in_process,
+        "rows": args.rows,
+        "seed": args.seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": recorder.results,
+    }
+
+    output = args.output or RESULTS_DIR / f"pipeline-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nSaved {output}")
+
+    if args.baseline and compare(report, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
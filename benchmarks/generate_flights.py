@@ -0,0 +1,218 @@
+"""
+Generate a synthetic flights.csv / airlines.csv / airports.csv dataset.
+
+Rows follow the Kaggle 2015 flight delays layout with skewed airline and
+airport traffic, seasonal cancellations, long-tailed delays and a share of
+exact duplicate rows:
+
+    python benchmarks/generate_flights.py --rows 1000000 --out data/synthetic
+"""
+
+import argparse
+import calendar
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from flight_pipeline.pipeline.ingest import FLIGHT_DTYPES
+
+
+AIRLINES = {
+    "WN": "Southwest Airlines Co.",
+    "DL": "Delta Air Lines Inc.",
+    "AA": "American Airlines Inc.",
+    "OO": "Skywest Airlines Inc.",
+    "EV": "Atlantic Southeast Airlines",
+    "UA": "United Air Lines Inc.",
+    "MQ": "American Eagle Airlines Inc.",
+    "B6": "JetBlue Airways",
+    "US": "US Airways Inc.",
+    "AS": "Alaska Airlines Inc.",
+    "NK": "Spirit Air Lines",
+    "F9": "Frontier Airlines Inc.",
+    "HA": "Hawaiian Airlines Inc.",
+    "VX": "Virgin America",
+}
+
+HUB_AIRPORTS = ["ATL", "ORD", "DFW", "DEN", "LAX", "SFO", "PHX", "IAH", "LAS", "MSP", "SEA", "BOS"]
+AIRPORT_COUNT = 320
+
+# Summer and December peaks, as in the real 2015 data
+MONTH_WEIGHTS = np.array([7.9, 7.2, 8.6, 8.3, 8.4, 8.6, 8.9, 8.8, 8.1, 8.4, 7.9, 8.1])
+CANCELLATION_RATE = np.array([2.6, 4.8, 2.0, 0.9, 0.8, 1.1, 0.9, 0.8, 0.5, 0.5, 0.6, 1.0]) / 100
+DIVERSION_RATE = 0.0026
+CHUNK_ROWS = 500_000
+
+
+def zipf_weights(count: int, exponent: float) -> np.ndarray:
+    weights = 1 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def add_minutes(hhmm: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    """Shift HHMM clock times by ``minutes``, wrapping at midnight."""
+    total = (hhmm // 100 * 60 + hhmm % 100 + minutes) % 1440
+    return total // 60 * 100 + total % 60
+
+
+def airport_codes(rng: np.random.Generator) -> list:
+    codes = list(HUB_AIRPORTS)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    while len(codes) < AIRPORT_COUNT:
+        code = "".join(rng.choice(letters, 3))
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def make_flights(rows: int, rng: np.random.Generator, airports: list, year: int) -> pd.DataFrame:
+    """One chunk of synthetic flights.csv rows."""
+    airlines = np.array(list(AIRLINES))
+    airline_idx = rng.choice(len(airlines), rows, p=zipf_weights(len(airlines), 0.9))
+    airport_p = zipf_weights(len(airports), 1.1)
+    origin_idx = rng.choice(len(airports), rows, p=airport_p)
+    # Resample destinations equal to the origin once; the rest are rare enough
+    destination_idx = rng.choice(len(airports), rows, p=airport_p)
+    same = destination_idx == origin_idx
+    destination_idx[same] = (destination_idx[same] + 1) % len(airports)
+    codes = np.array(airports)
+
+    month = rng.choice(12, rows, p=MONTH_WEIGHTS / MONTH_WEIGHTS.sum()) + 1
+    days_in_month = np.array([calendar.monthrange(year, m)[1] for m in range(1, 13)])
+    day = (rng.random(rows) * days_in_month[month - 1]).astype(np.int64) + 1
+    day_of_week = pd.to_datetime(
+        pd.DataFrame({"year": year, "month": month, "day": day})
+    ).dt.dayofweek.to_numpy() + 1
+
+    scheduled_departure = rng.integers(5, 24, rows) * 100 + rng.integers(0, 12, rows) * 5
+    route_hash = (origin_idx * 7919 + destination_idx * 104729) % 2900
+    distance = 100 + route_hash
+    scheduled_time = (distance / 8 + 30).astype(np.int64)
+
+    # Most flights leave near schedule; a long lognormal tail, worse for
+    # smaller carriers and busier months
+    airline_penalty = airline_idx * 0.4
+    late = rng.random(rows) < 0.18 + 0.01 * (month == 12) + 0.01 * (month == 7)
+    departure_delay = np.where(
+        late,
+        np.minimum(np.exp(rng.normal(3.1, 1.0, rows)), 1_600),
+        rng.normal(-3, 5, rows),
+    ) + airline_penalty
+    departure_delay = np.round(departure_delay)
+    arrival_delay = np.round(departure_delay + rng.normal(-5, 9, rows))
+
+    cancelled = rng.random(rows) < CANCELLATION_RATE[month - 1]
+    diverted = ~cancelled & (rng.random(rows) < DIVERSION_RATE)
+    departure_delay[cancelled] = np.nan
+    arrival_delay[cancelled | diverted] = np.nan
+    reason = np.where(cancelled, rng.choice(list("ABCD"), rows, p=[0.28, 0.54, 0.18, 0.0]), None)
+
+    departure_time = np.where(cancelled, np.nan, add_minutes(scheduled_departure, departure_delay))
+    taxi_out = np.where(cancelled, np.nan, rng.integers(5, 40, rows))
+    air_time = np.where(cancelled | diverted, np.nan, scheduled_time - 25 + rng.integers(-10, 10, rows))
+    taxi_in = np.where(cancelled | diverted, np.nan, rng.integers(2, 20, rows))
+    elapsed_time = taxi_out + air_time + taxi_in
+    scheduled_arrival = add_minutes(scheduled_departure, scheduled_time)
+    arrival_time = np.where(np.isnan(arrival_delay), np.nan, add_minutes(scheduled_arrival, arrival_delay))
+
+    # Cause breakdown is only reported for arrivals 15+ minutes late
+    reported = arrival_delay >= 15
+    shares = rng.dirichlet(np.ones(5), rows)
+    causes = {}
+    for column, share in zip(
+        ["AIR_SYSTEM_DELAY", "SECURITY_DELAY", "AIRLINE_DELAY", "LATE_AIRCRAFT_DELAY", "WEATHER_DELAY"],
+        shares.T,
+    ):
+        causes[column] = np.where(reported, np.round(share * np.nan_to_num(arrival_delay)), np.nan)
+
+    frame = pd.DataFrame(
+        {
+            "YEAR": year,
+            "MONTH": month,
+            "DAY": day,
+            "DAY_OF_WEEK": day_of_week,
+            "AIRLINE": airlines[airline_idx],
+            "FLIGHT_NUMBER": rng.integers(1, 7000, rows),
+            "TAIL_NUMBER": np.char.add("N", rng.integers(100, 999, rows).astype(str)),
+            "ORIGIN_AIRPORT": codes[origin_idx],
+            "DESTINATION_AIRPORT": codes[destination_idx],
+            "SCHEDULED_DEPARTURE": scheduled_departure,
+            "DEPARTURE_TIME": departure_time,
+            "DEPARTURE_DELAY": departure_delay,
+            "TAXI_OUT": taxi_out,
+            "WHEELS_OFF": np.where(cancelled, np.nan, add_minutes(departure_time, taxi_out)),
+            "SCHEDULED_TIME": scheduled_time,
+            "ELAPSED_TIME": elapsed_time,
+            "AIR_TIME": air_time,
+            "DISTANCE": distance,
+            "WHEELS_ON": np.where(np.isnan(arrival_time), np.nan, add_minutes(arrival_time, -taxi_in)),
+            "TAXI_IN": taxi_in,
+            "SCHEDULED_ARRIVAL": scheduled_arrival,
+            "ARRIVAL_TIME": arrival_time,
+            "ARRIVAL_DELAY": arrival_delay,
+            "DIVERTED": diverted.astype(np.int8),
+            "CANCELLED": cancelled.astype(np.int8),
+            "CANCELLATION_REASON": reason,
+            **causes,
+        }
+    )
+    return frame[list(FLIGHT_DTYPES)]
+
+
+def write_dataset(
+    out: Path,
+    rows: int,
+    seed: int = 42,
+    duplicate_rate: float = 0.005,
+    year: int = 2015,
+) -> dict:
+    """Write the three CSVs to ``out``; returns row counts per file."""
+    rng = np.random.default_rng(seed)
+    out.mkdir(parents=True, exist_ok=True)
+    airports = airport_codes(rng)
+
+    pd.DataFrame({"IATA_CODE": list(AIRLINES), "AIRLINE": list(AIRLINES.values())}).to_csv(
+        out / "airlines.csv", index=False
+    )
+    pd.DataFrame(
+        {
+            "IATA_CODE": airports,
+            "AIRPORT": [f"{code} Airport" for code in airports],
+            "CITY": [f"{code} City" for code in airports],
+            "STATE": rng.choice(["CA", "TX", "NY", "FL", "IL", "GA", "WA", "CO"], len(airports)),
+            "COUNTRY": "USA",
+            "LATITUDE": np.round(rng.uniform(25, 48, len(airports)), 5),
+            "LONGITUDE": np.round(rng.uniform(-123, -70, len(airports)), 5),
+        }
+    ).to_csv(out / "airports.csv", index=False)
+
+    written = 0
+    with open(out / "flights.csv", "w", newline="") as handle:
+        while written < rows:
+            size = min(CHUNK_ROWS, rows - written)
+            unique = size - int(size * duplicate_rate)
+            chunk = make_flights(unique, rng, airports, year)
+            # Exact repeats of earlier rows, as left by double-loaded feeds
+            repeats = chunk.iloc[rng.integers(0, unique, size - unique)]
+            chunk = pd.concat([chunk, repeats], ignore_index=True)
+            chunk.to_csv(handle, index=False, header=written == 0)
+            written += size
+
+    return {"flights": rows, "airlines": len(AIRLINES), "airports": len(airports)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--out", type=Path, default=Path("data/synthetic"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--duplicate-rate", type=float, default=0.005)
+    args = parser.parse_args()
+
+    counts = write_dataset(args.out, args.rows, args.seed, args.duplicate_rate)
+    print(f"Wrote {counts['flights']:,} flights to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,13 @@
 import streamlit as st
 import pandas as pd
-from pymongo import MongoClient
-import numpy as np
 
+from flight_pipeline.config.settings import pipeline_settings
+from flight_pipeline.db.frames import load_frame
+from flight_pipeline.db.mongo import get_analytics_database
+from flight_pipeline.pipeline.sampling import get_sample_design, is_probability_sample
+from flight_pipeline.pipeline.state import get_gold_version
+from flight_pipeline.result_cache import ResultCache
 
-# MongoDB Connection
-@st.cache_resource
-def get_db():
-    client = MongoClient(
-        "mongodb://localhost:27017/?directConnection=true",
-        serverSelectionTimeoutMS=5000
-    )
-    return client["flight_delay_db"]
-
-db = get_db()
 
 st.set_page_config(
     page_title="Flight Delay Big Data Analytics",
@@ -23,229 +17,517 @@ st.set_page_config(
 st.title("✈️ Flight Delay Big Data Analytics Dashboard")
 
 
-def load_df(collection, limit=None):
-    cursor = collection.find({}, {"_id": 0})
-    if limit:
-        cursor = cursor.limit(limit)
-    return pd.DataFrame(list(cursor))
+# MongoDB Connection: the pipeline's pooled client, reading from secondaries
+@st.cache_resource
+def get_db():
+    return get_analytics_database()
 
-#  Daily Flight Volume vs Delays
-st.header(" Daily Flight Volume vs Delays")
+db = get_db()
 
-daily = load_df(db.agg_daily_flight_summary)
-daily["flight_date"] = pd.to_datetime(daily["flight_date"])
 
-col1, col2 = st.columns(2)
+# Query results and derived frames, shared by every session; entries are
+# dropped when an aggregation run publishes a new gold version
+@st.cache_resource
+def get_cache():
+    return ResultCache(pipeline_settings.dashboard_cache_mb * 1024 * 1024)
 
-with col1:
-    st.subheader("Total Flights per Day")
-    st.line_chart(daily.set_index("flight_date")["total_flights"])
+cache = get_cache()
+gold_version = get_gold_version(db)
 
-with col2:
-    st.subheader("Delayed Flights per Day")
-    st.line_chart(daily.set_index("flight_date")["delayed_flights"])
 
-st.markdown(
-    "**Insight:** Rising delay counts alongside stable flight volume indicate operational inefficiencies rather than congestion alone."
-)
+def cached(key, compute):
+    """``compute()`` for the current gold version; do not mutate the result."""
+    return cache.get(gold_version, key, compute)
 
-#  Worst Delay Days (Derived Metric)
-st.header(" Worst Delay Days")
 
-daily["delay_pct"] = (
-    daily["delayed_flights"] / daily["total_flights"] * 100
-)
+def load_gold(collection, fields):
+    """Gold table from the local Arrow snapshot when enabled and current, else MongoDB."""
+    if pipeline_settings.dashboard_snapshot:
+        from flight_pipeline.pipeline.snapshot import has_snapshot, load_snapshot
 
-worst_days = daily.sort_values("delay_pct", ascending=False).head(10)
+        # A snapshot exported before the latest aggregation run is stale
+        if has_snapshot(collection.name, gold_version=gold_version):
+            return load_snapshot(collection.name, fields)
+    return load_frame(collection, fields)
 
-st.bar_chart(
-    worst_days.set_index("flight_date")["delay_pct"]
-)
 
-st.markdown(
-    "**Insight:** Identifies extreme disruption days for weather, staffing, or system failure analysis."
-)
+# A sampled clean layer's counts are scaled back to every flight, using the
+# estimates the aggregation stage built from the recorded sample design
+design = cached("sample_design", lambda: get_sample_design(db))
+sampled = is_probability_sample(design)
 
-import plotly.express as px
+if sampled:
+    st.info(
+        f"The clean layer is a {design['mode']} sample of {design['sampled']:,} of "
+        f"{design['population']:,} raw flights. Flight counts and delay rates are "
+        "estimates for all flights, shown with their 95% intervals."
+    )
 
-# Interactive Box Plot (Plotly)
-st.header("📦 Arrival Delay Distribution by Airline")
 
-clean = load_df(db.clean_flights)
+def load_estimates(scope, key_field):
+    return load_frame(
+        db.agg_sample_estimates,
+        [
+            key_field,
+            "flights",
+            "flights_half_width",
+            "delayed_flights",
+            "delayed_flights_half_width",
+            "pct_delayed",
+            "pct_delayed_half_width",
+        ],
+        filter={"scope": scope},
+    )
 
-# Keep only delayed flights
-clean = clean[clean["arrival_delay"] > 0]
 
-# Cap extreme outliers at 99th percentile
-cap = clean["arrival_delay"].quantile(0.99)
-clean["arrival_delay_capped"] = clean["arrival_delay"].clip(upper=cap)
+def with_interval(frame, column):
+    """A column, or its estimate and 95% bounds when it has a half-width."""
+    half_width = f"{column}_half_width"
+    if half_width not in frame:
+        return frame[column]
+    return pd.DataFrame(
+        {
+            "Estimate": frame[column],
+            "95% low": frame[column] - frame[half_width],
+            "95% high": frame[column] + frame[half_width],
+        }
+    )
 
-# Top airlines by volume
-top_airlines = (
-    clean["airline"]
-    .value_counts()
-    .head(8)
-    .index
-)
 
-plot_df = clean[clean["airline"].isin(top_airlines)]
-
-fig = px.box(
-    plot_df,
-    x="airline",
-    y="arrival_delay_capped",
-    color="airline",
-    points="outliers",   # interactive outliers
-    title="Arrival Delay Distribution by Airline",
-    labels={
-        "airline": "Airline",
-        "arrival_delay_capped": "Arrival Delay (minutes)"
-    }
-)
+# Each section is a fragment that loads its own data (and heavy imports)
+# only when it is shown, and reruns on its own when its widgets change
+
+
+def load_daily():
+    daily = load_gold(
+        db.agg_daily_flight_summary,
+        ["flight_date", "total_flights", "delayed_flights"],
+    )
+    daily["flight_date"] = pd.to_datetime(daily["flight_date"])
+    daily["delay_pct"] = daily["delayed_flights"] / daily["total_flights"] * 100
+    return daily
+
+
+def load_daily_estimates():
+    daily = load_estimates("daily", "flight_date").rename(
+        columns={
+            "flights": "total_flights",
+            "flights_half_width": "total_flights_half_width",
+            "pct_delayed": "delay_pct",
+            "pct_delayed_half_width": "delay_pct_half_width",
+        }
+    )
+    daily["flight_date"] = pd.to_datetime(daily["flight_date"])
+    return daily.sort_values("flight_date")
 
-fig.update_layout(
-    showlegend=False,
-    height=500,
-    margin=dict(l=40, r=40, t=60, b=40),
-)
 
-st.plotly_chart(fig, width="stretch")
+@st.fragment
+def daily_section():
+    #  Daily Flight Volume vs Delays
+    st.header(" Daily Flight Volume vs Delays")
 
-st.markdown(
-    """
+    if sampled:
+        daily = cached("daily_estimates", load_daily_estimates)
+    else:
+        daily = cached("daily", load_daily)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Total Flights per Day")
+        st.line_chart(with_interval(daily.set_index("flight_date"), "total_flights"))
+
+    with col2:
+        st.subheader("Delayed Flights per Day")
+        st.line_chart(with_interval(daily.set_index("flight_date"), "delayed_flights"))
+
+    st.markdown(
+        "**Insight:** Rising delay counts alongside stable flight volume indicate operational inefficiencies rather than congestion alone."
+    )
+
+    #  Worst Delay Days (Derived Metric)
+    st.header(" Worst Delay Days")
+
+    worst_days = cached(
+        ("worst_days", sampled),
+        lambda: daily.sort_values("delay_pct", ascending=False).head(10),
+    )
+
+    st.bar_chart(
+        worst_days.set_index("flight_date")["delay_pct"]
+    )
+
+    st.markdown(
+        "**Insight:** Identifies extreme disruption days for weather, staffing, or system failure analysis."
+    )
+
+
+def load_severity_counts():
+    severity = load_gold(
+        db.agg_delay_severity,
+        ["bucket", "position", "flights"],
+    ).sort_values("position")
+
+    return severity.set_index(
+        pd.CategoricalIndex(
+            severity["bucket"], categories=severity["bucket"], ordered=True
+        )
+    )["flights"]
+
+
+@st.fragment
+def distribution_section():
+    # Plotly is only needed here
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    # Interactive Box Plot (Plotly)
+    st.header("📦 Arrival Delay Distribution by Airline")
+
+    # Quartiles, whiskers and outliers are precomputed over every delayed flight
+    # (capped at the 99th percentile) by the aggregation stage
+    # Top airlines by volume
+    top_airlines = cached(
+        "top_airlines",
+        lambda: load_gold(
+            db.agg_delay_distribution,
+            ["airline", "volume_rank", "q1", "median", "q3", "lower_fence", "upper_fence", "outliers"],
+        ).sort_values("volume_rank").head(8),
+    )
+
+    fig = go.Figure()
+    for color, row in zip(qualitative.Plotly, top_airlines.itertuples()):
+        fig.add_trace(
+            go.Box(
+                x=[row.airline],
+                q1=[row.q1],
+                median=[row.median],
+                q3=[row.q3],
+                lowerfence=[row.lower_fence],
+                upperfence=[row.upper_fence],
+                name=row.airline,
+                marker_color=color,
+            )
+        )
+        outliers = pd.DataFrame(list(row.outliers), columns=["arrival_delay", "flights"])
+        fig.add_trace(
+            go.Scatter(
+                x=[row.airline] * len(outliers),
+                y=outliers["arrival_delay"],
+                customdata=outliers["flights"],
+                mode="markers",
+                marker=dict(color=color, size=5),
+                name=row.airline,
+                hovertemplate="%{y} min · %{customdata:,} flights<extra></extra>",
+            )
+        )
+
+    fig.update_layout(
+        title="Arrival Delay Distribution by Airline",
+        xaxis_title="Airline",
+        yaxis_title="Arrival Delay (minutes)",
+        showlegend=False,
+        height=500,
+        margin=dict(l=40, r=40, t=60, b=40),
+    )
+
+    st.plotly_chart(fig, width="stretch")
+
+    st.markdown(
+        """
 **Why this matters:**  
 This visualization highlights delay variability and extreme events across airlines.
 Wide boxes and long whiskers indicate inconsistent operations, while compact boxes
 suggest more reliable performance.
 """
-)
+    )
 
+    #  Arrival Delay Severity Distribution
+    st.header(" Arrival Delay Severity Distribution")
 
-#  Arrival Delay Severity Distribution
-st.header(" Arrival Delay Severity Distribution")
+    # Precomputed over every clean flight by the aggregation stage
+    severity_counts = cached("severity_counts", load_severity_counts)
 
-# Sample for performance (still millions underneath)
-clean_sample = load_df(db.clean_flights, limit=200_000)
+    st.bar_chart(severity_counts)
 
-bins = [-120, -15, 0, 15, 30, 60, 120, 300]
-labels = [
-    "Very Early",
-    "Early",
-    "On-Time",
-    "Minor Delay",
-    "Moderate Delay",
-    "Severe Delay",
-    "Extreme Delay",
-]
+    st.markdown(
+        "**Insight:** Most delays are small, but long-tail severe delays drive passenger dissatisfaction."
+    )
 
-clean_sample["delay_bucket"] = pd.cut(
-    clean_sample["arrival_delay"],
-    bins=bins,
-    labels=labels,
-)
 
-severity_counts = clean_sample["delay_bucket"].value_counts().sort_index()
+def load_weekday_pivot():
+    heatmap_df = load_gold(
+        db.agg_airline_weekday_delays,
+        ["airline", "day_of_week", "day_name", "pct_delayed"],
+    )
 
-st.bar_chart(severity_counts)
+    # Pivot on the ISO weekday number so columns run Monday to Sunday
+    day_names = heatmap_df.drop_duplicates("day_of_week").set_index("day_of_week")["day_name"]
 
-st.markdown(
-    "**Insight:** Most delays are small, but long-tail severe delays drive passenger dissatisfaction."
-)
+    return (
+        heatmap_df.pivot(index="airline", columns="day_of_week", values="pct_delayed")
+        .fillna(0)
+        .rename(columns=day_names)
+    )
 
-#  Heatmap: Airline × Day of Week Delay %
-st.header(" Airline vs Day-of-Week Delay Heatmap")
 
-clean_sample["dow"] = clean_sample["flight_date"].dt.day_name()
+@st.fragment
+def weekday_section():
+    #  Heatmap: Airline × Day of Week Delay %
+    st.header(" Airline vs Day-of-Week Delay Heatmap")
 
-heatmap_df = (
-    clean_sample.groupby(["airline", "dow"])
-    .agg(
-        total_flights=("is_delayed", "count"),
-        delayed=("is_delayed", "sum"),
+    pivot = cached("weekday_pivot", load_weekday_pivot)
+
+    st.dataframe(
+        pivot.style.background_gradient(cmap="Reds"),
+        use_container_width=True,
     )
-    .reset_index()
-)
 
-heatmap_df["delay_pct"] = (
-    heatmap_df["delayed"] / heatmap_df["total_flights"] * 100
-)
+    st.markdown(
+        "**Insight:** Reveals systematic operational weaknesses by airline and weekday."
+    )
 
-pivot = heatmap_df.pivot(
-    index="airline", columns="dow", values="delay_pct"
-).fillna(0)
 
-st.dataframe(
-    pivot.style.background_gradient(cmap="Reds"),
-    use_container_width=True,
-)
+def with_estimates(gold, scope, key_field, count_field):
+    """Swap a gold table's flight count and delay rate for population estimates."""
+    estimates = load_estimates(scope, key_field)[
+        [key_field, "flights", "pct_delayed", "pct_delayed_half_width"]
+    ]
+    estimates[key_field] = estimates[key_field].astype(object)
+    gold = gold.drop(columns=[count_field, "pct_delayed"])
+    gold[key_field] = gold[key_field].astype(object)
+    return gold.merge(estimates.rename(columns={"flights": count_field}), on=key_field)
 
-st.markdown(
-    "**Insight:** Reveals systematic operational weaknesses by airline and weekday."
-)
 
-#  Airline Reliability Comparison
-st.header(" Airline Reliability Comparison")
+def load_airline_performance():
+    airline = load_gold(
+        db.agg_airline_performance,
+        ["airline", "total_flights", "pct_delayed", "pct_cancelled", "avg_arrival_delay"],
+    )
+    if sampled:
+        airline = with_estimates(airline, "airline", "airline", "total_flights")
+
+    return airline.rename(
+        columns={
+            "pct_delayed": "Delay Percentage (%)",
+            "pct_delayed_half_width": "± 95% (pp)",
+            "pct_cancelled": "Cancellation Percentage (%)",
+            "avg_arrival_delay": "Avg Arrival Delay (min)",
+            "total_flights": "Total Flights",
+            "airline": "Airline",
+        }
+    )
 
-airline = load_df(db.agg_airline_performance)
 
-airline_renamed = airline.rename(
-    columns={
-        "pct_delayed": "Delay Percentage (%)",
-        "pct_cancelled": "Cancellation Percentage (%)",
-        "avg_arrival_delay": "Avg Arrival Delay (min)",
-        "total_flights": "Total Flights",
-        "airline": "Airline",
-    }
-)
+@st.fragment
+def airline_section():
+    #  Airline Reliability Comparison
+    st.header(" Airline Reliability Comparison")
 
-st.bar_chart(
-    airline_renamed.set_index("Airline")["Delay Percentage (%)"]
-)
+    airline_renamed = cached(("airline_performance", sampled), load_airline_performance)
 
-st.markdown(
-    "**Insight:** Compares airline operational performance across millions of flights."
-)
+    st.bar_chart(
+        airline_renamed.set_index("Airline")["Delay Percentage (%)"]
+    )
 
+    if sampled:
+        st.caption("Estimated from the sample; cancellation rates and delays are sample values")
+        st.dataframe(
+            airline_renamed[["Airline", "Total Flights", "Delay Percentage (%)", "± 95% (pp)"]],
+            use_container_width=True,
+        )
 
-# Delay vs Cancellation Tradeoff (Scatter)
-st.header(" Delay vs Cancellation Tradeoff")
+    st.markdown(
+        "**Insight:** Compares airline operational performance across millions of flights."
+    )
 
-st.scatter_chart(
-    airline_renamed,
-    x="Delay Percentage (%)",
-    y="Cancellation Percentage (%)",
-    size="Total Flights",
-)
+    # Delay vs Cancellation Tradeoff (Scatter)
+    st.header(" Delay vs Cancellation Tradeoff")
 
-st.markdown(
-    "**Insight:** Airlines strategically choose between delaying flights or canceling them."
-)
+    st.scatter_chart(
+        airline_renamed,
+        x="Delay Percentage (%)",
+        y="Cancellation Percentage (%)",
+        size="Total Flights",
+    )
 
-# High-Risk Airports
-st.header(" High-Risk Airports by Delay Probability")
+    st.markdown(
+        "**Insight:** Airlines strategically choose between delaying flights or canceling them."
+    )
 
-airport = load_df(db.agg_airport_delay_stats)
 
-airport_renamed = airport.rename(
-    columns={
-        "origin_airport": "Airport",
-        "pct_delayed": "Delay Percentage (%)",
-        "avg_departure_delay": "Avg Departure Delay (min)",
-        "total_departures": "Total Departures",
-    }
-)
+def load_airport_top():
+    airports = load_gold(
+        db.agg_airport_delay_stats,
+        ["origin_airport", "total_departures", "pct_delayed", "avg_departure_delay"],
+    )
+    if sampled:
+        airports = with_estimates(airports, "airport", "origin_airport", "total_departures")
 
-airport_top = airport_renamed.sort_values(
-    "Delay Percentage (%)", ascending=False
-).head(15)
+    return airports.rename(
+        columns={
+            "origin_airport": "Airport",
+            "pct_delayed": "Delay Percentage (%)",
+            "pct_delayed_half_width": "± 95% (pp)",
+            "avg_departure_delay": "Avg Departure Delay (min)",
+            "total_departures": "Total Departures",
+        }
+    ).sort_values("Delay Percentage (%)", ascending=False).head(15)
 
-st.bar_chart(
-    airport_top.set_index("Airport")["Delay Percentage (%)"]
-)
 
-st.markdown(
-    "**Insight:** Identifies infrastructure bottlenecks with outsized national impact."
-)
+@st.fragment
+def airport_section():
+    # High-Risk Airports
+    st.header(" High-Risk Airports by Delay Probability")
+
+    airport_top = cached(("airport_top", sampled), load_airport_top)
+
+    st.bar_chart(
+        airport_top.set_index("Airport")["Delay Percentage (%)"]
+    )
+
+    st.markdown(
+        "**Insight:** Identifies infrastructure bottlenecks with outsized national impact."
+    )
+
+
+ROLLING_SERIES = {
+    "Airline": (db.agg_airline_rolling_delays, "airline", "arrival_delay"),
+    "Airport": (db.agg_airport_rolling_delays, "origin_airport", "departure_delay"),
+}
+
+
+def load_rolling(dimension):
+    collection, key_field, delay_field = ROLLING_SERIES[dimension]
+    windows = [
+        f"{metric}_{days}d"
+        for days in (7, 30)
+        for metric in ("flights", "pct_delayed", f"avg_{delay_field}")
+    ]
+    rolling = load_gold(collection, [key_field, "flight_date", *windows])
+    rolling["flight_date"] = pd.to_datetime(rolling["flight_date"])
+    return rolling
+
+
+@st.fragment
+def rolling_section():
+    #  7- and 30-Day Rolling Delay Trends
+    st.header(" Rolling Delay Trends")
+
+    col1, col2 = st.columns(2)
+    dimension = col1.radio("Breakdown", list(ROLLING_SERIES), horizontal=True)
+    window = col2.radio("Window", ["7 days", "30 days"], horizontal=True)
+    _, key_field, delay_field = ROLLING_SERIES[dimension]
+    days = window.split()[0]
+
+    rolling = cached(("rolling", dimension), lambda: load_rolling(dimension))
+    if rolling.empty:
+        st.info("No rolling windows aggregated yet")
+        return
+
+    # Busiest keys by flights over the whole series are preselected
+    busiest = cached(
+        ("rolling_busiest", dimension),
+        lambda: rolling.groupby(key_field)["flights_7d"].sum().nlargest(5).index.tolist(),
+    )
+    keys = st.multiselect(dimension, sorted(rolling[key_field].unique()), default=busiest)
+    if not keys:
+        return
+
+    selected = rolling[rolling[key_field].isin(keys)]
+    st.subheader(f"Delay Percentage (%), trailing {window}")
+    st.line_chart(
+        selected.pivot(index="flight_date", columns=key_field, values=f"pct_delayed_{days}d")
+    )
+    st.subheader(f"Avg {delay_field.replace('_', ' ').title()} (min), trailing {window}")
+    st.line_chart(
+        selected.pivot(index="flight_date", columns=key_field, values=f"avg_{delay_field}_{days}d")
+    )
 
+    st.markdown(
+        "**Insight:** Smoothed trends separate sustained deterioration from one-off disruption days."
+    )
+
+
+@st.fragment
+def profile_section():
+    # Sketch decoding is only needed here
+    from flight_pipeline.pipeline.sketches import summarize_sketches
 
+    #  Date-Range Delay Profile (merged sketches)
+    st.header(" Delay Profile for a Date Range")
 
+    daily = cached("daily", load_daily)
+    if daily.empty:
+        st.info("No flights aggregated yet")
+        return
+
+    # A complete range reruns only this section
+    dates = st.date_input(
+        "Flight dates",
+        value=(daily["flight_date"].min().date(), daily["flight_date"].max().date()),
+    )
+    if len(dates) != 2:
+        return
+    start, end = dates
+
+    # Merges the per-day sketches in range instead of scanning clean flights
+    profile = cached(
+        ("delay_profile", start, end),
+        lambda: summarize_sketches(
+            db.agg_daily_sketches,
+            pd.Timestamp(start).to_pydatetime(),
+            (pd.Timestamp(end) + pd.Timedelta(days=1)).to_pydatetime(),
+        ),
+    )
+
+    if profile["flights"]:
+        cols = st.columns(len(profile["arrival_delay_quantiles"]) + 2)
+        for col, (label, minutes) in zip(cols, profile["arrival_delay_quantiles"].items()):
+            col.metric(f"{label} arrival delay", f"{minutes:.0f} min")
+        cols[-2].metric("Distinct flights (approx.)", f"{profile['distinct_flights']:,}")
+        cols[-1].metric("Distinct routes (approx.)", f"{profile['distinct_routes']:,}")
+
+        st.subheader("Routes with the Most Delayed Flights")
+        st.dataframe(
+            pd.DataFrame(profile["top_delayed_routes"]).rename(
+                columns={"item": "Route", "count": "Delayed Flights", "max_error": "Max Overcount"}
+            ),
+            use_container_width=True,
+        )
+    else:
+        st.info("No flights in the selected range")
+
+    st.markdown(
+        "**Insight:** Tail percentiles and chronic delay routes for any period, from compact daily summaries."
+    )
+
+
+SECTIONS = {
+    "Daily Volume": daily_section,
+    "Delay Distribution": distribution_section,
+    "Airline × Weekday": weekday_section,
+    "Airlines": airline_section,
+    "Airports": airport_section,
+    "Rolling Trends": rolling_section,
+    "Date Range Profile": profile_section,
+}
+
+# Only the selected section queries and renders; switching is a full rerun
+section = st.radio("Section", list(SECTIONS), horizontal=True, label_visibility="collapsed")
+SECTIONS[section]()
+
+
+# Debug panel: cache counters for this server process
+with st.sidebar.expander("Result cache"):
+    stats = cache.stats()
+    st.caption(f"Gold version {stats['version']}")
+    col1, col2 = st.columns(2)
+    col1.metric("Hits", f"{stats['hits']:,}")
+    col2.metric("Misses", f"{stats['misses']:,}")
+    col1.metric("Entries", f"{stats['entries']:,}")
+    col2.metric("Evictions", f"{stats['evictions']:,}")
+    st.progress(
+        min(stats["bytes"] / stats["max_bytes"], 1.0),
+        text=f"{stats['bytes'] / 2**20:,.1f} of {stats['max_bytes'] / 2**20:,.0f} MB",
+    )
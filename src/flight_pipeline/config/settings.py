@@ -1,3 +1,5 @@
+from typing import Dict, List, Literal
+
 from pydantic import BaseModel
 
 
@@ -7,6 +9,21 @@ class MongoSettings(BaseModel):
 
     database: str = "flight_delay_db"
 
+    # Shared client pool. Lower the timeouts to fail fast when the replica
+    # set is unreachable
+    max_pool_size: int = 50
+    min_pool_size: int = 0
+    server_selection_timeout_ms: int = 5000
+    connect_timeout_ms: int = 10000
+    socket_timeout_ms: int | None = None
+    wait_queue_timeout_ms: int | None = None
+
+    # Read preference for aggregation scans and the dashboard; writes and
+    # read-your-writes lookups always use the primary
+    analytics_read_preference: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "secondaryPreferred"
+
     # Raw collections
     raw_flights: str = "raw_flights"
     raw_airlines: str = "raw_airlines"
@@ -19,6 +36,109 @@ class MongoSettings(BaseModel):
     agg_daily_summary: str = "agg_daily_flight_summary"
     agg_airline_perf: str = "agg_airline_performance"
     agg_airport_stats: str = "agg_airport_delay_stats"
+    agg_delay_distribution: str = "agg_delay_distribution"
+    agg_delay_severity: str = "agg_delay_severity"
+    agg_airline_weekday: str = "agg_airline_weekday_delays"
+    # Mergeable per (day, airline) quantile, distinct-count and top-K sketches
+    agg_daily_sketches: str = "agg_daily_sketches"
+    # 7- and 30-day trailing delay metrics, one row per key and day
+    agg_airline_rolling: str = "agg_airline_rolling_delays"
+    agg_airport_rolling: str = "agg_airport_rolling_delays"
+    # Population estimates with 95% intervals when clean_flights is a sample
+    agg_sample_estimates: str = "agg_sample_estimates"
+
+    # Mergeable partial state behind the gold collections (incremental mode)
+    agg_daily_partials: str = "agg_daily_partials"
+    agg_airline_partials: str = "agg_airline_partials"
+    agg_airport_partials: str = "agg_airport_partials"
+    agg_delay_histogram_partials: str = "agg_delay_histogram_partials"
+    agg_severity_partials: str = "agg_severity_partials"
+    agg_airline_weekday_partials: str = "agg_airline_weekday_partials"
+    agg_airline_daily_partials: str = "agg_airline_daily_partials"
+    agg_airport_daily_partials: str = "agg_airport_daily_partials"
+    agg_daily_sketch_partials: str = "agg_daily_sketch_partials"
+
+    # Pipeline bookkeeping (watermarks, checkpoints)
+    pipeline_state: str = "pipeline_state"
+    pipeline_checkpoints: str = "pipeline_checkpoints"
+    # One structured record per instrumented run
+    pipeline_runs: str = "pipeline_runs"
+
+
+class PipelineSettings(BaseModel):
+    # Raw ingestion: "serial" parses and inserts one chunk at a time,
+    # "parallel" overlaps typed parsing with a pool of writer threads,
+    # "async" with asyncio writes on the async driver
+    ingest_engine: Literal["serial", "parallel", "async"] = "serial"
+    ingest_parser: Literal["auto", "pyarrow", "pandas"] = "auto"
+    ingest_writers: int = 4
+    ingest_queue_size: int = 8
+    # Columns to keep from flights.csv; None keeps every column
+    ingest_usecols: List[str] | None = None
+    # Fused ingest+clean: keep raw rows via background writers, or drop them
+    fused_archive: Literal["async", "none"] = "async"
+
+    # Clean stage: "row" validates one pydantic model per document,
+    # "vectorized" transforms whole batches column by column
+    clean_engine: Literal["row", "vectorized"] = "row"
+    # Clean stage I/O: "sync" reads, transforms and writes one batch at a
+    # time, "async" overlaps them on the async driver
+    clean_io: Literal["sync", "async"] = "sync"
+    # Clean sample: "head" takes the first MAX_RECORDS raw flights, "hash" a
+    # deterministic sample_rate share keyed on the flight, "stratified" the
+    # same with sample_strata_rates overrides ("2015-01/AA", "AA" or
+    # "2015-01"), "random" a server-side $sample of sample_preview_rows
+    clean_sample: Literal["head", "hash", "stratified", "random"] = "head"
+    sample_rate: float = 0.25
+    sample_strata_rates: Dict[str, float] = {}
+    sample_preview_rows: int = 100_000
+
+    # Async engines: batch writes in flight before reads and parsing wait
+    async_in_flight: int = 4
+
+    # Ingest and clean write batches: "adaptive" resizes them toward a
+    # target write latency under a payload budget, "fixed" keeps the
+    # FLIGHT_CHUNK_SIZE / BATCH_SIZE constants
+    batch_sizing: Literal["fixed", "adaptive"] = "adaptive"
+    batch_min_rows: int = 1_000
+    batch_max_rows: int = 200_000
+    batch_target_seconds: float = 0.5
+    batch_max_mb: float = 32.0
+    # Pause writes while a secondary trails the primary by more than this
+    # (None never throttles); lag is polled at most once per check interval
+    max_replication_lag_seconds: float | None = 10.0
+    replication_lag_check_seconds: float = 5.0
+
+    # Clean storage layout: "flat" keeps clean_flights only, "monthly" also
+    # copies it into one indexed collection per month for pruned queries
+    clean_layout: Literal["flat", "monthly"] = "flat"
+
+    # Partitioned clean: raw _id ranges cleaned by separate worker processes
+    clean_workers: int = 4
+    clean_partitions: int = 16
+    clean_partition_retries: int = 2
+
+    # Aggregate stage: one $group pass per gold collection, or a single
+    # $facet pass that builds all of them
+    aggregate_engine: Literal["per_collection", "single_scan"] = "per_collection"
+
+    # Local Parquet/Arrow snapshot directory; None uses data/snapshots
+    snapshot_dir: str | None = None
+    # Let the dashboard read gold tables from the snapshot when it was
+    # exported at the current gold version
+    dashboard_snapshot: bool = False
+    # Let client-side aggregation builders (the daily sketches) read clean
+    # flights from the snapshot when it was exported at the current clean
+    # watermark
+    aggregate_snapshot: bool = False
+    # Dashboard result cache, shared by sessions and keyed by gold version
+    dashboard_cache_mb: int = 256
+
+    # Run metrics: per-command latency histograms and where run JSON goes
+    # (None uses data/runs)
+    command_monitoring: bool = True
+    metrics_dir: str | None = None
 
 
 mongo_settings = MongoSettings()
+pipeline_settings = PipelineSettings()
@@ -0,0 +1,146 @@
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import bson
+import numpy as np
+import pandas as pd
+from bson.codec_options import CodecOptions
+from pandas.api.types import union_categoricals
+from pymongo.collection import Collection
+
+
+LOAD_BATCH_SIZE = 50_000
+
+# Low-cardinality string fields loaded as pandas categoricals
+CATEGORY_FIELDS = ("airline", "origin_airport", "destination_airport")
+
+NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "decimal"}
+INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+CODEC_OPTIONS = CodecOptions(tz_aware=False)
+
+
+def load_frame(
+    collection: Collection,
+    fields: Sequence[str],
+    filter: Mapping | None = None,
+    sort: List[Tuple[str, int]] | None = None,
+    limit: int = 0,
+    batch_size: int = LOAD_BATCH_SIZE,
+    categories: Iterable[str] = CATEGORY_FIELDS,
+) -> pd.DataFrame:
+    """
+    Load ``fields`` of the documents matching ``filter`` into a DataFrame.
+
+    The filter and projection run inside MongoDB and results arrive as raw
+    BSON batches. Each batch is decoded and turned into typed column arrays
+    straight away, so at most one batch of documents is alive at a time.
+    Columns come back compact: ``categories`` fields as categoricals, whole
+    numbers as the smallest integer dtype that holds them (nullable when
+    some are missing).
+    """
+    projection: Dict[str, int] = dict.fromkeys(fields, 1)
+    if "_id" not in projection:
+        projection["_id"] = 0
+
+    cursor = collection.find_raw_batches(
+        filter or {},
+        projection,
+        sort=sort,
+        limit=limit,
+        batch_size=batch_size,
+    )
+
+    categories = set(categories)
+    parts: Dict[str, List] = {field: [] for field in fields}
+
+    for batch in cursor:
+        docs = bson.decode_all(batch, CODEC_OPTIONS)
+        for field in fields:
+            values = [doc.get(field) for doc in docs]
+            parts[field].append(_batch_column(values, field in categories))
+
+    return pd.DataFrame(
+        {field: _concat_column(parts[field]) for field in fields},
+        columns=list(fields),
+    )
+
+
+def _batch_column(values: List, categorical: bool):
+    """Typed array for one batch of a field's values."""
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+
+    if kind == "empty":
+        return np.full(len(values), np.nan)
+    if kind == "string" and categorical:
+        return pd.Categorical(values)
+    if kind in NUMERIC_KINDS:
+        return np.array(values, dtype=np.float64)
+    if kind == "boolean":
+        if any(value is None for value in values):
+            return pd.array(values, dtype="boolean")
+        return np.array(values, dtype=bool)
+    if kind in ("datetime", "datetime64", "date"):
+        return np.array(values, dtype="datetime64[ms]")
+
+    return _object_column(values)
+
+
+def _object_column(values: List) -> np.ndarray:
+    """
+    One-dimensional object array of ``values``.
+
+    Filled one by one: np.array would turn a batch of equal-length lists
+    (e.g. the delay distribution's ``outliers``) into a 2-D array.
+    """
+    column = np.empty(len(values), dtype=object)
+    for index, value in enumerate(values):
+        column[index] = value
+    return column
+
+
+def _concat_column(parts: List):
+    """Join a field's batch arrays and shrink the result to a compact dtype."""
+    if not parts:
+        return np.array([], dtype=object)
+
+    categoricals = [part for part in parts if isinstance(part, pd.Categorical)]
+    # Batches with only missing values join as all-NaN categoricals; any
+    # other non-categorical batch (numbers, mixed values) keeps its values
+    # through the object path below
+    if categoricals and all(
+        isinstance(part, pd.Categorical) or _all_missing(part) for part in parts
+    ):
+        no_categories = categoricals[0].categories[:0]
+        parts = [
+            part if isinstance(part, pd.Categorical)
+            else pd.Categorical.from_codes(np.full(len(part), -1), categories=no_categories)
+            for part in parts
+        ]
+        return union_categoricals(parts, sort_categories=True)
+
+    if all(isinstance(part, np.ndarray) and part.dtype == np.float64 for part in parts):
+        return _compact_numbers(np.concatenate(parts))
+
+    return pd.concat([pd.Series(part) for part in parts], ignore_index=True).array
+
+
+def _all_missing(part) -> bool:
+    return isinstance(part, np.ndarray) and part.dtype == np.float64 and bool(np.isnan(part).all())
+
+
+def _compact_numbers(values: np.ndarray):
+    """Smallest integer dtype for whole numbers; float64 otherwise."""
+    present = values[~np.isnan(values)]
+    if len(present) == 0 or not np.all(present == np.round(present)):
+        return values
+
+    low, high = present.min(), present.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            break
+
+    if len(present) == len(values):
+        return values.astype(dtype)
+
+    return pd.array(values, dtype=pd.api.types.pandas_dtype(dtype.__name__.capitalize()))
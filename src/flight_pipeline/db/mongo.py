@@ -1,19 +1,89 @@
-from pymongo import MongoClient
+from functools import lru_cache
+from typing import Any
+
+from pymongo import MongoClient, ReadPreference
+from pymongo.collection import Collection
 from pymongo.database import Database
 
 from flight_pipeline.config.settings import mongo_settings
 
 
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+def _client_options() -> dict:
+    return {
+        "maxPoolSize": mongo_settings.max_pool_size,
+        "minPoolSize": mongo_settings.min_pool_size,
+        "serverSelectionTimeoutMS": mongo_settings.server_selection_timeout_ms,
+        "connectTimeoutMS": mongo_settings.connect_timeout_ms,
+        "socketTimeoutMS": mongo_settings.socket_timeout_ms,
+        "waitQueueTimeoutMS": mongo_settings.wait_queue_timeout_ms,
+    }
+
+
+@lru_cache(maxsize=None)
 def get_mongo_client() -> MongoClient:
     """
-    Create and return a MongoDB client connected to the replica set.
+    Return the process-wide MongoDB client connected to the replica set.
+
+    MongoClient is thread-safe and pools its own connections, so every
+    caller in a process shares this one instance.
+    """
+    return MongoClient(mongo_settings.uri, **_client_options())
+
+
+def get_async_mongo_client() -> Any:
+    """
+    Return a new asyncio client with the same pool settings.
+
+    An async client belongs to the event loop it is first used on, so it is
+    not shared: create one per ``asyncio.run`` and close it when done. Needs
+    pymongo's native async API (pymongo>=4.13, the ``async`` extra).
     """
-    return MongoClient(mongo_settings.uri)
+    try:
+        from pymongo import AsyncMongoClient
+    except ImportError as exc:
+        raise RuntimeError(
+            "The async engines need pymongo>=4.13: pip install 'flight-delay-pipeline[async]'"
+        ) from exc
+
+    return AsyncMongoClient(mongo_settings.uri, **_client_options())
 
 
 def get_database() -> Database:
     """
     Return the main application database.
+
+    Reads go to the primary, so pipeline stages always see their own writes.
     """
     client = get_mongo_client()
     return client[mongo_settings.database]
+
+
+def get_analytics_database() -> Database:
+    """
+    Return the application database for read-only analytic workloads.
+
+    Uses ``mongo_settings.analytics_read_preference`` (secondaryPreferred by
+    default), which spreads scans over the secondaries; they may trail the
+    primary by replication lag.
+    """
+    client = get_mongo_client()
+    return client.get_database(
+        mongo_settings.database,
+        read_preference=READ_PREFERENCES[mongo_settings.analytics_read_preference],
+    )
+
+
+def for_analytics(collection: Collection) -> Collection:
+    """Return ``collection`` reading with the analytics read preference."""
+    return collection.with_options(
+        read_preference=READ_PREFERENCES[mongo_settings.analytics_read_preference]
+    )
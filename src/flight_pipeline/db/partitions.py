@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Mapping, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings
+from flight_pipeline.pipeline.state import CLEAN_STAGE, LAYOUT_STAGE, get_state, get_watermark
+
+
+# Serve per-airline and per-airport queries over a date range
+QUERY_INDEXES = (
+    [("airline", ASCENDING), ("flight_date", ASCENDING)],
+    [("origin_airport", ASCENDING), ("flight_date", ASCENDING)],
+)
+
+
+def month_collection_name(year: int, month: int) -> str:
+    return f"{mongo_settings.clean_flights}_{year:04d}_{month:02d}"
+
+
+def month_ranges(
+    clean: Collection,
+    query: Mapping | None = None,
+) -> Iterator[Tuple[int, int, Dict]]:
+    """
+    Yield ``(year, month, flight_date filter)`` for every month from the
+    first to the last flight matching ``query`` (all flights by default).
+    """
+    # flight_date leads the dedup index, so both ends are index lookups
+    query = query or {}
+    first = clean.find_one(query, {"flight_date": 1}, sort=[("flight_date", ASCENDING)])
+    last = clean.find_one(query, {"flight_date": 1}, sort=[("flight_date", DESCENDING)])
+    if first is None:
+        return
+
+    year, month = first["flight_date"].year, first["flight_date"].month
+    while (year, month) <= (last["flight_date"].year, last["flight_date"].month):
+        start = datetime(year, month, 1)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        yield start.year, start.month, {"$gte": start, "$lt": datetime(year, month, 1)}
+
+
+def create_query_indexes(collection: Collection) -> None:
+    """Create the airline+date and origin+date indexes on a flights collection."""
+    for keys in QUERY_INDEXES:
+        collection.create_index(keys)
+
+
+def layout_is_current(db: Database) -> bool:
+    """Whether the month partitions were built from the current clean layer."""
+    layout = get_state(db, LAYOUT_STAGE)
+    watermark = get_watermark(db, CLEAN_STAGE)
+    # Without a clean watermark there is no telling what the layout missed
+    if layout is None or watermark is None:
+        return False
+    return layout.get("clean_watermark") == watermark
+
+
+def prune_partitions(
+    db: Database,
+    start: datetime | None = None,
+    end: datetime | None = None,
+) -> List[Collection]:
+    """
+    The collections holding flights in ``[start, end)``.
+
+    Month partitions overlapping the range when they are current, otherwise
+    clean_flights itself, where the date filter is an index range scan.
+    """
+    if not layout_is_current(db):
+        return [db[mongo_settings.clean_flights]]
+
+    collections = []
+    for year, month in get_state(db, LAYOUT_STAGE)["months"]:
+        month_start = datetime(year, month, 1)
+        month_end = datetime(year + month // 12, month % 12 + 1, 1)
+        if (start is None or month_end > start) and (end is None or month_start < end):
+            collections.append(db[month_collection_name(year, month)])
+    return collections
+
+
+def month_partitions(db: Database) -> Iterator[Tuple[int, int, Dict, Collection]]:
+    """
+    ``(year, month, flight_date filter, collection)`` for every month with flights.
+
+    The collection is the month's partition when the layout is current, so
+    a month-at-a-time reader scans just that month; otherwise clean_flights.
+    """
+    for year, month, dates in month_ranges(db[mongo_settings.clean_flights]):
+        for collection in prune_partitions(db, dates["$gte"], dates["$lt"]):
+            yield year, month, dates, collection
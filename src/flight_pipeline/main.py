@@ -0,0 +1,394 @@
+"""
+Run the pipeline as an ingest -> clean -> layout -> aggregate DAG.
+
+    python -m flight_pipeline.main run
+    python -m flight_pipeline.main run --stages clean layout aggregate
+    python -m flight_pipeline.main run --fresh
+    python -m flight_pipeline.main status
+
+flights.csv is ingested one chunk (partition) at a time, and each finished
+partition is handed to the clean stage while the next one is still being
+loaded. Every partition is checkpointed per stage, so a failed run resumes
+at the first unfinished partition instead of starting over.
+"""
+
+import argparse
+import importlib.util
+import logging
+import struct
+import time
+from pathlib import Path
+from queue import Queue
+from threading import Event, Thread
+from typing import Dict, List, Sequence
+
+from bson import ObjectId
+from pymongo import ASCENDING
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.mongo import get_database
+from flight_pipeline.db.partitions import layout_is_current
+from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import pipeline_run, step
+from flight_pipeline.pipeline.aggregate import run_aggregations
+from flight_pipeline.pipeline.batching import batch_controller, write_in_batches
+from flight_pipeline.pipeline.clean import (
+    BATCH_SIZE,
+    MAX_RECORDS,
+    clean_cursor,
+    clean_transform,
+    create_dedup_index,
+)
+from flight_pipeline.pipeline.ingest import (
+    FLIGHT_CHUNK_SIZE,
+    RAW_DATA_DIR,
+    ingest_small_csv,
+    read_typed_csv_chunks,
+)
+from flight_pipeline.pipeline.layout import run_layout
+from flight_pipeline.pipeline.sampling import check_unsampled_append
+from flight_pipeline.pipeline.state import (
+    AGGREGATE_STAGE,
+    CLEAN_STAGE,
+    INGEST_STAGE,
+    LAYOUT_STAGE,
+    SAMPLE_STAGE,
+    advance_watermark,
+    get_checkpoint,
+    get_state,
+    get_watermark,
+    list_checkpoints,
+    reset_checkpoints,
+    reset_watermark,
+    save_checkpoint,
+    update_state,
+)
+
+
+STAGES = (INGEST_STAGE, CLEAN_STAGE, LAYOUT_STAGE, AGGREGATE_STAGE)
+
+# pipeline_state document describing the run the checkpoints belong to
+ORCHESTRATOR_STATE = "orchestrator"
+SMALL_CSVS = "small_csvs"
+GOLD = "gold"
+
+
+def partition_id(epoch: int, partition: int, row: int) -> ObjectId:
+    """
+    Deterministic _id of a flights.csv row: run epoch, partition, row.
+
+    Re-ingesting a partition recreates exactly the same _ids, so a retry can
+    clear an interrupted attempt by range. The epoch prefix keeps the ids
+    ordered after ObjectIds generated before the run started.
+    """
+    return ObjectId(struct.pack(">III", epoch, partition, row))
+
+
+def source_fingerprint(path: Path) -> Dict:
+    """What the partition layout depends on; checkpoints only match the same."""
+    parser = pipeline_settings.ingest_parser
+    if parser == "auto":
+        parser = "pyarrow" if importlib.util.find_spec("pyarrow") else "pandas"
+
+    stat = path.stat()
+    return {
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "parser": parser,
+        "chunk_size": FLIGHT_CHUNK_SIZE,
+        "usecols": pipeline_settings.ingest_usecols,
+    }
+
+
+def prepare_run(
+    db: Database,
+    data_dir: Path,
+    stages: Sequence[str],
+    fresh: bool,
+) -> int | None:
+    """
+    Resume the checkpointed run, restarting only the selected stages that need it.
+
+    Only a run that ingests looks at flights.csv: a changed source (or
+    ``fresh``) starts a new epoch of raw partitions. Clean restarts when it
+    is fresh or its layer was cleaned from another epoch. Stages that are
+    not selected keep their collections and checkpoints.
+    """
+    state = get_state(db, ORCHESTRATOR_STATE) or {}
+    epoch = state.get("id_epoch")
+
+    if INGEST_STAGE in stages:
+        fingerprint = source_fingerprint(data_dir / "flights.csv")
+        if fresh or state.get("source") != fingerprint:
+            logging.info("Starting a fresh ingest: clearing raw collections and ingest checkpoints")
+            reset_checkpoints(db, INGEST_STAGE)
+            for name in (
+                mongo_settings.raw_flights,
+                mongo_settings.raw_airlines,
+                mongo_settings.raw_airports,
+            ):
+                db[name].delete_many({})
+            # Never reuse an epoch, or stale clean checkpoints would match it
+            epoch = max(int(time.time()), (epoch or 0) + 1)
+            update_state(db, ORCHESTRATOR_STATE, source=fingerprint, id_epoch=epoch)
+        else:
+            logging.info(f"Resuming ingest of epoch {epoch}")
+
+    if CLEAN_STAGE in stages:
+        # Runs from before clean_epoch was recorded cleaned the current epoch
+        clean_epoch = state.get("clean_epoch", state.get("id_epoch"))
+        if fresh or clean_epoch != epoch:
+            logging.info(f"Starting a fresh clean of epoch {epoch}: clearing clean_flights")
+            reset_checkpoints(db, CLEAN_STAGE)
+            db[mongo_settings.clean_flights].delete_many({})
+            reset_watermark(db, CLEAN_STAGE)
+            # Incremental gold partials are keyed on the clean _ids just dropped
+            reset_watermark(db, AGGREGATE_STAGE)
+            # The rebuilt layer is the head of each partition, not a sample
+            reset_watermark(db, SAMPLE_STAGE)
+            update_state(db, ORCHESTRATOR_STATE, clean_epoch=epoch)
+
+    if AGGREGATE_STAGE in stages and fresh:
+        reset_checkpoints(db, AGGREGATE_STAGE)
+
+    return epoch
+
+
+def ingest_partitions(
+    db: Database,
+    data_dir: Path,
+    epoch: int,
+    ready: Queue,
+    stop: Event,
+) -> None:
+    """Load flights.csv partition by partition, queueing each one once stored."""
+    if get_checkpoint(db, INGEST_STAGE, SMALL_CSVS) is None:
+        db[mongo_settings.raw_airlines].delete_many({})
+        db[mongo_settings.raw_airports].delete_many({})
+        ingest_small_csv(data_dir / "airlines.csv", db[mongo_settings.raw_airlines])
+        ingest_small_csv(data_dir / "airports.csv", db[mongo_settings.raw_airports])
+        save_checkpoint(db, INGEST_STAGE, SMALL_CSVS, status="done")
+
+    raw = db[mongo_settings.raw_flights]
+    batches = batch_controller(db.client, FLIGHT_CHUNK_SIZE, "Ingest")
+    offset = 0
+
+    chunks = read_typed_csv_chunks(
+        data_dir / "flights.csv",
+        FLIGHT_CHUNK_SIZE,
+        pipeline_settings.ingest_usecols,
+        pipeline_settings.ingest_parser,
+    )
+    for partition, chunk in enumerate(chunks):
+        if stop.is_set():
+            return
+
+        rows = len(chunk)
+        checkpoint = get_checkpoint(db, INGEST_STAGE, partition)
+
+        if checkpoint is None:
+            first_id = partition_id(epoch, partition, 0)
+            last_id = partition_id(epoch, partition, rows - 1)
+            # Rows an interrupted attempt left behind
+            raw.delete_many({"_id": {"$gte": first_id, "$lte": last_id}})
+
+            records = chunk.to_dict(orient="records")
+            for row, record in enumerate(records):
+                record["_id"] = partition_id(epoch, partition, row)
+            # A partition is still one checkpoint however it is split
+            write_in_batches(
+                records, lambda batch: raw.insert_many(batch, ordered=False), batches
+            )
+
+            checkpoint = {"offset": offset, "rows": rows, "first_id": first_id, "last_id": last_id}
+            save_checkpoint(db, INGEST_STAGE, partition, status="done", **checkpoint)
+            logging.info(f"Ingest | partition {partition} | {rows:,} rows")
+
+        ready.put({"partition": partition, **checkpoint})
+        offset += rows
+
+
+def clean_partitions(db: Database, epoch: int | None, ready: Queue) -> None:
+    """Clean each ingested partition as it arrives, within the clean sample."""
+    check_unsampled_append(db, "an orchestrated clean")
+    transform_batch = None
+
+    raw = db[mongo_settings.raw_flights]
+    clean = db[mongo_settings.clean_flights]
+    create_dedup_index(clean)
+    # One controller for the run, so each partition starts at the size the
+    # previous one settled on instead of BATCH_SIZE
+    batches = batch_controller(db.client, BATCH_SIZE, "Clean")
+
+    while (item := ready.get()) is not None:
+        partition = item["partition"]
+
+        # Ingest loads the small CSVs before it queues the first partition,
+        # so the dimension cache is only built once one has arrived
+        if transform_batch is None:
+            transform_batch = clean_transform(pipeline_settings.clean_engine, db)
+
+        # Same sample as run_clean_pipeline: the first MAX_RECORDS rows
+        sample_rows = min(item["rows"], MAX_RECORDS - item["offset"])
+        if sample_rows <= 0:
+            continue
+
+        checkpoint = get_checkpoint(db, CLEAN_STAGE, partition)
+        if checkpoint is not None:
+            continue
+
+        id_range = {"$gte": item["first_id"], "$lte": partition_id(epoch, partition, sample_rows - 1)}
+        # Clean records keep their raw _id, so a retry replaces its own rows only
+        clean.delete_many({"_id": id_range})
+
+        cursor = raw.find({"_id": id_range}).sort("_id", ASCENDING)
+        with step(f"clean_partition_{partition}") as timer:
+            processed, inserted, duplicates = clean_cursor(
+                cursor,
+                clean,
+                transform_batch,
+                label=f"Clean partition {partition}",
+                batches=batches,
+            )
+            timer.rows = processed
+
+        save_checkpoint(
+            db,
+            CLEAN_STAGE,
+            partition,
+            status="done",
+            processed=processed,
+            inserted=inserted,
+            duplicates=duplicates,
+        )
+        # Partitions are cleaned in order, so this is a safe incremental mark
+        advance_watermark(db, CLEAN_STAGE, id_range["$lte"])
+        logging.info(
+            f"Clean | partition {partition} | inserted {inserted:,} | "
+            f"duplicates dropped {duplicates:,}"
+        )
+
+
+def queue_checkpointed_partitions(db: Database, ready: Queue) -> None:
+    """Feed partitions ingested by an earlier run, for runs without ingest."""
+    for checkpoint in list_checkpoints(db, INGEST_STAGE):
+        partition = checkpoint["_id"]["partition"]
+        if partition != SMALL_CSVS:
+            ready.put({"partition": partition, **checkpoint})
+
+
+def build_layout(db: Database) -> None:
+    """Index clean_flights and rebuild stale month partitions."""
+    if pipeline_settings.clean_layout == "monthly" and layout_is_current(db):
+        logging.info("Month partitions are up to date with the clean layer")
+        return
+
+    run_layout()
+
+
+def aggregate_gold(db: Database) -> None:
+    """Rebuild the gold layer unless it already reflects the clean layer."""
+    watermark = get_watermark(db, CLEAN_STAGE)
+    checkpoint = get_checkpoint(db, AGGREGATE_STAGE, GOLD)
+    if checkpoint is not None and checkpoint.get("clean_watermark") == watermark:
+        logging.info("Gold layer is up to date with the clean layer")
+        return
+
+    # The checkpoint claims gold reflects ``watermark``, which only the primary
+    # is sure to have
+    run_aggregations(primary_reads=True)
+    save_checkpoint(db, AGGREGATE_STAGE, GOLD, status="done", clean_watermark=watermark)
+
+
+def run_pipeline(
+    stages: Sequence[str] = STAGES,
+    fresh: bool = False,
+    data_dir: Path = RAW_DATA_DIR,
+) -> None:
+    setup_logging()
+    db = get_database()
+
+    with pipeline_run("pipeline", stages=list(stages), fresh=fresh):
+        epoch = prepare_run(db, data_dir, stages, fresh)
+        ready: Queue = Queue()
+        stop = Event()
+        errors: List[BaseException] = []
+
+        def produce() -> None:
+            try:
+                if INGEST_STAGE in stages:
+                    ingest_partitions(db, data_dir, epoch, ready, stop)
+                else:
+                    queue_checkpointed_partitions(db, ready)
+            except BaseException as exc:
+                errors.append(exc)
+            finally:
+                ready.put(None)
+
+        # Ingest runs ahead in its own thread while clean consumes finished
+        # partitions here
+        producer = Thread(target=produce, name="ingest", daemon=True)
+        producer.start()
+
+        try:
+            if CLEAN_STAGE in stages:
+                clean_partitions(db, epoch, ready)
+            else:
+                while ready.get() is not None:
+                    pass
+        finally:
+            # A failed clean stops ingest at the next partition boundary
+            stop.set()
+            producer.join()
+
+        if errors:
+            raise errors[0]
+
+        if LAYOUT_STAGE in stages:
+            build_layout(db)
+
+        if AGGREGATE_STAGE in stages:
+            aggregate_gold(db)
+
+    logging.info("Pipeline completed successfully")
+
+
+def show_status() -> None:
+    setup_logging()
+    db = get_database()
+
+    state = get_state(db, ORCHESTRATOR_STATE)
+    if state is None or "source" not in state:
+        print("No checkpointed run")
+        return
+
+    print(f"Source: {state['source']['path']} ({state['source']['size']:,} bytes)")
+    for stage in STAGES:
+        checkpoints = list_checkpoints(db, stage)
+        print(f"{stage:<10} {len(checkpoints):>4} checkpoints | watermark {get_watermark(db, stage)}")
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="flight_pipeline", description=__doc__.splitlines()[1]
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run (or resume) the pipeline")
+    run.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    run.add_argument("--fresh", action="store_true", help="ignore checkpoints and start over")
+    run.add_argument("--data-dir", type=Path, default=RAW_DATA_DIR)
+
+    commands.add_parser("status", help="show stage checkpoints and watermarks")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        run_pipeline(args.stages, args.fresh, args.data_dir)
+    else:
+        show_status()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import functools
+import inspect
+import json
+import logging
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List
+
+from pymongo import monitoring
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.mongo import get_database
+
+
+RUNS_DIR = Path("data/runs")
+
+# Upper bounds (ms) of the command latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def peak_rss_mb() -> float | None:
+    """High-water resident memory of this process and its finished children."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / scale, 1)
+
+
+class CommandLatencyMonitor(monitoring.CommandListener):
+    """
+    Per (command, collection) latency histograms of every MongoDB call.
+
+    Registered globally when this module is imported, so every client the
+    pipeline creates afterwards reports to it, writer threads included.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.pending: Dict[int, str] = {}
+        self.stats: Dict[str, Dict] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        key = f"{event.command_name} {target}" if isinstance(target, str) else event.command_name
+        with self.lock:
+            self.pending[event.request_id] = key
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event.request_id, event.duration_micros, failed=False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event.request_id, event.duration_micros, failed=True)
+
+    def _record(self, request_id: int, duration_micros: int, failed: bool) -> None:
+        millis = duration_micros / 1000
+        with self.lock:
+            key = self.pending.pop(request_id, None)
+            if key is None:
+                return
+
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = {
+                    "count": 0,
+                    "failed": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "histogram": {},
+                }
+
+            stats["count"] += 1
+            stats["failed"] += failed
+            stats["total_ms"] += millis
+            stats["max_ms"] = max(stats["max_ms"], millis)
+
+            bucket = next(
+                (f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS if millis <= bound),
+                f"gt_{LATENCY_BUCKETS_MS[-1]}ms",
+            )
+            stats["histogram"][bucket] = stats["histogram"].get(bucket, 0) + 1
+
+    def reset(self) -> None:
+        with self.lock:
+            self.stats = {}
+
+    def snapshot(self) -> List[Dict]:
+        """Stats per command, slowest total first."""
+        with self.lock:
+            rows = [
+                {
+                    "command": key,
+                    **stats,
+                    "total_ms": round(stats["total_ms"], 2),
+                    "max_ms": round(stats["max_ms"], 2),
+                    "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "histogram": dict(stats["histogram"]),
+                }
+                for key, stats in self.stats.items()
+            ]
+        return sorted(rows, key=lambda row: -row["total_ms"])
+
+
+command_monitor = CommandLatencyMonitor()
+if pipeline_settings.command_monitoring:
+    monitoring.register(command_monitor)
+
+
+class Step:
+    """Timer for one named piece of a run; set ``rows`` to get rows/s."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.rows: int | None = None
+        self.seconds = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "seconds": round(self.seconds, 4),
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / self.seconds) if self.rows and self.seconds else None,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+
+class PipelineRun:
+    def __init__(self, stage: str, **details: Any) -> None:
+        self.run_id = uuid.uuid4().hex
+        self.stage = stage
+        self.details = details
+        self.steps: List[Dict] = []
+        self.started_at = datetime.now(timezone.utc)
+
+    def to_dict(self, seconds: float, error: BaseException | None) -> Dict:
+        return {
+            "_id": self.run_id,
+            "stage": self.stage,
+            "status": "failed" if error else "succeeded",
+            "error": repr(error) if error else None,
+            "started_at": self.started_at,
+            "finished_at": datetime.now(timezone.utc),
+            "seconds": round(seconds, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "steps": self.steps,
+            "commands": command_monitor.snapshot(),
+            "settings": pipeline_settings.model_dump(),
+            **self.details,
+        }
+
+
+_active_run: PipelineRun | None = None
+
+
+@contextmanager
+def pipeline_run(stage: str, **details: Any) -> Iterator[PipelineRun]:
+    """
+    Instrument a stage entry point.
+
+    On exit, successful or not, the run's steps, Mongo command latencies and
+    peak RSS are written to the ``pipeline_runs`` collection and a JSON file.
+    Runs do not nest: an inner ``pipeline_run`` joins the outer one.
+    """
+    global _active_run
+
+    if _active_run is not None:
+        yield _active_run
+        return
+
+    run = _active_run = PipelineRun(stage, **details)
+    command_monitor.reset()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield run
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        _active_run = None
+        save_run(run.to_dict(time.perf_counter() - started, error))
+
+
+def instrumented(stage: str) -> Callable:
+    """Decorate a stage entry point to record it as a pipeline run."""
+
+    def decorate(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            arguments = signature.bind(*args, **kwargs).arguments
+            with pipeline_run(stage, arguments=arguments):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def step(name: str) -> Iterator[Step]:
+    """Time a sub-step of the active run; a no-op outside of one."""
+    timer = Step(name)
+    run = _active_run
+    started = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - started
+        if run is not None:
+            run.steps.append(timer.to_dict())
+            logging.info(f"Step {name} | {timer.seconds:,.2f}s")
+
+
+def save_run(record: Dict) -> None:
+    """Store a run record; a metrics failure never fails the run itself."""
+    try:
+        get_database()[mongo_settings.pipeline_runs].insert_one(dict(record))
+    except Exception as exc:
+        logging.warning(f"Could not store run metrics in MongoDB: {exc}")
+
+    try:
+        directory = Path(pipeline_settings.metrics_dir or RUNS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{record['stage']}-{record['started_at']:%Y%m%d-%H%M%S}-{record['_id'][:8]}.json"
+        path.write_text(json.dumps(record, indent=2, default=str))
+    except OSError as exc:
+        logging.warning(f"Could not write run metrics file: {exc}")
+
+    logging.info(
+        f"Run {record['_id'][:8]} | {record['stage']} {record['status']} | "
+        f"{record['seconds']:,.2f}s | peak RSS {record['peak_rss_mb']} MB"
+    )
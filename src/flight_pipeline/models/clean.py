@@ -14,3 +14,11 @@ class CleanFlight(BaseModel):
 
     is_delayed: bool
     is_cancelled: bool
+
+    # Filled from the airline/airport dimension cache; None when not enriched
+    airline_name: str | None = None
+    origin_city: str | None = None
+    origin_state: str | None = None
+    destination_city: str | None = None
+    destination_state: str | None = None
+    unknown_airport: bool | None = None
@@ -1,43 +1,293 @@
 import logging
 
-from flight_pipeline.config.settings import mongo_settings
-from flight_pipeline.db.mongo import get_database
+from pymongo import ASCENDING, ReplaceOne
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.frames import load_frame
+from flight_pipeline.db.mongo import get_analytics_database, get_database
+from flight_pipeline.db.partitions import month_partitions, month_ranges
 from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented, step
+from flight_pipeline.pipeline.distribution import build_delay_distribution
+from flight_pipeline.pipeline.rolling import group_partials, refresh_span, rolling_rows
+from flight_pipeline.pipeline.sampling import (
+    build_sample_estimates,
+    get_sample_design,
+    is_probability_sample,
+)
+from flight_pipeline.pipeline.sketches import (
+    SKETCH_FIELDS,
+    build_partition_sketches,
+    merge_sketch_docs,
+)
+from flight_pipeline.pipeline.state import (
+    AGGREGATE_STAGE,
+    advance_watermark,
+    bump_gold_version,
+    get_state,
+    update_state,
+)
 
 
-def aggregate_daily_summary(db):
-    logging.info("Building daily flight summary")
+STAGING_SUFFIX = "_staging"
 
-    pipeline = [
-        {
-            "$group": {
-                "_id": "$flight_date",
-                "total_flights": {"$sum": 1},
-                "delayed_flights": {
-                    "$sum": {"$cond": ["$is_delayed", 1, 0]}
-                },
-                "cancelled_flights": {
-                    "$sum": {"$cond": ["$is_cancelled", 1, 0]}
+DAILY_SUMMARY_PIPELINE = [
+    {
+        "$group": {
+            "_id": "$flight_date",
+            "total_flights": {"$sum": 1},
+            "delayed_flights": {
+                "$sum": {"$cond": ["$is_delayed", 1, 0]}
+            },
+            "cancelled_flights": {
+                "$sum": {"$cond": ["$is_cancelled", 1, 0]}
+            },
+            "avg_arrival_delay": {"$avg": "$arrival_delay"},
+        }
+    },
+    {
+        "$project": {
+            "_id": 0,
+            "flight_date": "$_id",
+            "total_flights": 1,
+            "delayed_flights": 1,
+            "cancelled_flights": 1,
+            "avg_arrival_delay": {"$round": ["$avg_arrival_delay", 2]},
+        }
+    },
+]
+
+
+AIRLINE_PERFORMANCE_PIPELINE = [
+    {
+        "$group": {
+            "_id": "$airline",
+            "total_flights": {"$sum": 1},
+            "delayed_flights": {
+                "$sum": {"$cond": ["$is_delayed", 1, 0]}
+            },
+            "cancelled_flights": {
+                "$sum": {"$cond": ["$is_cancelled", 1, 0]}
+            },
+            "avg_arrival_delay": {"$avg": "$arrival_delay"},
+        }
+    },
+    {
+        "$project": {
+            "_id": 0,
+            "airline": "$_id",
+            "total_flights": 1,
+            "pct_delayed": {
+                "$round": [
+                    {
+                        "$multiply": [
+                            {"$divide": ["$delayed_flights", "$total_flights"]},
+                            100,
+                        ]
+                    },
+                    2,
+                ]
+            },
+            "pct_cancelled": {
+                "$round": [
+                    {
+                        "$multiply": [
+                            {"$divide": ["$cancelled_flights", "$total_flights"]},
+                            100,
+                        ]
+                    },
+                    2,
+                ]
+            },
+            "avg_arrival_delay": {"$round": ["$avg_arrival_delay", 2]},
+        }
+    },
+    {"$sort": {"pct_delayed": -1}},
+]
+
+
+AIRPORT_STATS_PIPELINE = [
+    {
+        "$group": {
+            "_id": "$origin_airport",
+            "total_departures": {"$sum": 1},
+            "delayed_departures": {
+                "$sum": {"$cond": ["$is_delayed", 1, 0]}
+            },
+            "avg_departure_delay": {"$avg": "$departure_delay"},
+        }
+    },
+    {
+        "$project": {
+            "_id": 0,
+            "origin_airport": "$_id",
+            "total_departures": 1,
+            "pct_delayed": {
+                "$round": [
+                    {
+                        "$multiply": [
+                            {
+                                "$divide": [
+                                    "$delayed_departures",
+                                    "$total_departures",
+                                ]
+                            },
+                            100,
+                        ]
+                    },
+                    2,
+                ]
+            },
+            "avg_departure_delay": {"$round": ["$avg_departure_delay", 2]},
+        }
+    },
+    {"$sort": {"pct_delayed": -1}},
+]
+
+
+# Flight counts per (airline, arrival delay) for delayed flights; small
+# enough to turn into exact quantiles client-side
+DELAY_HISTOGRAM_PIPELINE = [
+    {"$match": {"arrival_delay": {"$gt": 0}}},
+    {
+        "$group": {
+            "_id": {"airline": "$airline", "arrival_delay": "$arrival_delay"},
+            "flights": {"$sum": 1},
+        }
+    },
+]
+
+
+# Same (lower, upper] bins as the dashboard's severity chart
+SEVERITY_BUCKETS = [
+    ("Very Early", -120, -15),
+    ("Early", -15, 0),
+    ("On-Time", 0, 15),
+    ("Minor Delay", 15, 30),
+    ("Moderate Delay", 30, 60),
+    ("Severe Delay", 60, 120),
+    ("Extreme Delay", 120, 300),
+]
+
+# Bucket label of a flight's arrival delay; null when it falls outside every
+# bin or is missing
+SEVERITY_BUCKET = {
+    "$switch": {
+        "branches": [
+            {
+                "case": {
+                    "$and": [
+                        {"$gt": ["$arrival_delay", lower]},
+                        {"$lte": ["$arrival_delay", upper]},
+                    ]
                 },
-                "avg_arrival_delay": {"$avg": "$arrival_delay"},
+                "then": label,
             }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "flight_date": "$_id",
-                "total_flights": 1,
-                "delayed_flights": 1,
-                "cancelled_flights": 1,
-                "avg_arrival_delay": {"$round": ["$avg_arrival_delay", 2]},
-            }
-        },
-    ]
+            for label, lower, upper in SEVERITY_BUCKETS
+        ],
+        "default": None,
+    }
+}
+
+# Flights that fall in some bin; the rest would all group under a null key
+SEVERITY_RANGE = {
+    "arrival_delay": {"$gt": SEVERITY_BUCKETS[0][1], "$lte": SEVERITY_BUCKETS[-1][2]}
+}
+
+DELAY_SEVERITY_PIPELINE = [
+    {"$group": {"_id": SEVERITY_BUCKET, "flights": {"$sum": 1}}},
+]
 
-    results = list(db.clean_flights.aggregate(pipeline))
-    db[mongo_settings.agg_daily_summary].delete_many({})
-    if results:
-        db[mongo_settings.agg_daily_summary].insert_many(results)
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Turns per (airline, ISO weekday) counts into gold rows
+AIRLINE_WEEKDAY_PROJECTION = [
+    {
+        "$project": {
+            "_id": 0,
+            "airline": "$_id.airline",
+            "day_of_week": "$_id.day_of_week",
+            "day_name": {"$arrayElemAt": [WEEKDAYS, {"$subtract": ["$_id.day_of_week", 1]}]},
+            "total_flights": 1,
+            "delayed_flights": 1,
+            "pct_delayed": {
+                "$round": [
+                    {
+                        "$multiply": [
+                            {"$divide": ["$delayed_flights", "$total_flights"]},
+                            100,
+                        ]
+                    },
+                    2,
+                ]
+            },
+        }
+    },
+]
+
+AIRLINE_WEEKDAY_PIPELINE = [
+    {
+        "$group": {
+            "_id": {
+                "airline": "$airline",
+                "day_of_week": {"$isoDayOfWeek": "$flight_date"},
+            },
+            "total_flights": {"$sum": 1},
+            "delayed_flights": {
+                "$sum": {"$cond": ["$is_delayed", 1, 0]}
+            },
+        }
+    },
+    *AIRLINE_WEEKDAY_PROJECTION,
+]
+
+# (scope, key) of the population estimates built from a sampled clean layer
+SAMPLE_ESTIMATE_SCOPES = [
+    ("daily", "flight_date"),
+    ("airline", "airline"),
+    ("airport", "origin_airport"),
+]
+
+# (key, delay field, daily partials, gold) of each rolling-window series
+ROLLING_SERIES = [
+    (
+        "airline",
+        "arrival_delay",
+        mongo_settings.agg_airline_daily_partials,
+        mongo_settings.agg_airline_rolling,
+    ),
+    (
+        "origin_airport",
+        "departure_delay",
+        mongo_settings.agg_airport_daily_partials,
+        mongo_settings.agg_airport_rolling,
+    ),
+]
+
+
+def publish_gold(db, name, results):
+    """
+    Replace a gold collection's rows without an empty window.
+
+    Rows go to a staging collection that is then renamed over the live one,
+    so readers see either the old rows or the new ones.
+    """
+    if not results:
+        db[name].delete_many({})
+        return
+
+    staging = db[name + STAGING_SUFFIX]
+    staging.drop()
+    staging.insert_many(results)
+    staging.rename(name, dropTarget=True)
+
+
+def aggregate_daily_summary(db):
+    logging.info("Building daily flight summary")
+
+    results = list(db.clean_flights.aggregate(DAILY_SUMMARY_PIPELINE))
+    publish_gold(db, mongo_settings.agg_daily_summary, results)
 
     logging.info(f"Daily summary rows: {len(results)}")
 
@@ -45,119 +295,670 @@ def aggregate_daily_summary(db):
 def aggregate_airline_performance(db):
     logging.info("Building airline performance summary")
 
+    results = list(db.clean_flights.aggregate(AIRLINE_PERFORMANCE_PIPELINE))
+    publish_gold(db, mongo_settings.agg_airline_perf, results)
+
+    logging.info(f"Airline performance rows: {len(results)}")
+
+
+def aggregate_airport_stats(db):
+    logging.info("Building airport delay statistics")
+
+    results = list(db.clean_flights.aggregate(AIRPORT_STATS_PIPELINE))
+    publish_gold(db, mongo_settings.agg_airport_stats, results)
+
+    logging.info(f"Airport stats rows: {len(results)}")
+
+
+def publish_delay_distribution(db, histogram):
+    results = build_delay_distribution(histogram)
+    publish_gold(db, mongo_settings.agg_delay_distribution, results)
+
+    logging.info(f"Delay distribution rows: {len(results)}")
+
+
+def build_delay_severity(rows):
+    """Order severity counts by bin, keeping bins no flight fell into."""
+    flights = {row["_id"]: row["flights"] for row in rows}
+    return [
+        {
+            "bucket": label,
+            "position": position,
+            "lower": lower,
+            "upper": upper,
+            "flights": flights.get(label, 0),
+        }
+        for position, (label, lower, upper) in enumerate(SEVERITY_BUCKETS)
+    ]
+
+
+def aggregate_delay_severity(db):
+    logging.info("Building arrival delay severity histogram")
+
+    rows = list(db.clean_flights.aggregate(DELAY_SEVERITY_PIPELINE))
+    publish_gold(db, mongo_settings.agg_delay_severity, build_delay_severity(rows))
+
+    logging.info(f"Delay severity rows: {len(SEVERITY_BUCKETS)}")
+
+
+def aggregate_airline_weekday(db):
+    logging.info("Building airline by day-of-week delay rates")
+
+    results = list(db.clean_flights.aggregate(AIRLINE_WEEKDAY_PIPELINE))
+    publish_gold(db, mongo_settings.agg_airline_weekday, results)
+
+    logging.info(f"Airline weekday rows: {len(results)}")
+
+
+def aggregate_delay_distribution(db):
+    logging.info("Building arrival delay distribution")
+
+    histogram = list(
+        db.clean_flights.aggregate(DELAY_HISTOGRAM_PIPELINE, allowDiskUse=True)
+    )
+    publish_delay_distribution(db, histogram)
+
+
+def sketch_frames(db):
+    """Each month's sketch fields, from the clean snapshot when enabled and current."""
+    if pipeline_settings.aggregate_snapshot:
+        # Imported here: snapshots need the optional pyarrow
+        from flight_pipeline.pipeline.snapshot import clean_snapshot_is_current, load_clean_month
+
+        if clean_snapshot_is_current(db):
+            logging.info("Reading clean flights from the local snapshot")
+            for year, month, _ in month_ranges(db.clean_flights):
+                yield load_clean_month(year, month, SKETCH_FIELDS)
+            return
+        logging.info("Clean snapshot is missing or stale; reading MongoDB")
+
+    for _, _, dates, flights in month_partitions(db):
+        yield load_frame(flights, SKETCH_FIELDS, filter={"flight_date": dates})
+
+
+def aggregate_daily_sketches(db):
+    """Sketch every (day, airline) of the clean layer, one month at a time."""
+    logging.info("Building daily delay, distinct-count and route sketches")
+
+    results = []
+    for frame in sketch_frames(db):
+        results.extend(build_partition_sketches(frame))
+    publish_gold(db, mongo_settings.agg_daily_sketches, results)
+
+    logging.info(f"Daily sketch rows: {len(results)}")
+
+
+def _daily_key_accumulators(delay_field):
+    """Additive (key, day) counts the rolling windows are summed from."""
+    return {
+        "flights": {"$sum": 1},
+        "delayed": {"$sum": {"$cond": ["$is_delayed", 1, 0]}},
+        "delay_sum": {"$sum": f"${delay_field}"},
+        "delay_count": _count_numbers(f"${delay_field}"),
+    }
+
+
+def _rolling_index(db, gold, key_field):
+    db[gold].create_index([(key_field, ASCENDING), ("flight_date", ASCENDING)], unique=True)
+
+
+def aggregate_rolling_delays(db):
+    """7- and 30-day trailing delay metrics per airline and airport, per day."""
+    logging.info("Building rolling delay windows")
+
+    for key_field, delay_field, _, gold in ROLLING_SERIES:
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {key_field: f"${key_field}", "flight_date": "$flight_date"},
+                    **_daily_key_accumulators(delay_field),
+                }
+            }
+        ]
+        daily = db.clean_flights.aggregate(pipeline, allowDiskUse=True)
+
+        results = []
+        for key, days in group_partials(daily, key_field).items():
+            results.extend(rolling_rows(key_field, key, days, delay_field))
+        publish_gold(db, gold, results)
+        _rolling_index(db, gold, key_field)
+
+        logging.info(f"{gold} rows: {len(results)}")
+
+
+def aggregate_sample_estimates(db):
+    """
+    Scale a sampled clean layer's counts back to the raw population.
+
+    Flights are counted per key and month x airline stratum, then weighted
+    by the inverse of the rate recorded for the clean run's sample. Without
+    a probability sample the estimates collection is emptied.
+    """
+    design = get_sample_design(db)
+    if not is_probability_sample(design):
+        publish_gold(db, mongo_settings.agg_sample_estimates, [])
+        logging.info("Clean layer is not a probability sample; no estimates to build")
+        return
+
+    logging.info(f"Building population estimates from a {design['mode']} sample")
+
+    results = []
+    for scope, key_field in SAMPLE_ESTIMATE_SCOPES:
+        pipeline = [
+            {
+                "$group": {
+                    "_id": {
+                        "key": f"${key_field}",
+                        "year": {"$year": "$flight_date"},
+                        "month": {"$month": "$flight_date"},
+                        "airline": "$airline",
+                    },
+                    "flights": {"$sum": 1},
+                    "delayed": {"$sum": {"$cond": ["$is_delayed", 1, 0]}},
+                }
+            }
+        ]
+        rows = db.clean_flights.aggregate(pipeline, allowDiskUse=True)
+        results.extend(build_sample_estimates(rows, scope, key_field, design))
+    publish_gold(db, mongo_settings.agg_sample_estimates, results)
+
+    logging.info(f"Sample estimate rows: {len(results)}")
+
+
+def _pct(part, total):
+    return {"$round": [{"$multiply": [{"$divide": [part, total]}, 100]}, 2]}
+
+
+def _avg(total, count):
+    return {
+        "$round": [
+            {"$cond": [{"$gt": [count, 0]}, {"$divide": [total, count]}, None]},
+            2,
+        ]
+    }
+
+
+def _count_numbers(field):
+    return {"$sum": {"$cond": [{"$isNumber": field}, 1, 0]}}
+
+
+def merge_partials(db, key, accumulators, partials, low, high, match=None):
+    """
+    Fold the clean flights in (low, high] into per-key partial counts and sums.
+
+    Every partial remembers the high mark it was last merged at, so replaying
+    the same range after a failed run does not count a flight twice.
+    """
+    id_range = {"$lte": high}
+    if low is not None:
+        id_range["$gt"] = low
+
     pipeline = [
+        {"$match": {"_id": id_range, **(match or {})}},
+        {"$group": {"_id": key, **accumulators}},
+        {"$set": {"as_of": high}},
         {
-            "$group": {
-                "_id": "$airline",
-                "total_flights": {"$sum": 1},
-                "delayed_flights": {
-                    "$sum": {"$cond": ["$is_delayed", 1, 0]}
-                },
-                "cancelled_flights": {
-                    "$sum": {"$cond": ["$is_cancelled", 1, 0]}
-                },
-                "avg_arrival_delay": {"$avg": "$arrival_delay"},
+            "$merge": {
+                "into": partials,
+                "on": "_id",
+                "whenMatched": [
+                    {
+                        "$set": {
+                            **{
+                                field: {
+                                    "$cond": [
+                                        {"$gte": ["$as_of", "$$new.as_of"]},
+                                        f"${field}",
+                                        {"$add": [f"${field}", f"$$new.{field}"]},
+                                    ]
+                                }
+                                for field in accumulators
+                            },
+                            "as_of": {"$max": ["$as_of", "$$new.as_of"]},
+                        }
+                    }
+                ],
+                "whenNotMatched": "insert",
             }
         },
+    ]
+    # Stays on the primary: a lagging secondary could miss flights below
+    # ``high`` and the as_of guard would never fold them in
+    db.clean_flights.aggregate(pipeline)
+
+
+def refresh_gold(db, partials, gold, key_field, projection, high):
+    """Recompute gold rows for the keys touched at ``high`` and merge them in."""
+    db[gold].create_index(key_field, unique=True)
+
+    pipeline = [
+        {"$match": {"as_of": high}},
+        {"$project": {"_id": 0, key_field: "$_id", **projection}},
         {
-            "$project": {
-                "_id": 0,
-                "airline": "$_id",
-                "total_flights": 1,
-                "pct_delayed": {
-                    "$round": [
-                        {
-                            "$multiply": [
-                                {"$divide": ["$delayed_flights", "$total_flights"]},
-                                100,
-                            ]
-                        },
-                        2,
-                    ]
-                },
-                "pct_cancelled": {
-                    "$round": [
-                        {
-                            "$multiply": [
-                                {"$divide": ["$cancelled_flights", "$total_flights"]},
-                                100,
-                            ]
-                        },
-                        2,
-                    ]
-                },
-                "avg_arrival_delay": {"$round": ["$avg_arrival_delay", 2]},
+            "$merge": {
+                "into": gold,
+                "on": key_field,
+                "whenMatched": "merge",
+                "whenNotMatched": "insert",
             }
         },
-        {"$sort": {"pct_delayed": -1}},
     ]
+    db[partials].aggregate(pipeline)
 
-    results = list(db.clean_flights.aggregate(pipeline))
-    db[mongo_settings.agg_airline_perf].delete_many({})
-    if results:
-        db[mongo_settings.agg_airline_perf].insert_many(results)
+    logging.info(
+        f"{gold} keys refreshed: {db[partials].count_documents({'as_of': high})}"
+    )
 
-    logging.info(f"Airline performance rows: {len(results)}")
+
+def incremental_daily_summary(db, low, high):
+    merge_partials(
+        db,
+        "$flight_date",
+        {
+            "total_flights": {"$sum": 1},
+            "delayed_flights": {"$sum": {"$cond": ["$is_delayed", 1, 0]}},
+            "cancelled_flights": {"$sum": {"$cond": ["$is_cancelled", 1, 0]}},
+            "arrival_delay_sum": {"$sum": "$arrival_delay"},
+            "arrival_delay_count": _count_numbers("$arrival_delay"),
+        },
+        mongo_settings.agg_daily_partials,
+        low,
+        high,
+    )
+    refresh_gold(
+        db,
+        mongo_settings.agg_daily_partials,
+        mongo_settings.agg_daily_summary,
+        "flight_date",
+        {
+            "total_flights": 1,
+            "delayed_flights": 1,
+            "cancelled_flights": 1,
+            "avg_arrival_delay": _avg("$arrival_delay_sum", "$arrival_delay_count"),
+        },
+        high,
+    )
 
 
-def aggregate_airport_stats(db):
-    logging.info("Building airport delay statistics")
+def incremental_airline_performance(db, low, high):
+    merge_partials(
+        db,
+        "$airline",
+        {
+            "total_flights": {"$sum": 1},
+            "delayed_flights": {"$sum": {"$cond": ["$is_delayed", 1, 0]}},
+            "cancelled_flights": {"$sum": {"$cond": ["$is_cancelled", 1, 0]}},
+            "arrival_delay_sum": {"$sum": "$arrival_delay"},
+            "arrival_delay_count": _count_numbers("$arrival_delay"),
+        },
+        mongo_settings.agg_airline_partials,
+        low,
+        high,
+    )
+    refresh_gold(
+        db,
+        mongo_settings.agg_airline_partials,
+        mongo_settings.agg_airline_perf,
+        "airline",
+        {
+            "total_flights": 1,
+            "pct_delayed": _pct("$delayed_flights", "$total_flights"),
+            "pct_cancelled": _pct("$cancelled_flights", "$total_flights"),
+            "avg_arrival_delay": _avg("$arrival_delay_sum", "$arrival_delay_count"),
+        },
+        high,
+    )
 
-    pipeline = [
+
+def incremental_airport_stats(db, low, high):
+    merge_partials(
+        db,
+        "$origin_airport",
         {
-            "$group": {
-                "_id": "$origin_airport",
-                "total_departures": {"$sum": 1},
-                "delayed_departures": {
-                    "$sum": {"$cond": ["$is_delayed", 1, 0]}
-                },
-                "avg_departure_delay": {"$avg": "$departure_delay"},
-            }
+            "total_departures": {"$sum": 1},
+            "delayed_departures": {"$sum": {"$cond": ["$is_delayed", 1, 0]}},
+            "departure_delay_sum": {"$sum": "$departure_delay"},
+            "departure_delay_count": _count_numbers("$departure_delay"),
         },
+        mongo_settings.agg_airport_partials,
+        low,
+        high,
+    )
+    refresh_gold(
+        db,
+        mongo_settings.agg_airport_partials,
+        mongo_settings.agg_airport_stats,
+        "origin_airport",
         {
-            "$project": {
-                "_id": 0,
-                "origin_airport": "$_id",
-                "total_departures": 1,
-                "pct_delayed": {
-                    "$round": [
-                        {
-                            "$multiply": [
-                                {
-                                    "$divide": [
-                                        "$delayed_departures",
-                                        "$total_departures",
-                                    ]
-                                },
-                                100,
-                            ]
-                        },
-                        2,
-                    ]
-                },
-                "avg_departure_delay": {"$round": ["$avg_departure_delay", 2]},
-            }
+            "total_departures": 1,
+            "pct_delayed": _pct("$delayed_departures", "$total_departures"),
+            "avg_departure_delay": _avg(
+                "$departure_delay_sum", "$departure_delay_count"
+            ),
+        },
+        high,
+    )
+
+
+def incremental_delay_distribution(db, low, high):
+    merge_partials(
+        db,
+        {"airline": "$airline", "arrival_delay": "$arrival_delay"},
+        {"flights": {"$sum": 1}},
+        mongo_settings.agg_delay_histogram_partials,
+        low,
+        high,
+        match={"arrival_delay": {"$gt": 0}},
+    )
+
+    # Quantiles do not merge, but the histogram does; it is small enough to
+    # recompute every airline from
+    histogram = list(db[mongo_settings.agg_delay_histogram_partials].find({}, {"flights": 1}))
+    publish_delay_distribution(db, histogram)
+
+
+def incremental_delay_severity(db, low, high):
+    merge_partials(
+        db,
+        SEVERITY_BUCKET,
+        {"flights": {"$sum": 1}},
+        mongo_settings.agg_severity_partials,
+        low,
+        high,
+        # $merge rejects the null _id unbinned flights would group under
+        match=SEVERITY_RANGE,
+    )
+
+    rows = list(db[mongo_settings.agg_severity_partials].find({}, {"flights": 1}))
+    publish_gold(db, mongo_settings.agg_delay_severity, build_delay_severity(rows))
+
+
+def incremental_airline_weekday(db, low, high):
+    merge_partials(
+        db,
+        {"airline": "$airline", "day_of_week": {"$isoDayOfWeek": "$flight_date"}},
+        {
+            "total_flights": {"$sum": 1},
+            "delayed_flights": {"$sum": {"$cond": ["$is_delayed", 1, 0]}},
         },
-        {"$sort": {"pct_delayed": -1}},
+        mongo_settings.agg_airline_weekday_partials,
+        low,
+        high,
+    )
+
+    # At most airlines x 7 rows, so the whole collection is rebuilt
+    results = list(
+        db[mongo_settings.agg_airline_weekday_partials].aggregate(
+            AIRLINE_WEEKDAY_PROJECTION
+        )
+    )
+    publish_gold(db, mongo_settings.agg_airline_weekday, results)
+
+
+def merge_daily_sketches(sketches, new, high):
+    """Merge new (day, airline) sketches into the stored partials, as of ``high``."""
+    days = sorted({doc["flight_date"] for doc in new})
+    existing = {
+        (doc["flight_date"], doc["airline"]): doc
+        for doc in sketches.find({"flight_date": {"$in": days}})
+    }
+
+    operations = []
+    for doc in new:
+        key = {"flight_date": doc["flight_date"], "airline": doc["airline"]}
+        stored = existing.get((doc["flight_date"], doc["airline"]))
+        if stored is not None:
+            # Like the partials, a replayed range is not merged twice
+            if stored.get("as_of") is not None and stored["as_of"] >= high:
+                continue
+            doc = {**key, **merge_sketch_docs([stored, doc])}
+        operations.append(ReplaceOne(key, {**doc, "as_of": high}, upsert=True))
+
+    if operations:
+        sketches.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def refresh_sketch_gold(partials, gold, dates, high):
+    """Copy the partial sketches touched at ``high`` in ``dates`` to the gold table."""
+    operations = [
+        ReplaceOne(
+            {"flight_date": doc["flight_date"], "airline": doc["airline"]},
+            {field: value for field, value in doc.items() if field not in ("_id", "as_of")},
+            upsert=True,
+        )
+        for doc in partials.find({"as_of": high, "flight_date": dates})
     ]
+    if operations:
+        gold.bulk_write(operations, ordered=False)
+    return len(operations)
 
-    results = list(db.clean_flights.aggregate(pipeline))
-    db[mongo_settings.agg_airport_stats].delete_many({})
-    if results:
-        db[mongo_settings.agg_airport_stats].insert_many(results)
 
-    logging.info(f"Airport stats rows: {len(results)}")
+def incremental_daily_sketches(db, low, high):
+    """
+    Sketch the clean flights in (low, high] and merge them into their days.
+
+    Like the other incremental aggregates, sketches are merged into their
+    own partials, and only the touched days are copied to the gold table,
+    so a full rebuild of the gold table never leaves merged flights behind
+    to be counted again. The range is read one month at a time, so a large
+    backfill holds a single month's frame and sketches in memory.
+    """
+    partials = db[mongo_settings.agg_daily_sketch_partials]
+    gold = db[mongo_settings.agg_daily_sketches]
+    for collection in (partials, gold):
+        collection.create_index([("flight_date", ASCENDING), ("airline", ASCENDING)], unique=True)
+
+    id_range = {"$lte": high}
+    if low is not None and partials.find_one({}, {"_id": 1}) is None:
+        # Sketches used to be merged straight into the gold table: a layer
+        # aggregated before their partials existed is sketched once in full
+        logging.info(f"{partials.name} is empty; sketching every clean flight up to {high}")
+    elif low is not None:
+        id_range["$gt"] = low
+
+    refreshed = 0
+    for _, _, dates in month_ranges(db.clean_flights, {"_id": id_range}):
+        frame = load_frame(db.clean_flights, SKETCH_FIELDS, filter={"_id": id_range, "flight_date": dates})
+        new = build_partition_sketches(frame)
+        if new:
+            merge_daily_sketches(partials, new, high)
+            # A replayed month skips the merge but still refreshes its gold days
+            refreshed += refresh_sketch_gold(partials, gold, dates, high)
+    logging.info(f"{gold.name} keys refreshed: {refreshed}")
+
+
+def refresh_rolling(db, key_field, delay_field, partials, gold, high):
+    """
+    Recompute the window rows that include a day touched at ``high``.
+
+    Windows are slid over the stored daily partials, adding each day and
+    dropping the one that expired, instead of regrouping clean flights.
+    """
+    _rolling_index(db, gold, key_field)
+
+    touched = group_partials(db[partials].find({"as_of": high}, {"_id": 1}), key_field)
+    if not touched:
+        return
+    spans = {
+        key: refresh_span(day["flight_date"] for day in days)
+        for key, days in touched.items()
+    }
+
+    daily = db[partials].find(
+        {
+            f"_id.{key_field}": {"$in": list(spans)},
+            "_id.flight_date": {
+                "$gte": min(load_from for load_from, _, _ in spans.values()),
+                "$lte": max(end for _, _, end in spans.values()),
+            },
+        }
+    )
+
+    operations = []
+    for key, days in group_partials(daily, key_field).items():
+        _, start, end = spans[key]
+        for row in rolling_rows(key_field, key, days, delay_field, start, end):
+            operations.append(
+                ReplaceOne({key_field: key, "flight_date": row["flight_date"]}, row, upsert=True)
+            )
+
+    if operations:
+        db[gold].bulk_write(operations, ordered=False)
+    logging.info(f"{gold} rows refreshed: {len(operations)}")
+
 
+def incremental_rolling_delays(db, low, high):
+    for key_field, delay_field, partials, gold in ROLLING_SERIES:
+        merge_partials(
+            db,
+            {key_field: f"${key_field}", "flight_date": "$flight_date"},
+            _daily_key_accumulators(delay_field),
+            partials,
+            low,
+            high,
+        )
+        refresh_rolling(db, key_field, delay_field, partials, gold, high)
 
-def run_aggregations():
+
+def incremental_sample_estimates(db, low, high):
+    # A sampled clean layer is never appended to (see check_unsampled_append),
+    # so its estimates are rebuilt whole
+    aggregate_sample_estimates(db)
+
+
+@instrumented("incremental_aggregate")
+def run_incremental_aggregations():
+    """Fold newly cleaned flights into the gold layer instead of rebuilding it."""
     setup_logging()
     db = get_database()
 
-    aggregate_daily_summary(db)
-    aggregate_airline_performance(db)
-    aggregate_airport_stats(db)
+    state = get_state(db, AGGREGATE_STAGE) or {}
+    low = state.get("watermark")
+
+    # Resume the range of an interrupted run before taking on new flights
+    high = state.get("pending")
+    if high is None:
+        latest = db.clean_flights.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        high = latest["_id"] if latest else None
+
+    if high is None or (low is not None and high <= low):
+        logging.info("No newly cleaned flights to aggregate")
+        return
+
+    if low is None and "pending" not in state:
+        # No watermark: partials are rebuilt from the whole clean layer
+        for partials in (
+            mongo_settings.agg_daily_partials,
+            mongo_settings.agg_airline_partials,
+            mongo_settings.agg_airport_partials,
+            mongo_settings.agg_delay_histogram_partials,
+            mongo_settings.agg_severity_partials,
+            mongo_settings.agg_airline_weekday_partials,
+            mongo_settings.agg_daily_sketch_partials,
+            mongo_settings.agg_airline_daily_partials,
+            mongo_settings.agg_airport_daily_partials,
+            mongo_settings.agg_airline_rolling,
+            mongo_settings.agg_airport_rolling,
+        ):
+            db[partials].drop()
+
+    update_state(db, AGGREGATE_STAGE, pending=high)
+    logging.info(f"Incremental aggregation | clean _id range ({low}, {high}]")
+
+    for incremental in (
+        incremental_daily_summary,
+        incremental_airline_performance,
+        incremental_airport_stats,
+        incremental_delay_distribution,
+        incremental_delay_severity,
+        incremental_airline_weekday,
+        incremental_daily_sketches,
+        incremental_rolling_delays,
+        incremental_sample_estimates,
+    ):
+        with step(incremental.__name__):
+            incremental(db, low, high)
+
+    advance_watermark(db, AGGREGATE_STAGE, high, pending=None)
+    version = bump_gold_version(db, stage="incremental_aggregate")
+    logging.info(f"Incremental aggregated layer completed successfully | gold version {version}")
+
+
+def aggregate_single_scan(db):
+    """Build every gold collection from one pass over clean_flights."""
+    logging.info("Building all gold collections in a single scan")
+
+    # $facet feeds each clean flight through every sub-pipeline in the same
+    # pass; the gold outputs are small enough to return in one document
+    outputs = [
+        ("daily_summary", DAILY_SUMMARY_PIPELINE, mongo_settings.agg_daily_summary),
+        ("airline_performance", AIRLINE_PERFORMANCE_PIPELINE, mongo_settings.agg_airline_perf),
+        ("airport_stats", AIRPORT_STATS_PIPELINE, mongo_settings.agg_airport_stats),
+        ("airline_weekday", AIRLINE_WEEKDAY_PIPELINE, mongo_settings.agg_airline_weekday),
+    ]
+    facets = {facet: pipeline for facet, pipeline, _ in outputs}
+    facets["delay_histogram"] = DELAY_HISTOGRAM_PIPELINE
+    facets["delay_severity"] = DELAY_SEVERITY_PIPELINE
+
+    [result] = db.clean_flights.aggregate([{"$facet": facets}], allowDiskUse=True)
+
+    for facet, _, collection in outputs:
+        publish_gold(db, collection, result[facet])
+        logging.info(f"{collection} rows: {len(result[facet])}")
+
+    publish_delay_distribution(db, result["delay_histogram"])
+    publish_gold(
+        db,
+        mongo_settings.agg_delay_severity,
+        build_delay_severity(result["delay_severity"]),
+    )
+
+
+@instrumented("aggregate")
+def run_aggregations(engine=None, primary_reads=False):
+    """
+    Rebuild every gold collection from clean_flights.
+
+    Builders scan clean_flights with ``db``'s read preference: the analytics
+    one, or the primary with ``primary_reads`` when the gold must reflect a
+    clean that just finished (a secondary may not have it yet). Writes
+    always go to the primary.
+    """
+    setup_logging()
+    db = get_database() if primary_reads else get_analytics_database()
+
+    engine = engine or pipeline_settings.aggregate_engine
+    logging.info(f"Aggregation engine: {engine} | primary reads: {primary_reads}")
+
+    if engine == "single_scan":
+        # Sketches and rolling windows are built client-side, so they keep
+        # their own passes
+        builders = (
+            aggregate_single_scan,
+            aggregate_daily_sketches,
+            aggregate_rolling_delays,
+            aggregate_sample_estimates,
+        )
+    else:
+        builders = (
+            aggregate_daily_summary,
+            aggregate_airline_performance,
+            aggregate_airport_stats,
+            aggregate_delay_distribution,
+            aggregate_delay_severity,
+            aggregate_airline_weekday,
+            aggregate_daily_sketches,
+            aggregate_rolling_delays,
+            aggregate_sample_estimates,
+        )
+
+    for build in builders:
+        with step(build.__name__):
+            build(db)
 
-    logging.info("Aggregated layer completed successfully")
+    version = bump_gold_version(db, stage="aggregate", engine=engine)
+    logging.info(f"Aggregated layer completed successfully | gold version {version}")
 
 
 if __name__ == "__main__":
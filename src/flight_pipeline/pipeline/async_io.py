@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Set, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.mongo import get_async_mongo_client
+from flight_pipeline.pipeline.clean import (
+    BATCH_SIZE,
+    DUPLICATE_KEY_ERROR,
+    MAX_RECORDS,
+    dedup_records,
+)
+from flight_pipeline.pipeline.ingest import FLIGHT_CHUNK_SIZE, read_typed_csv_chunks
+
+
+class AsyncWriter:
+    """
+    Batch writes running on the event loop, at most ``in_flight`` at a time.
+
+    ``submit`` waits for a free slot, so readers and parsers stall instead of
+    buffering without bound when writes fall behind. The first write error
+    is re-raised by ``submit`` or ``close``.
+    """
+
+    def __init__(self, in_flight: int) -> None:
+        self.slots = asyncio.Semaphore(in_flight)
+        self.tasks: Set[asyncio.Task] = set()
+        self.errors: List[BaseException] = []
+
+    async def _run(self, write: Coroutine[Any, Any, Any]) -> None:
+        try:
+            await write
+        except Exception as exc:
+            self.errors.append(exc)
+        finally:
+            self.slots.release()
+
+    async def submit(self, write: Coroutine[Any, Any, Any]) -> None:
+        await self.slots.acquire()
+        if self.errors:
+            self.slots.release()
+            write.close()
+            raise self.errors[0]
+
+        task = asyncio.ensure_future(self._run(write))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def close(self) -> None:
+        """Wait for every submitted write."""
+        if self.tasks:
+            await asyncio.wait(set(self.tasks))
+        if self.errors:
+            raise self.errors[0]
+
+
+async def ingest_large_csv_async(
+    path: Path,
+    collection: Any,
+    in_flight: int | None = None,
+    usecols: List[str] | None = None,
+) -> int:
+    """
+    Ingest large CSV files with parsing overlapped by concurrent writes.
+
+    Typed chunks are parsed in a worker thread while up to ``in_flight``
+    ``insert_many`` calls run on the async client. ``_id``s are assigned
+    before a batch is submitted, so they follow file order even though the
+    writes finish out of order.
+    """
+    in_flight = in_flight or pipeline_settings.async_in_flight
+    if usecols is None:
+        usecols = pipeline_settings.ingest_usecols
+
+    logging.info(f"Starting async ingestion for {path.name} | {in_flight} writes in flight")
+
+    chunks = read_typed_csv_chunks(
+        path, FLIGHT_CHUNK_SIZE, usecols, pipeline_settings.ingest_parser
+    )
+
+    def next_records() -> List[Dict] | None:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return None
+        records: List[Dict] = chunk.to_dict(orient="records")
+        for record in records:
+            record["_id"] = ObjectId()
+        return records
+
+    writer = AsyncWriter(in_flight)
+    total_queued = 0
+    started = time.perf_counter()
+
+    i = 0
+    while (records := await asyncio.to_thread(next_records)) is not None:
+        i += 1
+        await writer.submit(collection.insert_many(records, ordered=False))
+
+        total_queued += len(records)
+        logging.info(
+            f"{path.name} | chunk {i} | queued {len(records)} | total {total_queued}"
+        )
+
+    await writer.close()
+
+    elapsed = time.perf_counter() - started
+    logging.info(
+        f"Finished async ingestion for {path.name} | total rows: {total_queued} | "
+        f"{total_queued / elapsed:,.0f} rows/s"
+    )
+    return total_queued
+
+
+async def insert_clean_batch_async(clean: Any, records: List[Dict]) -> int:
+    """Async ``insert_clean_batch``: unordered, skipping stored flights."""
+    if not records:
+        return 0
+
+    try:
+        result = await clean.insert_many(records, ordered=False)
+    except BulkWriteError as exc:
+        errors = exc.details["writeErrors"]
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        return exc.details["nInserted"]
+    return len(result.inserted_ids)
+
+
+async def clean_cursor_async(
+    cursor: Any,
+    clean: Any,
+    transform_batch: Callable[[List[Dict]], List[Dict]],
+    in_flight: int | None = None,
+    label: str = "Async clean",
+    on_batch: Callable[[List[Dict]], None] | None = None,
+) -> Tuple[int, int, int]:
+    """
+    Async ``clean_cursor``: read, transform and write batches concurrently.
+
+    The cursor is drained by its own task into a bounded queue, batches are
+    transformed in a worker thread and up to ``in_flight`` writes overlap.
+    ``on_batch`` runs (in a thread) for raw batches in cursor order, once
+    the batch and every earlier one are written, so a watermark never skips
+    a batch still in flight.
+
+    A flight duplicated across two batches that are written at the same
+    time keeps whichever copy lands first, which may not be the copy the
+    sync path keeps.
+    """
+    in_flight = in_flight or pipeline_settings.async_in_flight
+    batches: asyncio.Queue = asyncio.Queue(maxsize=in_flight)
+
+    async def read() -> None:
+        batch: List[Dict] = []
+        try:
+            async for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= BATCH_SIZE:
+                    await batches.put(batch)
+                    batch = []
+            if batch:
+                await batches.put(batch)
+        finally:
+            await batches.put(None)
+
+    processed = 0
+    inserted = 0
+    duplicates = 0
+    written: Dict[int, List[Dict]] = {}
+    next_written = 0
+
+    async def write(sequence: int, batch: List[Dict], records: List[Dict]) -> None:
+        nonlocal inserted, duplicates, next_written
+        count = await insert_clean_batch_async(clean, dedup_records(records))
+        inserted += count
+        duplicates += len(records) - count
+
+        written[sequence] = batch
+        while next_written in written:
+            finished = written.pop(next_written)
+            next_written += 1
+            if on_batch:
+                await asyncio.to_thread(on_batch, finished)
+
+    reader = asyncio.ensure_future(read())
+    writer = AsyncWriter(in_flight)
+    try:
+        sequence = 0
+        while (batch := await batches.get()) is not None:
+            processed += len(batch)
+            records = await asyncio.to_thread(transform_batch, batch)
+            await writer.submit(write(sequence, batch, records))
+            sequence += 1
+
+            logging.info(
+                f"{label} | Processed {processed:,} | Inserted {inserted:,} | "
+                f"Duplicates dropped {duplicates:,}"
+            )
+
+        # Surfaces a failed read
+        await reader
+        await writer.close()
+    finally:
+        reader.cancel()
+
+    return processed, inserted, duplicates
+
+
+async def _with_database(work: Callable[[Any], Awaitable[Any]]) -> Any:
+    client = get_async_mongo_client()
+    try:
+        return await work(client[mongo_settings.database])
+    finally:
+        await client.close()
+
+
+def ingest_flights_async(path: Path) -> int:
+    """Ingest flights.csv into raw_flights on the async driver; blocks until done."""
+
+    async def work(db: Any) -> int:
+        return await ingest_large_csv_async(path, db[mongo_settings.raw_flights])
+
+    return asyncio.run(_with_database(work))
+
+
+def clean_raw_flights_async(
+    transform_batch: Callable[[List[Dict]], List[Dict]],
+    on_batch: Callable[[List[Dict]], None] | None = None,
+) -> Tuple[int, int, int]:
+    """Clean the raw_flights sample into clean_flights on the async driver."""
+
+    async def work(db: Any) -> Tuple[int, int, int]:
+        cursor = db[mongo_settings.raw_flights].find(
+            {}, no_cursor_timeout=True, batch_size=BATCH_SIZE
+        ).limit(MAX_RECORDS)
+        return await clean_cursor_async(
+            cursor, db[mongo_settings.clean_flights], transform_batch, on_batch=on_batch
+        )
+
+    return asyncio.run(_with_database(work))
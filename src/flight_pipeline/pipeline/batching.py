@@ -0,0 +1,251 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Set
+
+import bson
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from flight_pipeline.config.settings import pipeline_settings
+
+
+# Weight of the latest batch in the per-row latency and size estimates
+SMOOTHING = 0.5
+# Documents BSON-encoded per batch to estimate its payload size
+SIZE_SAMPLE = 32
+# Only log resizes of at least this fraction, so small drifts stay quiet
+LOG_CHANGE = 0.1
+
+
+def lagging_members(client: MongoClient) -> Set[str]:
+    """
+    Hosts of replica set members that trail the primary by design.
+
+    Delayed members (``secondaryDelaySecs``, ``slaveDelay`` before 5.0) are
+    always behind, and hidden members serve no reads, so neither says
+    anything about the lag readers see. Empty when the config is unavailable.
+    """
+    try:
+        config = client.admin.command("replSetGetConfig")["config"]
+    except (PyMongoError, NotImplementedError, KeyError):
+        return set()
+
+    return {
+        member["host"]
+        for member in config.get("members", [])
+        if member.get("hidden") or member.get("secondaryDelaySecs", member.get("slaveDelay", 0))
+    }
+
+
+def replication_lag(client: MongoClient) -> float | None:
+    """
+    Seconds the furthest-behind healthy secondary trails the primary.
+
+    Delayed and hidden members are left out (see ``lagging_members``). None
+    when the server is not a replica set or the status is unavailable (e.g.
+    missing privileges), in which case lag is not tracked at all.
+    """
+    try:
+        status = client.admin.command("replSetGetStatus")
+    except (PyMongoError, NotImplementedError):
+        return None
+
+    members = status.get("members", [])
+    excluded = lagging_members(client)
+    primary = next((m["optimeDate"] for m in members if m.get("stateStr") == "PRIMARY"), None)
+    secondaries = [
+        m["optimeDate"]
+        for m in members
+        if m.get("stateStr") == "SECONDARY" and m.get("name") not in excluded
+    ]
+    if primary is None or not secondaries:
+        return 0.0
+    return max(0.0, max((primary - optime).total_seconds() for optime in secondaries))
+
+
+def payload_bytes(records: List[Dict]) -> int:
+    """Estimated BSON size of ``records`` from an evenly spaced sample."""
+    if not records:
+        return 0
+    sample = records[:: max(1, len(records) // SIZE_SAMPLE)]
+    return sum(len(bson.encode(record)) for record in sample) * len(records) // len(sample)
+
+
+class BatchController:
+    """
+    Adaptive write batch size shared by the ingest and clean stages.
+
+    Every write reports its rows, latency and records. Per-row latency and
+    size are smoothed, and the next size is whichever of
+    ``target_seconds`` and ``max_bytes`` allows fewer rows, moving at most
+    2x per batch and clamped to ``[min_rows, max_rows]``. When ``lag``
+    reports a secondary more than ``max_lag_seconds`` behind, writes pause
+    (and the size halves) until it catches up. Safe to share between
+    writer threads: one of them polls the lag, outside the lock, while the
+    others wait for it to clear.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_rows: int,
+        max_rows: int,
+        target_seconds: float,
+        max_bytes: int,
+        label: str = "Batches",
+        lag: Callable[[], float | None] | None = None,
+        max_lag_seconds: float | None = None,
+        lag_check_seconds: float = 0.0,
+    ) -> None:
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.size = min(max(initial, min_rows), max_rows)
+        self.target_seconds = target_seconds
+        self.max_bytes = max_bytes
+        self.label = label
+        self.lag = lag if max_lag_seconds is not None else None
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_seconds = lag_check_seconds
+
+        self.row_seconds: float | None = None
+        self.row_bytes: float | None = None
+        self.sizes = [self.size]
+        self.throttled_seconds = 0.0
+        self._logged_size = self.size
+        self._last_lag_check = time.monotonic()
+        self._lock = threading.Lock()
+        # Set while writes may proceed; cleared while a writer waits out lag
+        self._caught_up = threading.Event()
+        self._caught_up.set()
+        self._checking_lag = False
+
+    def _smooth(self, previous: float | None, latest: float) -> float:
+        return latest if previous is None else SMOOTHING * latest + (1 - SMOOTHING) * previous
+
+    def record(self, rows: int, seconds: float, records: List[Dict] | None = None) -> None:
+        """Feed back one finished write and resize the next batch."""
+        if rows <= 0:
+            return
+
+        with self._lock:
+            self.row_seconds = self._smooth(self.row_seconds, seconds / rows)
+            if records:
+                self.row_bytes = self._smooth(self.row_bytes, payload_bytes(records) / len(records))
+
+            ideal = self.target_seconds / max(self.row_seconds, 1e-9)
+            if self.row_bytes:
+                ideal = min(ideal, self.max_bytes / self.row_bytes)
+
+            size = int(min(max(ideal, self.size / 2), self.size * 2))
+            self._resize(size, f"write {seconds:.2f}s for {rows:,} rows")
+            check_lag = self._lag_check_due()
+
+        # The lag poll and any pause run unlocked, so other writers can
+        # still record while they wait for the secondaries
+        if check_lag:
+            self._throttle()
+        else:
+            self._caught_up.wait()
+
+    def _lag_check_due(self) -> bool:
+        """Claim the next lag check for this writer; call with the lock held."""
+        if self.lag is None or self._checking_lag:
+            return False
+        if time.monotonic() - self._last_lag_check < self.lag_check_seconds:
+            return False
+        self._checking_lag = True
+        return True
+
+    def _resize(self, size: int, reason: str) -> None:
+        size = min(max(size, self.min_rows), self.max_rows)
+        if size == self.size:
+            return
+
+        self.size = size
+        self.sizes.append(size)
+        if abs(size - self._logged_size) >= LOG_CHANGE * self._logged_size:
+            self._logged_size = size
+            row_kb = f"{self.row_bytes / 1024:.2f} KB/row" if self.row_bytes else "size n/a"
+            logging.info(f"{self.label} | batch size {size:,} | {reason} | {row_kb}")
+
+    def _throttle(self) -> None:
+        try:
+            while True:
+                lag = self.lag()
+                with self._lock:
+                    self._last_lag_check = time.monotonic()
+                    if lag is None:
+                        logging.info(f"{self.label} | replication lag unavailable; not throttling")
+                        self.lag = None
+                        return
+                    if lag <= self.max_lag_seconds:
+                        return
+                    self._resize(self.size // 2, f"replication lag {lag:.1f}s")
+                    self.throttled_seconds += self.lag_check_seconds
+
+                self._caught_up.clear()
+                logging.warning(
+                    f"{self.label} | secondaries {lag:.1f}s behind; pausing writes "
+                    f"{self.lag_check_seconds:.1f}s"
+                )
+                time.sleep(self.lag_check_seconds)
+        finally:
+            with self._lock:
+                self._checking_lag = False
+            self._caught_up.set()
+
+    def summary(self) -> str:
+        return (
+            f"batch sizes {min(self.sizes):,}-{max(self.sizes):,} (last {self.size:,}) | "
+            f"throttled {self.throttled_seconds:,.1f}s"
+        )
+
+
+def batch_controller(client: MongoClient, initial: int, label: str = "Batches") -> BatchController:
+    """
+    A BatchController configured from ``pipeline_settings``.
+
+    With ``batch_sizing = "fixed"`` it always answers ``initial`` and never
+    throttles.
+    """
+    if pipeline_settings.batch_sizing == "fixed":
+        return BatchController(initial, initial, initial, 0.0, 0, label)
+
+    return BatchController(
+        initial,
+        pipeline_settings.batch_min_rows,
+        pipeline_settings.batch_max_rows,
+        pipeline_settings.batch_target_seconds,
+        int(pipeline_settings.batch_max_mb * 1024 * 1024),
+        label,
+        lag=lambda: replication_lag(client),
+        max_lag_seconds=pipeline_settings.max_replication_lag_seconds,
+        lag_check_seconds=pipeline_settings.replication_lag_check_seconds,
+    )
+
+
+def slices(records: List[Dict], controller: BatchController) -> Iterator[List[Dict]]:
+    """Split ``records`` into batches of the controller's size at each cut."""
+    start = 0
+    while start < len(records):
+        batch = records[start : start + controller.size]
+        start += len(batch)
+        yield batch
+
+
+def write_in_batches(
+    records: List[Dict],
+    write: Callable[[List[Dict]], Any],
+    controller: BatchController,
+) -> None:
+    """
+    Write ``records`` in batches of the controller's current size.
+
+    ``write`` is timed and fed back after every batch, so the size can
+    change within one parsed chunk.
+    """
+    for batch in slices(records, controller):
+        started = time.perf_counter()
+        write(batch)
+        controller.record(len(batch), time.perf_counter() - started, batch)
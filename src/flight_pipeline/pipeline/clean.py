@@ -1,22 +1,53 @@
 import logging
+import time
 from datetime import datetime
-from typing import Dict, List
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Tuple
 
-from pymongo import ASCENDING
+from pymongo import ASCENDING, UpdateOne
 from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
 from pydantic import ValidationError
 
-from flight_pipeline.config.settings import mongo_settings
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
 from flight_pipeline.db.mongo import get_database
 from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented, step
 from flight_pipeline.models.clean import CleanFlight
+from flight_pipeline.pipeline.batching import BatchController, batch_controller
+from flight_pipeline.pipeline.dimensions import DimensionCache, load_dimensions
+from flight_pipeline.pipeline.sampling import (
+    check_unsampled_append,
+    record_sample_design,
+    sample_raw_flights,
+)
+from flight_pipeline.pipeline.state import (
+    AGGREGATE_STAGE,
+    CLEAN_STAGE,
+    SAMPLE_STAGE,
+    advance_watermark,
+    get_watermark,
+    reset_watermark,
+)
+from flight_pipeline.pipeline.vectorized import transform_raw_batch
 
 
 BATCH_SIZE = 50_000
 MAX_RECORDS = 1_500_000
 
+DEDUP_KEY = (
+    "flight_date",
+    "airline",
+    "flight_number",
+    "origin_airport",
+    "destination_airport",
+)
+
+DUPLICATE_KEY_ERROR = 11000
+
 
-def transform_raw_flight(doc: Dict) -> Dict | None:
+def transform_raw_flight(doc: Dict, dimensions: DimensionCache | None = None) -> Dict | None:
     """Transform a raw flight document into a clean flight record."""
     try:
         is_cancelled = bool(doc.get("CANCELLED", 0))
@@ -34,16 +65,22 @@ def transform_raw_flight(doc: Dict) -> Dict | None:
             int(doc["DAY"]),
         )
 
+        airline = str(doc["AIRLINE"]).upper().strip()
+        origin = str(doc["ORIGIN_AIRPORT"]).upper().strip()
+        destination = str(doc["DESTINATION_AIRPORT"]).upper().strip()
+        enrichment = dimensions.enrich(airline, origin, destination) if dimensions else {}
+
         clean = CleanFlight(
     flight_date=flight_date,
-    airline=str(doc["AIRLINE"]).upper().strip(),
-    origin_airport=str(doc["ORIGIN_AIRPORT"]).upper().strip(),
-    destination_airport=str(doc["DESTINATION_AIRPORT"]).upper().strip(),
+    airline=airline,
+    origin_airport=origin,
+    destination_airport=destination,
     flight_number=str(doc.get("FLIGHT_NUMBER")),
     departure_delay=dep_delay,
     arrival_delay=arr_delay,
     is_delayed=(arr_delay is not None and arr_delay > 15),
     is_cancelled=is_cancelled,
+    **enrichment,
 )
 
 
@@ -53,61 +90,269 @@ def transform_raw_flight(doc: Dict) -> Dict | None:
         return None
 
 
-def run_clean_pipeline() -> None:
-    setup_logging()
-    db = get_database()
+def transform_rows(docs: List[Dict], dimensions: DimensionCache | None = None) -> List[Dict]:
+    """Transform a batch of raw documents one pydantic model at a time."""
+    records = []
+    for doc in docs:
+        cleaned = transform_raw_flight(doc, dimensions)
+        if cleaned:
+            # Keep the raw _id so every clean record traces back to its source
+            if "_id" in doc:
+                cleaned["_id"] = doc["_id"]
+            records.append(cleaned)
+    return records
 
-    raw = db[mongo_settings.raw_flights]
-    clean = db[mongo_settings.clean_flights]
 
-    # Clear for safe re-runs
-    clean.delete_many({})
+def transform_vectorized(docs: List[Dict], dimensions: DimensionCache | None = None) -> List[Dict]:
+    """Transform a batch of raw documents as columns, falling back per batch."""
+    cleaned = transform_raw_batch(docs, dimensions)
+    if cleaned is None:
+        return transform_rows(docs, dimensions)
+    return cleaned
+
+
+CLEAN_ENGINES: Dict[str, Callable[..., List[Dict]]] = {
+    "row": transform_rows,
+    "vectorized": transform_vectorized,
+}
+
+
+def clean_transform(engine: str, db: Database) -> Callable[[List[Dict]], List[Dict]]:
+    """An engine's batch transform, enriching flights from the dimension tables."""
+    return partial(CLEAN_ENGINES[engine], dimensions=load_dimensions(db))
+
+
+def dedup_records(records: List[Dict]) -> List[Dict]:
+    """Keep the first record of each dedup key within a batch."""
+    seen = set()
+    unique = []
+    for record in records:
+        key = tuple(record[field] for field in DEDUP_KEY)
+        if key not in seen:
+            seen.add(key)
+            unique.append(record)
+    return unique
+
 
-    cursor = raw.find({}, no_cursor_timeout=True).limit(MAX_RECORDS)
+def insert_clean_batch(clean: Collection, records: List[Dict]) -> int:
+    """
+    Insert clean records unordered, skipping flights that are already stored.
 
-    buffer: List[Dict] = []
+    With the dedup index in place a duplicate only fails its own insert, so
+    re-runs and overlapping batches write each flight once.
+    """
+    if not records:
+        return 0
+
+    try:
+        return len(clean.insert_many(records, ordered=False).inserted_ids)
+    except BulkWriteError as exc:
+        errors = exc.details["writeErrors"]
+        if any(error["code"] != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        return exc.details["nInserted"]
+
+
+def upsert_clean_batch(clean: Collection, records: List[Dict]) -> int:
+    """Upsert clean records against the dedup key."""
+    operations = []
+    for record in records:
+        fields = dict(record)
+        update: Dict = {"$set": fields}
+        if "_id" in fields:
+            # An existing flight keeps the _id it was first cleaned with
+            update["$setOnInsert"] = {"_id": fields.pop("_id")}
+
+        key = {field: fields[field] for field in DEDUP_KEY}
+        operations.append(UpdateOne(key, update, upsert=True))
+
+    if not operations:
+        return 0
+
+    result = clean.bulk_write(operations, ordered=False)
+    return result.upserted_count + result.matched_count
+
+
+def clean_cursor(
+    cursor: Iterable[Dict],
+    clean: Collection,
+    transform_batch: Callable[[List[Dict]], List[Dict]],
+    label: str = "Clean",
+    write_batch: Callable[[Collection, List[Dict]], int] = insert_clean_batch,
+    on_batch: Callable[[List[Dict]], None] | None = None,
+    batches: BatchController | None = None,
+) -> Tuple[int, int, int]:
+    """
+    Transform raw documents from a cursor and write them in batches.
+
+    Each batch is deduplicated in memory before it is written; records the
+    writer skips as already stored count as duplicates too. Returns
+    ``(processed, inserted, duplicates)``. ``on_batch`` receives each raw
+    batch once its clean records are written. Batches are cut at
+    ``batches.size``, which adapts to each write's latency and payload.
+    """
+    if batches is None:
+        batches = batch_controller(clean.database.client, BATCH_SIZE, label)
+
+    batch: List[Dict] = []
     processed = 0
     inserted = 0
+    duplicates = 0
+
+    def flush() -> None:
+        nonlocal inserted, duplicates
+        records = transform_batch(batch)
+        unique = dedup_records(records)
+
+        started = time.perf_counter()
+        written = write_batch(clean, unique)
+        batches.record(len(unique), time.perf_counter() - started, unique)
+
+        inserted += written
+        duplicates += len(records) - written
+        if on_batch:
+            on_batch(batch)
+        batch.clear()
 
     for doc in cursor:
         processed += 1
-        cleaned = transform_raw_flight(doc)
-
-        if cleaned:
-            buffer.append(cleaned)
+        batch.append(doc)
 
-        if len(buffer) >= BATCH_SIZE:
-            clean.insert_many(buffer)
-            inserted += len(buffer)
-            buffer.clear()
+        if len(batch) >= batches.size:
+            flush()
 
             logging.info(
-                f"Processed {processed:,} | Inserted {inserted:,}"
+                f"{label} | Processed {processed:,} | Inserted {inserted:,} | "
+                f"Duplicates dropped {duplicates:,}"
             )
 
-    if buffer:
-        clean.insert_many(buffer)
-        inserted += len(buffer)
+    if batch:
+        flush()
+
+    logging.info(f"{label} | {batches.summary()}")
+    return processed, inserted, duplicates
+
+
+def create_dedup_index(clean: Collection) -> None:
+    """Create the composite unique key that deduplicates clean flights."""
+    clean.create_index(
+        [(field, ASCENDING) for field in DEDUP_KEY],
+        unique=True,
+        background=True,
+    )
+
+    logging.info("Deduplication index created")
+
+
+@instrumented("clean")
+def run_clean_pipeline(
+    engine: str | None = None,
+    io: str | None = None,
+    sample: str | None = None,
+) -> None:
+    setup_logging()
+    db = get_database()
+
+    engine = engine or pipeline_settings.clean_engine
+    io = io or pipeline_settings.clean_io
+    sample = sample or pipeline_settings.clean_sample
+    if io == "async" and sample != "head":
+        raise ValueError(f"The {sample!r} sample needs clean_io='sync'")
+
+    transform_batch = clean_transform(engine, db)
+    logging.info(f"Clean engine: {engine} | I/O: {io} | sample: {sample}")
+
+    raw = db[mongo_settings.raw_flights]
+    clean = db[mongo_settings.clean_flights]
+
+    # Clear for safe re-runs
+    clean.delete_many({})
+    reset_watermark(db, CLEAN_STAGE)
+    # Gold partials built on the old clean layer no longer apply
+    reset_watermark(db, AGGREGATE_STAGE)
+    # Nor does the old sample design, which is recorded again at the end
+    reset_watermark(db, SAMPLE_STAGE)
+
+    # Built on the empty collection so duplicates are rejected as they arrive
+    create_dedup_index(clean)
+
+    def record_progress(batch: List[Dict]) -> None:
+        advance_watermark(db, CLEAN_STAGE, max(doc["_id"] for doc in batch))
+
+    if io == "async":
+        # Imported here: the async driver is optional
+        from flight_pipeline.pipeline.async_io import clean_raw_flights_async
+
+        with step(f"clean_{engine}_async") as timer:
+            processed, inserted, duplicates = clean_raw_flights_async(
+                transform_batch, on_batch=record_progress
+            )
+            timer.rows = processed
+        sampler = None
+    else:
+        cursor, sampler = sample_raw_flights(raw, sample, MAX_RECORDS)
+        with step(f"clean_{engine}") as timer:
+            processed, inserted, duplicates = clean_cursor(
+                cursor, clean, transform_batch, on_batch=record_progress
+            )
+            timer.rows = processed
+
+    record_sample_design(db, sample, sampler, processed)
 
     logging.info(
-        f"Clean layer completed | processed {processed:,} | inserted {inserted:,}"
+        f"Clean layer completed | processed {processed:,} | inserted {inserted:,} | "
+        f"duplicates dropped {duplicates:,}"
     )
 
-    # Deduplication index
-    clean.create_index(
-    [
-        ("flight_date", ASCENDING),
-        ("airline", ASCENDING),
-        ("flight_number", ASCENDING),
-        ("origin_airport", ASCENDING),
-        ("destination_airport", ASCENDING),
-    ],
-    unique=True,
-    background=True,
-)
 
+@instrumented("incremental_clean")
+def run_incremental_clean(engine: str | None = None) -> None:
+    """
+    Clean only raw flights added since the last run and upsert them.
 
-    logging.info("Deduplication index created")
+    Like a full rebuild, a run cleans at most ``MAX_RECORDS`` raw flights.
+    The watermark advances batch by batch, so a larger backlog, such as the
+    raw flights a capped rebuild left behind, is worked off over several runs.
+    """
+    setup_logging()
+    db = get_database()
+
+    engine = engine or pipeline_settings.clean_engine
+    check_unsampled_append(db, "an incremental clean")
+    transform_batch = clean_transform(engine, db)
+
+    raw = db[mongo_settings.raw_flights]
+    clean = db[mongo_settings.clean_flights]
+
+    # Upserts look flights up by the dedup key, so it must be indexed first
+    create_dedup_index(clean)
+
+    watermark = get_watermark(db, CLEAN_STAGE)
+    query = {"_id": {"$gt": watermark}} if watermark is not None else {}
+    logging.info(f"Incremental clean | engine {engine} | watermark {watermark}")
+
+    def record_progress(batch: List[Dict]) -> None:
+        # Batches arrive in _id order, so the last one is the new high mark
+        advance_watermark(db, CLEAN_STAGE, batch[-1]["_id"])
+
+    cursor = raw.find(query, no_cursor_timeout=True).sort("_id", ASCENDING).limit(MAX_RECORDS)
+    with step(f"upsert_{engine}") as timer:
+        processed, written, duplicates = clean_cursor(
+            cursor,
+            clean,
+            transform_batch,
+            label="Incremental clean",
+            write_batch=upsert_clean_batch,
+            on_batch=record_progress,
+        )
+        timer.rows = processed
+
+    logging.info(
+        f"Incremental clean completed | processed {processed:,} | upserted {written:,} | "
+        f"duplicates dropped {duplicates:,}"
+    )
+    if processed == MAX_RECORDS:
+        logging.info(f"Incremental clean | capped at {MAX_RECORDS:,} raw flights; rerun to continue")
 
 
 if __name__ == "__main__":
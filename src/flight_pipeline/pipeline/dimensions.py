@@ -0,0 +1,131 @@
+import logging
+import math
+import sys
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings
+
+
+class Airport(NamedTuple):
+    name: str | None
+    city: str | None
+    state: str | None
+    latitude: float | None
+    longitude: float | None
+
+
+def _code(value: object) -> str:
+    # Same normalization the clean transform applies to flight codes
+    return sys.intern(str(value).upper().strip())
+
+
+def _text(value: object) -> str | None:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return sys.intern(str(value))
+
+
+def _coordinate(value: object) -> float | None:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+class DimensionCache:
+    """
+    Read-only airline and airport lookups for enriching clean flights.
+
+    Loaded once per stage run from raw_airlines and raw_airports. Codes and
+    repeated strings are interned, and ``known_airports`` is a frozenset, so
+    telling an unknown code (e.g. the numeric codes in part of the Kaggle
+    data) apart costs one hash probe.
+    """
+
+    def __init__(self, airlines: Dict[str, str | None], airports: Dict[str, Airport]) -> None:
+        self.airlines = airlines
+        self.airports = airports
+        self.known_airports = frozenset(airports)
+
+    @classmethod
+    def from_records(cls, airlines: List[Dict], airports: List[Dict]) -> "DimensionCache":
+        return cls(
+            {_code(row["IATA_CODE"]): _text(row.get("AIRLINE")) for row in airlines},
+            {
+                _code(row["IATA_CODE"]): Airport(
+                    _text(row.get("AIRPORT")),
+                    _text(row.get("CITY")),
+                    _text(row.get("STATE")),
+                    _coordinate(row.get("LATITUDE")),
+                    _coordinate(row.get("LONGITUDE")),
+                )
+                for row in airports
+            },
+        )
+
+    def airline_name(self, code: str) -> str | None:
+        return self.airlines.get(code)
+
+    def airport(self, code: str) -> Airport | None:
+        if code not in self.known_airports:
+            return None
+        return self.airports[code]
+
+    def enrich(self, airline: str, origin: str, destination: str) -> Dict:
+        """The CleanFlight enrichment fields for one flight."""
+        origin_airport = self.airport(origin)
+        destination_airport = self.airport(destination)
+        return {
+            "airline_name": self.airlines.get(airline),
+            "origin_city": origin_airport.city if origin_airport else None,
+            "origin_state": origin_airport.state if origin_airport else None,
+            "destination_city": destination_airport.city if destination_airport else None,
+            "destination_state": destination_airport.state if destination_airport else None,
+            "unknown_airport": origin_airport is None or destination_airport is None,
+        }
+
+    def airline_names(self, codes: np.ndarray) -> np.ndarray:
+        """``airline_name`` for an array of codes, one lookup per distinct code."""
+        index, uniques = pd.factorize(codes, use_na_sentinel=False)
+        names = np.array([self.airlines.get(code) for code in uniques], dtype=object)
+        return names[index]
+
+    def airport_places(self, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(city, state, known)`` arrays for an array of airport codes."""
+        index, uniques = pd.factorize(codes, use_na_sentinel=False)
+        known = np.array([code in self.known_airports for code in uniques], dtype=bool)
+        cities = np.array(
+            [self.airports[code].city if ok else None for code, ok in zip(uniques, known)],
+            dtype=object,
+        )
+        states = np.array(
+            [self.airports[code].state if ok else None for code, ok in zip(uniques, known)],
+            dtype=object,
+        )
+        return cities[index], states[index], known[index]
+
+
+def load_dimensions(db: Database) -> DimensionCache | None:
+    """
+    Load the airline and airport tables into a DimensionCache.
+
+    Returns None (and flights are not enriched) until both tables have been
+    ingested, so an empty table never marks every airport as unknown.
+    """
+    airlines = list(db[mongo_settings.raw_airlines].find({}, {"_id": 0}))
+    airports = list(db[mongo_settings.raw_airports].find({}, {"_id": 0}))
+    if not airlines or not airports:
+        logging.warning("Airline/airport tables are empty; flights will not be enriched")
+        return None
+
+    dimensions = DimensionCache.from_records(airlines, airports)
+    logging.info(
+        f"Dimension cache loaded | {len(dimensions.airlines)} airlines | "
+        f"{len(dimensions.airports)} airports"
+    )
+    return dimensions
@@ -0,0 +1,102 @@
+from typing import Dict, List
+
+import numpy as np
+
+
+PERCENTILES = np.arange(1, 100) / 100
+OUTLIER_SAMPLE_SIZE = 200
+WHISKER_IQR = 1.5
+
+
+def weighted_quantile(values: np.ndarray, counts: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Quantiles of a value histogram, matching ``pandas.Series.quantile``.
+
+    ``values`` must be sorted ascending; ``counts`` holds how many times each
+    one occurs. Uses the same linear interpolation as pandas on the expanded
+    data, without expanding it.
+    """
+    cumulative = np.cumsum(counts)
+    position = (cumulative[-1] - 1) * np.asarray(q, dtype=float)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+
+    lower_value = values[np.searchsorted(cumulative, lower, side="right")]
+    upper_value = values[np.searchsorted(cumulative, upper, side="right")]
+    return lower_value + (upper_value - lower_value) * (position - lower)
+
+
+def box_stats(values: np.ndarray, counts: np.ndarray) -> Dict:
+    """Quartiles, whisker fences and outliers of a sorted value histogram."""
+    q1, median, q3 = weighted_quantile(values, counts, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+
+    # Whiskers end at the most extreme observations within 1.5 IQR
+    inside = (values >= q1 - WHISKER_IQR * iqr) & (values <= q3 + WHISKER_IQR * iqr)
+    lower_fence = values[inside].min()
+    upper_fence = values[inside].max()
+
+    outliers = np.flatnonzero(~inside)
+    if len(outliers) > OUTLIER_SAMPLE_SIZE:
+        # Evenly spaced sample that always keeps the most extreme values
+        picks = np.linspace(0, len(outliers) - 1, OUTLIER_SAMPLE_SIZE).round()
+        outliers = outliers[np.unique(picks.astype(np.int64))]
+
+    return {
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lower_fence": float(lower_fence),
+        "upper_fence": float(upper_fence),
+        "outliers": [
+            {"arrival_delay": float(values[i]), "flights": int(counts[i])}
+            for i in outliers
+        ],
+    }
+
+
+def build_delay_distribution(histogram: List[Dict]) -> List[Dict]:
+    """
+    Turn (airline, arrival_delay) -> flights counts into per-airline stats.
+
+    ``percentiles`` (p1..p99) describe the raw delays. The box statistics are
+    computed on delays capped at the 99th percentile of all airlines, exactly
+    as the dashboard box plot draws them.
+    """
+    if not histogram:
+        return []
+
+    airlines = np.array([row["_id"]["airline"] for row in histogram], dtype=object)
+    delays = np.array([row["_id"]["arrival_delay"] for row in histogram], dtype=float)
+    flights = np.array([row["flights"] for row in histogram], dtype=np.int64)
+
+    order = np.argsort(delays, kind="stable")
+    airlines, delays, flights = airlines[order], delays[order], flights[order]
+
+    all_delays, inverse = np.unique(delays, return_inverse=True)
+    all_flights = np.bincount(inverse, weights=flights).astype(np.int64)
+    cap = float(weighted_quantile(all_delays, all_flights, [0.99])[0])
+
+    totals = {airline: int(flights[airlines == airline].sum()) for airline in set(airlines)}
+    ranked = sorted(totals, key=lambda airline: (-totals[airline], airline))
+
+    results = []
+    for rank, airline in enumerate(ranked, start=1):
+        mask = airlines == airline
+        values, counts = delays[mask], flights[mask]
+
+        capped, capped_inverse = np.unique(np.minimum(values, cap), return_inverse=True)
+        capped_counts = np.bincount(capped_inverse, weights=counts).astype(np.int64)
+
+        results.append(
+            {
+                "airline": airline,
+                "delayed_flights": totals[airline],
+                "volume_rank": rank,
+                "percentiles": weighted_quantile(values, counts, PERCENTILES).tolist(),
+                "cap": cap,
+                **box_stats(capped, capped_counts),
+            }
+        )
+
+    return results
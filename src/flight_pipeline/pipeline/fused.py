@@ -0,0 +1,147 @@
+import logging
+import time
+
+from bson import ObjectId
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.mongo import get_database
+from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented
+from flight_pipeline.pipeline.clean import (
+    MAX_RECORDS,
+    clean_transform,
+    create_dedup_index,
+    dedup_records,
+    insert_clean_batch,
+)
+from flight_pipeline.pipeline.ingest import (
+    CLEAN_INPUT_COLUMNS,
+    FLIGHT_CHUNK_SIZE,
+    RAW_DATA_DIR,
+    WriterPool,
+    ingest_small_csv,
+    read_typed_csv_chunks,
+)
+from flight_pipeline.pipeline.sampling import record_sample_design
+from flight_pipeline.pipeline.state import (
+    AGGREGATE_STAGE,
+    CLEAN_STAGE,
+    SAMPLE_STAGE,
+    advance_watermark,
+    reset_watermark,
+)
+
+
+@instrumented("fused_ingestion")
+def run_fused_ingestion(
+    archive: str | None = None,
+    engine: str | None = None,
+) -> None:
+    """
+    Stream flights.csv straight through the clean transform into clean_flights.
+
+    Skips the write-then-read round trip through raw_flights. With
+    ``archive="async"`` raw rows are still written to raw_flights by
+    background writer threads; with ``archive="none"`` they are not kept and
+    only the columns the clean stage needs are parsed. Either way the previous
+    raw load is cleared, so an incremental clean never re-reads it.
+    """
+    setup_logging()
+    db = get_database()
+
+    archive = archive or pipeline_settings.fused_archive
+    engine = engine or pipeline_settings.clean_engine
+
+    raw_flights = db[mongo_settings.raw_flights]
+    raw_airlines = db[mongo_settings.raw_airlines]
+    raw_airports = db[mongo_settings.raw_airports]
+    clean = db[mongo_settings.clean_flights]
+
+    # Clear existing data (safe for re-runs). raw_flights goes too: kept
+    # behind a reset clean watermark it would all look newly ingested
+    raw_flights.delete_many({})
+    raw_airlines.delete_many({})
+    raw_airports.delete_many({})
+    clean.delete_many({})
+    reset_watermark(db, CLEAN_STAGE)
+    reset_watermark(db, AGGREGATE_STAGE)
+    reset_watermark(db, SAMPLE_STAGE)
+
+    # Duplicates are rejected as they arrive instead of failing an index
+    # build after the load
+    create_dedup_index(clean)
+
+    ingest_small_csv(RAW_DATA_DIR / "airlines.csv", raw_airlines)
+    ingest_small_csv(RAW_DATA_DIR / "airports.csv", raw_airports)
+    transform_batch = clean_transform(engine, db)
+
+    pool = None
+    usecols = CLEAN_INPUT_COLUMNS
+    if archive == "async":
+        pool = WriterPool(
+            raw_flights,
+            pipeline_settings.ingest_writers,
+            pipeline_settings.ingest_queue_size,
+        )
+        usecols = pipeline_settings.ingest_usecols
+
+    logging.info(f"Fused ingestion | engine {engine} | raw archive {archive}")
+
+    processed = 0
+    inserted = 0
+    duplicates = 0
+    last_id = None
+    started = time.perf_counter()
+
+    chunks = read_typed_csv_chunks(
+        RAW_DATA_DIR / "flights.csv",
+        FLIGHT_CHUNK_SIZE,
+        usecols,
+        pipeline_settings.ingest_parser,
+    )
+    try:
+        for chunk in chunks:
+            # Same sample as the two-stage path: the first MAX_RECORDS rows
+            if processed >= MAX_RECORDS and pool is None:
+                break
+
+            records = chunk.to_dict(orient="records")
+
+            if pool is not None:
+                # One _id per row, shared by the raw archive and its clean record
+                for record in records:
+                    record["_id"] = ObjectId()
+                pool.put(records)
+
+            sample = records[: max(MAX_RECORDS - processed, 0)]
+            if sample:
+                cleaned = transform_batch(sample)
+                written = insert_clean_batch(clean, dedup_records(cleaned))
+                inserted += written
+                duplicates += len(cleaned) - written
+                processed += len(sample)
+                if pool is not None:
+                    last_id = sample[-1]["_id"]
+
+            logging.info(f"Fused | Processed {processed:,} | Inserted {inserted:,}")
+    finally:
+        if pool is not None:
+            pool.close()
+
+    # Only once every queued raw row is archived: a watermark past rows the
+    # archive lost would hide them from incremental cleans
+    if last_id is not None:
+        advance_watermark(db, CLEAN_STAGE, last_id)
+
+    # The first MAX_RECORDS rows of the file, like the two-stage head sample
+    record_sample_design(db, "head", None, processed)
+
+    elapsed = time.perf_counter() - started
+    logging.info(
+        f"Fused ingestion completed | processed {processed:,} | inserted {inserted:,} | "
+        f"duplicates dropped {duplicates:,} | {processed / elapsed:,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    run_fused_ingestion()
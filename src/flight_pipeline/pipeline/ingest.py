@@ -1,24 +1,270 @@
 import logging
+import time
 from pathlib import Path
-from typing import Iterator
+from queue import Queue
+from threading import Thread
+from typing import Dict, Iterator, List
 
 import pandas as pd
 from pymongo.collection import Collection
 
-from flight_pipeline.config.settings import mongo_settings
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
 from flight_pipeline.db.mongo import get_database
 from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented, step
+from flight_pipeline.pipeline.batching import (
+    BatchController,
+    batch_controller,
+    slices,
+    write_in_batches,
+)
 
 
 RAW_DATA_DIR = Path("data/raw")
 FLIGHT_CHUNK_SIZE = 100_000
 
+# Explicit flights.csv types, so chunks are not re-inferred (or inferred
+# differently) one by one. Nullable numeric columns stay float64 so missing
+# values keep ingesting as NaN.
+FLIGHT_DTYPES = {
+    "YEAR": "int16",
+    "MONTH": "int8",
+    "DAY": "int8",
+    "DAY_OF_WEEK": "int8",
+    "AIRLINE": "str",
+    "FLIGHT_NUMBER": "int32",
+    "TAIL_NUMBER": "str",
+    "ORIGIN_AIRPORT": "str",
+    "DESTINATION_AIRPORT": "str",
+    "SCHEDULED_DEPARTURE": "int16",
+    "DEPARTURE_TIME": "float64",
+    "DEPARTURE_DELAY": "float64",
+    "TAXI_OUT": "float64",
+    "WHEELS_OFF": "float64",
+    "SCHEDULED_TIME": "float64",
+    "ELAPSED_TIME": "float64",
+    "AIR_TIME": "float64",
+    "DISTANCE": "int32",
+    "WHEELS_ON": "float64",
+    "TAXI_IN": "float64",
+    "SCHEDULED_ARRIVAL": "int16",
+    "ARRIVAL_TIME": "float64",
+    "ARRIVAL_DELAY": "float64",
+    "DIVERTED": "int8",
+    "CANCELLED": "int8",
+    "CANCELLATION_REASON": "str",
+    "AIR_SYSTEM_DELAY": "float64",
+    "SECURITY_DELAY": "float64",
+    "AIRLINE_DELAY": "float64",
+    "LATE_AIRCRAFT_DELAY": "float64",
+    "WEATHER_DELAY": "float64",
+}
+
+# The raw fields the clean stage reads, for a lean ``ingest_usecols``
+CLEAN_INPUT_COLUMNS = [
+    "YEAR",
+    "MONTH",
+    "DAY",
+    "AIRLINE",
+    "FLIGHT_NUMBER",
+    "ORIGIN_AIRPORT",
+    "DESTINATION_AIRPORT",
+    "DEPARTURE_DELAY",
+    "ARRIVAL_DELAY",
+    "CANCELLED",
+]
+
+# Average flights.csv row is ~150 bytes; pyarrow reads by block size, so
+# chunk sizes are converted to bytes with this
+ARROW_ROW_BYTES = 160
+
 
 def read_csv_in_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
     """Yield DataFrames from a CSV file in chunks."""
     return pd.read_csv(path, chunksize=chunk_size)
 
 
+def read_typed_csv_chunks(
+    path: Path,
+    chunk_size: int,
+    usecols: List[str] | None = None,
+    parser: str = "auto",
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield typed DataFrames from flights.csv, parsing only ``usecols``.
+
+    Uses pyarrow's multithreaded streaming reader when it is installed (or
+    requested), otherwise the pandas C parser with the same types. pyarrow
+    cuts blocks by bytes, so its chunks hold about ``chunk_size`` rows.
+    """
+    if parser in ("auto", "pyarrow"):
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError:
+            if parser == "pyarrow":
+                raise
+        else:
+            arrow_types = {
+                column: pa.string() if dtype == "str" else pa.from_numpy_dtype(dtype)
+                for column, dtype in FLIGHT_DTYPES.items()
+            }
+            reader = pa_csv.open_csv(
+                path,
+                read_options=pa_csv.ReadOptions(block_size=chunk_size * ARROW_ROW_BYTES),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=arrow_types,
+                    include_columns=usecols,
+                    strings_can_be_null=True,
+                ),
+            )
+            for batch in reader:
+                yield batch.to_pandas()
+            return
+
+    yield from pd.read_csv(
+        path, chunksize=chunk_size, dtype=FLIGHT_DTYPES, usecols=usecols
+    )
+
+
+def _rate(rows: int, seconds: float) -> str:
+    return f"{rows / seconds:,.0f} rows/s" if seconds > 0 else "n/a"
+
+
+class WriterPool:
+    """
+    Writer threads draining a bounded queue of ``insert_many`` batches.
+
+    A full queue blocks ``put``, so memory stays bounded when writes fall
+    behind. The first write error is re-raised by ``put`` or ``close``.
+    Every write is fed back to ``controller``, when given.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        writers: int,
+        queue_size: int,
+        controller: BatchController | None = None,
+    ) -> None:
+        self.collection = collection
+        self.controller = controller
+        self.batches: Queue = Queue(maxsize=queue_size)
+        self.errors: List[BaseException] = []
+        self.write_seconds = [0.0] * writers
+        self.threads = [
+            Thread(target=self._write, args=(slot,), daemon=True)
+            for slot in range(writers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _write(self, slot: int) -> None:
+        while True:
+            records = self.batches.get()
+            try:
+                if records is None:
+                    return
+                # After a failure, keep draining so producers never block
+                if self.errors:
+                    continue
+
+                start = time.perf_counter()
+                self.collection.insert_many(records, ordered=False)
+                seconds = time.perf_counter() - start
+                self.write_seconds[slot] += seconds
+                if self.controller:
+                    self.controller.record(len(records), seconds, records)
+            except Exception as exc:
+                self.errors.append(exc)
+            finally:
+                self.batches.task_done()
+
+    def put(self, records: List[Dict]) -> None:
+        if self.errors:
+            raise self.errors[0]
+        self.batches.put(records)
+
+    def close(self) -> float:
+        """Wait for queued batches; return the mean busy seconds per writer."""
+        for _ in self.threads:
+            self.batches.put(None)
+        for thread in self.threads:
+            thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+        return sum(self.write_seconds) / len(self.threads)
+
+
+def ingest_large_csv_parallel(
+    path: Path,
+    collection: Collection,
+    writers: int | None = None,
+    usecols: List[str] | None = None,
+) -> int:
+    """
+    Ingest large CSV files with parsing and writing overlapped.
+
+    The main thread parses typed chunks while a pool of writer threads drains
+    them with unordered bulk inserts.
+    """
+    writers = writers or pipeline_settings.ingest_writers
+    if usecols is None:
+        usecols = pipeline_settings.ingest_usecols
+
+    logging.info(
+        f"Starting parallel ingestion for {path.name} | {writers} writers"
+    )
+
+    batches = batch_controller(collection.database.client, FLIGHT_CHUNK_SIZE, path.name)
+    pool = WriterPool(collection, writers, pipeline_settings.ingest_queue_size, batches)
+
+    parse_seconds = 0.0
+    convert_seconds = 0.0
+    total_queued = 0
+    started = time.perf_counter()
+
+    chunks = read_typed_csv_chunks(
+        path, FLIGHT_CHUNK_SIZE, usecols, pipeline_settings.ingest_parser
+    )
+    i = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            parse_seconds += time.perf_counter() - start
+            if chunk is None:
+                break
+
+            i += 1
+
+            start = time.perf_counter()
+            records: List[Dict] = chunk.to_dict(orient="records")
+            convert_seconds += time.perf_counter() - start
+
+            for batch in slices(records, batches):
+                pool.put(batch)
+            total_queued += len(records)
+            logging.info(
+                f"{path.name} | chunk {i} | queued {len(records)} | total {total_queued}"
+            )
+    finally:
+        # Stops the writer threads even when parsing fails
+        write_seconds = pool.close()
+
+    elapsed = time.perf_counter() - started
+    logging.info(
+        f"Finished ingestion for {path.name} | total rows: {total_queued} | "
+        f"parse {_rate(total_queued, parse_seconds)} | "
+        f"convert {_rate(total_queued, convert_seconds)} | "
+        f"write {_rate(total_queued, write_seconds)} "
+        f"({writers} writers) | end-to-end {_rate(total_queued, elapsed)} | "
+        f"{batches.summary()}"
+    )
+    return total_queued
+
+
 def ingest_small_csv(path: Path, collection: Collection) -> None:
     """Ingest small CSV files (airlines, airports) in one shot."""
     logging.info(f"Ingesting {path.name}")
@@ -31,27 +277,35 @@ def ingest_small_csv(path: Path, collection: Collection) -> None:
     logging.info(f"Inserted {len(records)} records into {collection.name}")
 
 
-def ingest_large_csv(path: Path, collection: Collection) -> None:
+def ingest_large_csv(path: Path, collection: Collection) -> int:
     """Ingest large CSV files (flights) using chunked ingestion."""
     logging.info(f"Starting chunked ingestion for {path.name}")
 
+    batches = batch_controller(collection.database.client, FLIGHT_CHUNK_SIZE, path.name)
     total_inserted = 0
     for i, chunk in enumerate(read_csv_in_chunks(path, FLIGHT_CHUNK_SIZE), start=1):
         records = chunk.to_dict(orient="records")
-        collection.insert_many(records)
+        write_in_batches(records, collection.insert_many, batches)
 
         total_inserted += len(records)
         logging.info(
             f"{path.name} | chunk {i} | inserted {len(records)} | total {total_inserted}"
         )
 
-    logging.info(f"Finished ingestion for {path.name} | total rows: {total_inserted}")
+    logging.info(
+        f"Finished ingestion for {path.name} | total rows: {total_inserted} | "
+        f"{batches.summary()}"
+    )
+    return total_inserted
 
 
-def run_raw_ingestion() -> None:
+@instrumented("ingest")
+def run_raw_ingestion(engine: str | None = None) -> None:
     setup_logging()
     db = get_database()
 
+    engine = engine or pipeline_settings.ingest_engine
+
     # Collections
     raw_flights = db[mongo_settings.raw_flights]
     raw_airlines = db[mongo_settings.raw_airlines]
@@ -62,9 +316,20 @@ def run_raw_ingestion() -> None:
     raw_airlines.delete_many({})
     raw_airports.delete_many({})
 
-    ingest_small_csv(RAW_DATA_DIR / "airlines.csv", raw_airlines)
-    ingest_small_csv(RAW_DATA_DIR / "airports.csv", raw_airports)
-    ingest_large_csv(RAW_DATA_DIR / "flights.csv", raw_flights)
+    with step("small_csvs"):
+        ingest_small_csv(RAW_DATA_DIR / "airlines.csv", raw_airlines)
+        ingest_small_csv(RAW_DATA_DIR / "airports.csv", raw_airports)
+
+    with step(f"flights_{engine}") as timer:
+        if engine == "parallel":
+            timer.rows = ingest_large_csv_parallel(RAW_DATA_DIR / "flights.csv", raw_flights)
+        elif engine == "async":
+            # Imported here: the async driver is optional
+            from flight_pipeline.pipeline.async_io import ingest_flights_async
+
+            timer.rows = ingest_flights_async(RAW_DATA_DIR / "flights.csv")
+        else:
+            timer.rows = ingest_large_csv(RAW_DATA_DIR / "flights.csv", raw_flights)
 
     logging.info("Raw ingestion completed successfully")
 
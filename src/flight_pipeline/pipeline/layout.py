@@ -0,0 +1,87 @@
+import logging
+import re
+from typing import List
+
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.mongo import get_database
+from flight_pipeline.db.partitions import (
+    create_query_indexes,
+    month_collection_name,
+    month_ranges,
+)
+from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented, step
+from flight_pipeline.pipeline.state import (
+    CLEAN_STAGE,
+    LAYOUT_STAGE,
+    get_watermark,
+    reset_watermark,
+    update_state,
+)
+
+
+def month_collections(db: Database) -> List[str]:
+    """Names of the existing month partitions of clean_flights."""
+    pattern = re.compile(rf"^{re.escape(mongo_settings.clean_flights)}_\d{{4}}_\d{{2}}$")
+    return sorted(name for name in db.list_collection_names() if pattern.match(name))
+
+
+def build_month_partitions(db: Database) -> List[List[int]]:
+    """
+    Copy clean_flights into one indexed collection per month.
+
+    Each month is written with ``$out``, which swaps the new collection in
+    atomically and keeps the indexes of the one it replaces, so readers never
+    see a half-built month. Partitions of months that no longer have flights
+    are dropped. Returns the ``[year, month]`` pairs built.
+    """
+    clean = db[mongo_settings.clean_flights]
+
+    months = []
+    for year, month, dates in month_ranges(clean):
+        name = month_collection_name(year, month)
+        clean.aggregate([{"$match": {"flight_date": dates}}, {"$out": name}])
+        create_query_indexes(db[name])
+        months.append([year, month])
+        logging.info(f"Month partition {name} built")
+
+    built = {month_collection_name(year, month) for year, month in months}
+    for name in month_collections(db):
+        if name not in built:
+            db.drop_collection(name)
+
+    return months
+
+
+@instrumented("layout")
+def run_layout(layout: str | None = None) -> None:
+    """
+    Index clean_flights for date-range queries and, with the ``monthly``
+    layout, rebuild its month partitions.
+    """
+    setup_logging()
+    db = get_database()
+
+    layout = layout or pipeline_settings.clean_layout
+    # Read first: if clean moves on mid-build the partitions count as stale
+    watermark = get_watermark(db, CLEAN_STAGE)
+
+    with step("query_indexes"):
+        create_query_indexes(db[mongo_settings.clean_flights])
+
+    if layout == "monthly":
+        with step("month_partitions"):
+            months = build_month_partitions(db)
+        update_state(db, LAYOUT_STAGE, clean_watermark=watermark, months=months)
+        logging.info(f"Layout completed | {len(months)} month partitions")
+    else:
+        reset_watermark(db, LAYOUT_STAGE)
+        for name in month_collections(db):
+            db.drop_collection(name)
+        logging.info("Layout completed | flat clean_flights")
+
+
+if __name__ == "__main__":
+    run_layout()
@@ -0,0 +1,169 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Dict, List
+
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.mongo import get_database
+from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented, step
+from flight_pipeline.pipeline.clean import (
+    MAX_RECORDS,
+    clean_cursor,
+    clean_transform,
+    create_dedup_index,
+)
+from flight_pipeline.pipeline.sampling import record_sample_design
+from flight_pipeline.pipeline.state import (
+    AGGREGATE_STAGE,
+    CLEAN_STAGE,
+    SAMPLE_STAGE,
+    advance_watermark,
+    reset_watermark,
+)
+
+
+def plan_id_partitions(raw: Collection, partitions: int) -> List[Dict]:
+    """Split the first MAX_RECORDS raw flights into disjoint _id ranges."""
+    pipeline = [
+        {"$sort": {"_id": ASCENDING}},
+        {"$limit": MAX_RECORDS},
+        {"$project": {"_id": 1}},
+        {"$bucketAuto": {"groupBy": "$_id", "buckets": partitions}},
+    ]
+    buckets = list(raw.aggregate(pipeline, allowDiskUse=True))
+
+    plan = []
+    for index, bucket in enumerate(buckets):
+        if index + 1 < len(buckets):
+            id_range = {"$gte": bucket["_id"]["min"], "$lt": buckets[index + 1]["_id"]["min"]}
+        else:
+            id_range = {"$gte": bucket["_id"]["min"], "$lte": bucket["_id"]["max"]}
+
+        plan.append({"index": index + 1, "_id": id_range, "count": bucket["count"]})
+
+    return plan
+
+
+def clean_partition(partition: Dict, engine: str) -> Dict:
+    """Clean one _id range in its own process with its own Mongo connection."""
+    setup_logging()
+    db = get_database()
+
+    raw = db[mongo_settings.raw_flights]
+    clean = db[mongo_settings.clean_flights]
+
+    # Clean records keep the raw _id, so a retried partition can drop
+    # whatever an earlier attempt wrote without touching other partitions
+    clean.delete_many({"_id": partition["_id"]})
+
+    label = f"Partition {partition['index']}"
+    cursor = raw.find({"_id": partition["_id"]}, no_cursor_timeout=True)
+    processed, inserted, duplicates = clean_cursor(
+        cursor, clean, clean_transform(engine, db), label
+    )
+
+    logging.info(
+        f"{label} completed | processed {processed:,} | inserted {inserted:,} | "
+        f"duplicates dropped {duplicates:,}"
+    )
+    return {
+        "index": partition["index"],
+        "processed": processed,
+        "inserted": inserted,
+        "duplicates": duplicates,
+    }
+
+
+@instrumented("partitioned_clean")
+def run_partitioned_clean(
+    workers: int | None = None,
+    engine: str | None = None,
+) -> None:
+    setup_logging()
+    db = get_database()
+
+    workers = workers or pipeline_settings.clean_workers
+    engine = engine or pipeline_settings.clean_engine
+    retries = pipeline_settings.clean_partition_retries
+
+    raw = db[mongo_settings.raw_flights]
+    clean = db[mongo_settings.clean_flights]
+
+    # Clear for safe re-runs
+    clean.delete_many({})
+    reset_watermark(db, CLEAN_STAGE)
+    # Gold partials built on the old clean layer no longer apply
+    reset_watermark(db, AGGREGATE_STAGE)
+    reset_watermark(db, SAMPLE_STAGE)
+
+    # Every worker inserts against the same unique key, so a flight that
+    # appears in two partitions is stored once
+    create_dedup_index(clean)
+
+    with step("plan_partitions"):
+        plan = plan_id_partitions(raw, pipeline_settings.clean_partitions)
+    pending = plan
+    logging.info(
+        f"Partitioned clean | {len(pending)} partitions | {workers} workers | engine {engine}"
+    )
+
+    processed = 0
+    inserted = 0
+    duplicates = 0
+
+    for attempt in range(1, retries + 2):
+        failed = []
+
+        # Spawn, not fork: MongoClient instances are not fork-safe
+        with step(f"attempt_{attempt}") as timer, ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("spawn")
+        ) as pool:
+            timer.rows = sum(partition["count"] for partition in pending)
+            futures = {
+                pool.submit(clean_partition, partition, engine): partition
+                for partition in pending
+            }
+            for future in as_completed(futures):
+                partition = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    logging.warning(
+                        f"Partition {partition['index']} failed on attempt {attempt}: {exc}"
+                    )
+                    failed.append(partition)
+                    continue
+
+                processed += result["processed"]
+                inserted += result["inserted"]
+                duplicates += result["duplicates"]
+
+        if not failed:
+            break
+
+        pending = sorted(failed, key=lambda partition: partition["index"])
+        logging.info(f"Retrying partitions {[p['index'] for p in pending]}")
+    else:
+        raise RuntimeError(
+            f"Partitions {[p['index'] for p in pending]} failed after {retries + 1} attempts"
+        )
+
+    logging.info(
+        f"Clean layer completed | processed {processed:,} | inserted {inserted:,} | "
+        f"duplicates dropped {duplicates:,}"
+    )
+
+    # The plan covers the first MAX_RECORDS raw flights in _id order
+    record_sample_design(db, "head", None, processed)
+
+    # Only a complete run moves the watermark past the last range
+    if plan:
+        advance_watermark(db, CLEAN_STAGE, plan[-1]["_id"]["$lte"])
+
+
+if __name__ == "__main__":
+    run_partitioned_clean()
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+
+# Trailing windows in days, each ending on (and including) the row's day
+WINDOWS = (7, 30)
+# Additive counts kept per (key, day); every window metric derives from their sums
+PARTIAL_FIELDS = ("flights", "delayed", "delay_sum", "delay_count")
+
+
+def group_partials(docs: Iterable[Mapping], key_field: str) -> Dict[str, List[Dict]]:
+    """Daily partials (``_id`` of ``{key_field, flight_date}``) as one day list per key."""
+    by_key: Dict[str, List[Dict]] = defaultdict(list)
+    for doc in docs:
+        by_key[doc["_id"][key_field]].append(
+            {
+                "flight_date": doc["_id"]["flight_date"],
+                **{field: doc.get(field) or 0 for field in PARTIAL_FIELDS},
+            }
+        )
+    return by_key
+
+
+def sliding_sums(days: Sequence[Mapping], window: int) -> Iterator[Dict[str, float]]:
+    """
+    Window sums ending on each of one key's days, sorted by ``flight_date``.
+
+    Each step adds the new day and subtracts the days that fell out of the
+    window, so a series costs the same whatever the window length. Days with
+    no flights have no partial and simply contribute nothing.
+    """
+    span = timedelta(days=window)
+    sums = dict.fromkeys(PARTIAL_FIELDS, 0)
+    head = 0
+    for day in days:
+        for field in PARTIAL_FIELDS:
+            sums[field] += day[field]
+        while days[head]["flight_date"] <= day["flight_date"] - span:
+            for field in PARTIAL_FIELDS:
+                sums[field] -= days[head][field]
+            head += 1
+        yield dict(sums)
+
+
+def window_metrics(sums: Mapping[str, float], window: int, delay_field: str) -> Dict:
+    flights = sums["flights"]
+    return {
+        f"flights_{window}d": flights,
+        f"delayed_{window}d": sums["delayed"],
+        f"pct_delayed_{window}d": round(sums["delayed"] / flights * 100, 2) if flights else None,
+        f"avg_{delay_field}_{window}d": (
+            round(sums["delay_sum"] / sums["delay_count"], 2) if sums["delay_count"] else None
+        ),
+    }
+
+
+def rolling_rows(
+    key_field: str,
+    key: str,
+    days: List[Dict],
+    delay_field: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    windows: Sequence[int] = WINDOWS,
+) -> List[Dict]:
+    """
+    Time-series gold rows for one key: one per day it has flights, e.g.
+    ``{"airline": "AA", "flight_date": ..., "pct_delayed_7d": ..., ...}``.
+
+    Only days in ``[start, end]`` are returned. ``days`` must reach back
+    ``max(windows) - 1`` days before ``start`` for those windows to be whole.
+    """
+    days = sorted(days, key=lambda day: day["flight_date"])
+    series = [sliding_sums(days, window) for window in windows]
+
+    rows = []
+    for day, *sums in zip(days, *series):
+        if (start is not None and day["flight_date"] < start) or (
+            end is not None and day["flight_date"] > end
+        ):
+            continue
+        row = {key_field: key, "flight_date": day["flight_date"]}
+        for window, window_sums in zip(windows, sums):
+            row.update(window_metrics(window_sums, window, delay_field))
+        rows.append(row)
+    return rows
+
+
+def refresh_span(
+    touched: Iterable[datetime],
+    windows: Sequence[int] = WINDOWS,
+) -> Tuple[datetime, datetime, datetime]:
+    """
+    ``(load_from, start, end)`` after a key's ``touched`` days changed.
+
+    Rows from the first touched day to ``max(windows) - 1`` days after the
+    last one include a changed day; their windows need partials back to
+    ``load_from``.
+    """
+    touched = sorted(touched)
+    reach = timedelta(days=max(windows) - 1)
+    return touched[0] - reach, touched[0], touched[-1] + reach
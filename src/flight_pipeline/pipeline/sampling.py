@@ -0,0 +1,309 @@
+import hashlib
+import logging
+import math
+from datetime import datetime
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Mapping, Tuple
+
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.pipeline.ingest import CLEAN_INPUT_COLUMNS
+from flight_pipeline.pipeline.state import SAMPLE_STAGE, get_state, update_state
+
+
+# Normal quantile for the reported 95% confidence intervals
+Z_95 = 1.96
+# Strata are months x airlines; their state keys look like "2015-01/AA"
+ALL_STRATA = "*"
+# Raw fields a clean run reads, flight key included
+RAW_PROJECTION = dict.fromkeys(CLEAN_INPUT_COLUMNS, 1)
+
+Stratum = Tuple[str, str]
+
+
+def flight_key(doc: Mapping) -> Tuple[Stratum, str]:
+    """
+    ``((month, airline), key)`` of a raw flight, e.g. ``(("2015-01", "AA"), ...)``.
+
+    The key is the flight's dedup key with numbers and codes normalized,
+    so it is the same whichever ingest engine typed the raw document.
+    """
+    year, month = int(doc["YEAR"]), int(doc["MONTH"])
+    airline = str(doc["AIRLINE"]).upper().strip()
+    key = (
+        f"{year}-{month}-{int(doc['DAY'])}|{airline}|{int(doc['FLIGHT_NUMBER'])}|"
+        f"{str(doc['ORIGIN_AIRPORT']).upper().strip()}|"
+        f"{str(doc['DESTINATION_AIRPORT']).upper().strip()}"
+    )
+    return (f"{year:04d}-{month:02d}", airline), key
+
+
+def flight_hash(key: str) -> float:
+    """
+    A uniform value in [0, 1) fixed by a flight key.
+
+    Seeded by nothing but the key, so every run, process and machine keeps
+    the same flights, and a flight's duplicates are kept or dropped together.
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+
+def stratum_key(stratum: Stratum) -> str:
+    return "/".join(stratum)
+
+
+def clean_stratum_key(flight_date: datetime, airline: str) -> str:
+    """The stratum key of a clean flight, to group sampled counts by."""
+    return f"{flight_date:%Y-%m}/{airline}"
+
+
+class FlightSampler:
+    """
+    Deterministic Bernoulli sample of raw flights, per month x airline.
+
+    A flight is kept when its key hash falls below its stratum's rate.
+    ``strata_rates`` overrides ``rate`` by ``"2015-01/AA"``, ``"AA"`` or
+    ``"2015-01"`` (most specific first). Every flight seen is counted, so
+    the recorded design holds each stratum's population and sample size.
+    """
+
+    def __init__(self, rate: float, strata_rates: Mapping[str, float] | None = None) -> None:
+        self.rate = rate
+        self.strata_rates = dict(strata_rates or {})
+        self.population: Counter = Counter()
+        self.sampled: Counter = Counter()
+        self._rates: Dict[Stratum, float] = {}
+
+    def rate_for(self, stratum: Stratum) -> float:
+        if stratum not in self._rates:
+            month, airline = stratum
+            keys = (stratum_key(stratum), airline, month)
+            self._rates[stratum] = next(
+                (self.strata_rates[key] for key in keys if key in self.strata_rates), self.rate
+            )
+        return self._rates[stratum]
+
+    def keep(self, doc: Mapping) -> bool:
+        try:
+            stratum, key = flight_key(doc)
+        except (KeyError, TypeError, ValueError):
+            # The clean transform rejects these anyway
+            return False
+
+        self.population[stratum] += 1
+        if flight_hash(key) >= self.rate_for(stratum):
+            return False
+        self.sampled[stratum] += 1
+        return True
+
+    def filter(self, docs: Iterable[Dict]) -> Iterator[Dict]:
+        return (doc for doc in docs if self.keep(doc))
+
+    def design(self, mode: str) -> Dict:
+        strata = [
+            {
+                "stratum": stratum_key(stratum),
+                "rate": self.rate_for(stratum),
+                "population": population,
+                "sampled": self.sampled[stratum],
+            }
+            for stratum, population in sorted(self.population.items())
+        ]
+        return {
+            "mode": mode,
+            "rate": self.rate,
+            "population": sum(self.population.values()),
+            "sampled": sum(self.sampled.values()),
+            "strata": strata,
+        }
+
+
+def sample_raw_flights(
+    raw: Collection,
+    mode: str,
+    limit: int,
+) -> Tuple[Iterable[Dict], FlightSampler | None]:
+    """
+    A cursor over the raw flights a clean run should process.
+
+    ``head`` is the first ``limit`` flights in natural order (not a
+    probability sample), ``hash`` a deterministic ``sample_rate`` sample,
+    ``stratified`` the same with ``sample_strata_rates`` per month x
+    airline, and ``random`` a server-side ``$sample`` of
+    ``sample_preview_rows`` for quick previews.
+    """
+    if mode == "head":
+        return raw.find({}, RAW_PROJECTION, no_cursor_timeout=True).limit(limit), None
+
+    if mode == "random":
+        size = pipeline_settings.sample_preview_rows
+        pipeline = [{"$sample": {"size": size}}, {"$project": RAW_PROJECTION}]
+        return raw.aggregate(pipeline, allowDiskUse=True), None
+
+    strata_rates = pipeline_settings.sample_strata_rates if mode == "stratified" else None
+    sampler = FlightSampler(pipeline_settings.sample_rate, strata_rates)
+    # Every raw flight is hashed, so only the fields the transform needs travel
+    return sampler.filter(raw.find({}, RAW_PROJECTION, no_cursor_timeout=True)), sampler
+
+
+def record_sample_design(
+    db: Database,
+    mode: str,
+    sampler: FlightSampler | None,
+    processed: int,
+) -> Dict:
+    """Store how the clean layer was sampled, for scaling its aggregates."""
+    if sampler is not None:
+        design = sampler.design(mode)
+    else:
+        population = db[mongo_settings.raw_flights].estimated_document_count()
+        design = {
+            "mode": mode,
+            # $sample is uniform over the collection; head is not random at all
+            "rate": processed / population if mode == "random" and population else None,
+            "population": population,
+            "sampled": processed,
+            "strata": [],
+        }
+
+    update_state(db, SAMPLE_STAGE, **design)
+    logging.info(
+        f"Sample | mode {mode} | {design['sampled']:,} of {design['population']:,} flights | "
+        f"{len(design['strata'])} strata"
+    )
+    return design
+
+
+def get_sample_design(db: Database) -> Dict | None:
+    """How the current clean layer was sampled, if a run recorded it."""
+    return get_state(db, SAMPLE_STAGE)
+
+
+def is_probability_sample(design: Mapping | None) -> bool:
+    """Whether aggregates of the clean layer must be scaled to the population."""
+    return bool(design) and (bool(design.get("strata")) or design.get("rate") is not None)
+
+
+def check_unsampled_append(db: Database, action: str) -> None:
+    """
+    Refuse to add unsampled flights to a sampled clean layer.
+
+    The recorded design would no longer describe the layer, so every
+    scaled estimate built from it would be wrong.
+    """
+    design = get_sample_design(db)
+    if is_probability_sample(design):
+        raise ValueError(
+            f"clean_flights is a {design['mode']!r} sample; {action} would append unsampled "
+            "flights to it. Rerun run_clean_pipeline to rebuild the clean layer instead"
+        )
+
+
+def stratum_rates(design: Mapping) -> Dict[str, float]:
+    """Inclusion rate per stratum key, or ``{ALL_STRATA: rate}`` when unstratified."""
+    if design.get("strata"):
+        return {stratum["stratum"]: stratum["rate"] for stratum in design["strata"]}
+    if design.get("rate") is None:
+        raise ValueError(f"A {design.get('mode')!r} sample has no inclusion rate to scale by")
+    return {ALL_STRATA: design["rate"]}
+
+
+def _rate(rates: Mapping[str, float], key: str) -> float:
+    rate = rates.get(key, rates.get(ALL_STRATA))
+    if rate is None:
+        raise ValueError(f"Stratum {key!r} is not in the sample design")
+    return rate
+
+
+def scale_count(counts: Mapping[str, int], design: Mapping) -> Tuple[float, float]:
+    """
+    Estimate a population count from sampled counts per stratum.
+
+    ``counts`` maps stratum keys (``"2015-01/AA"``, or ``ALL_STRATA`` for
+    unstratified samples) to how many sampled flights matched. Each is
+    weighted by its inverse inclusion rate; returns ``(estimate, half-width
+    of the 95% interval)`` from the Bernoulli-sampling variance.
+    """
+    rates = stratum_rates(design)
+    estimate = 0.0
+    variance = 0.0
+    for key, count in counts.items():
+        rate = _rate(rates, key)
+        if rate <= 0:
+            continue
+        estimate += count / rate
+        variance += count * (1 - rate) / rate**2
+    return estimate, Z_95 * math.sqrt(variance)
+
+
+def scale_ratio(
+    matches: Mapping[str, int],
+    totals: Mapping[str, int],
+    design: Mapping,
+) -> Tuple[float, float]:
+    """
+    Estimate a population rate (e.g. share of flights delayed) with its
+    95% half-width, from matching and total sampled flights per stratum.
+    """
+    rates = stratum_rates(design)
+    weight = {key: 1 / _rate(rates, key) for key in totals if _rate(rates, key) > 0}
+
+    total = sum(count * weight.get(key, 0) for key, count in totals.items())
+    if not total:
+        return 0.0, 0.0
+    ratio = sum(count * weight.get(key, 0) for key, count in matches.items()) / total
+
+    # Linearized variance of a weighted proportion within each stratum
+    variance = 0.0
+    for key, count in totals.items():
+        if key not in weight or count < 2:
+            continue
+        share = matches.get(key, 0) / count
+        stratum_weight = count * weight[key] / total
+        variance += stratum_weight**2 * share * (1 - share) / count * (1 - _rate(rates, key))
+    return ratio, Z_95 * math.sqrt(variance)
+
+
+def build_sample_estimates(
+    rows: Iterable[Mapping],
+    scope: str,
+    key_field: str,
+    design: Mapping,
+) -> List[Dict]:
+    """
+    Population estimates per key from sampled counts per key and stratum.
+
+    ``rows`` are ``{"_id": {"key", "year", "month", "airline"}, "flights",
+    "delayed"}`` groups of clean flights. Each key gets its estimated flights,
+    delayed flights and percentage delayed, each with the half-width of its
+    95% interval.
+    """
+    totals: Dict = defaultdict(Counter)
+    delayed: Dict = defaultdict(Counter)
+    for row in rows:
+        group = row["_id"]
+        stratum = clean_stratum_key(datetime(group["year"], group["month"], 1), group["airline"])
+        totals[group["key"]][stratum] += row["flights"]
+        delayed[group["key"]][stratum] += row["delayed"]
+
+    estimates = []
+    for key in sorted(totals):
+        flights, flights_half_width = scale_count(totals[key], design)
+        delayed_flights, delayed_half_width = scale_count(delayed[key], design)
+        share, share_half_width = scale_ratio(delayed[key], totals[key], design)
+        estimates.append(
+            {
+                "scope": scope,
+                key_field: key,
+                "flights": round(flights),
+                "flights_half_width": round(flights_half_width, 1),
+                "delayed_flights": round(delayed_flights),
+                "delayed_flights_half_width": round(delayed_half_width, 1),
+                "pct_delayed": round(share * 100, 2),
+                "pct_delayed_half_width": round(share_half_width * 100, 2),
+            }
+        )
+    return estimates
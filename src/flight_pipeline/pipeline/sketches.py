@@ -0,0 +1,333 @@
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+from bson import Binary
+from pymongo.collection import Collection
+
+
+# t-digest compression: at most ~2x this many centroids per digest
+DIGEST_COMPRESSION = 200
+# HyperLogLog registers = 2 ** precision (~1.04 / sqrt(registers) error)
+HLL_PRECISION = 11
+# Routes a top-K summary keeps per partition
+TOP_ROUTES = 50
+
+SKETCH_FIELDS = [
+    "flight_date",
+    "airline",
+    "flight_number",
+    "origin_airport",
+    "destination_airport",
+    "arrival_delay",
+    "is_delayed",
+]
+
+
+class TDigest:
+    """
+    Merging t-digest: weighted centroids, small near the tails.
+
+    Built and merged by sorting centroids and folding neighbours together
+    while they fit one unit of the arcsine scale function, so merging
+    per-day digests gives the same accuracy as digesting the range at once.
+    """
+
+    def __init__(self, means: np.ndarray, weights: np.ndarray, low: float, high: float) -> None:
+        self.means = means
+        self.weights = weights
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "TDigest":
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        if len(values) == 0:
+            return cls(np.empty(0), np.empty(0), np.nan, np.nan)
+        return cls._compress(values, np.ones(len(values)), values[0], values[-1])
+
+    @classmethod
+    def merge(cls, digests: Iterable["TDigest"]) -> "TDigest":
+        digests = [digest for digest in digests if len(digest.means)]
+        if not digests:
+            return cls(np.empty(0), np.empty(0), np.nan, np.nan)
+
+        means = np.concatenate([digest.means for digest in digests])
+        weights = np.concatenate([digest.weights for digest in digests])
+        order = np.argsort(means, kind="stable")
+        return cls._compress(
+            means[order],
+            weights[order],
+            min(digest.low for digest in digests),
+            max(digest.high for digest in digests),
+        )
+
+    @classmethod
+    def _compress(cls, means: np.ndarray, weights: np.ndarray, low: float, high: float) -> "TDigest":
+        # Each centroid covers at most one unit of k(q) = d/2pi * asin(2q - 1)
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = DIGEST_COMPRESSION / (2 * np.pi) * np.arcsin(2 * q - 1)
+        _, cluster = np.unique(np.floor(k - k[0]).astype(np.int64), return_inverse=True)
+
+        merged_weights = np.bincount(cluster, weights=weights)
+        merged_means = np.bincount(cluster, weights=means * weights) / merged_weights
+        return cls(merged_means, merged_weights, float(low), float(high))
+
+    @property
+    def count(self) -> int:
+        return int(self.weights.sum())
+
+    def quantile(self, q: Iterable[float]) -> np.ndarray:
+        q = np.asarray(q, dtype=np.float64)
+        if len(self.means) == 0:
+            return np.full(q.shape, np.nan)
+
+        # Interpolate between centroid centres, pinned to the true extremes
+        centres = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], centres, [self.weights.sum()]])
+        values = np.concatenate([[self.low], self.means, [self.high]])
+        return np.interp(q * self.weights.sum(), positions, values)
+
+    def to_bson(self) -> Dict:
+        return {
+            "means": Binary(self.means.astype(np.float32).tobytes()),
+            "weights": Binary(self.weights.astype(np.uint32).tobytes()),
+            "min": self.low,
+            "max": self.high,
+        }
+
+    @classmethod
+    def from_bson(cls, doc: Dict) -> "TDigest":
+        return cls(
+            np.frombuffer(doc["means"], dtype=np.float32).astype(np.float64),
+            np.frombuffer(doc["weights"], dtype=np.uint32).astype(np.float64),
+            doc["min"],
+            doc["max"],
+        )
+
+
+def hash_strings(values: np.ndarray) -> np.ndarray:
+    """Stable 64-bit hashes (pandas' keyed SipHash), equal across processes."""
+    return pd.util.hash_array(np.asarray(values, dtype=object))
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter; merging is a register-wise max."""
+
+    def __init__(self, registers: np.ndarray | None = None) -> None:
+        if registers is None:
+            registers = np.zeros(1 << HLL_PRECISION, dtype=np.uint8)
+        self.registers = registers
+
+    @classmethod
+    def from_hashes(cls, hashes: np.ndarray) -> "HyperLogLog":
+        sketch = cls()
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.int64)
+        rest = hashes << np.uint64(HLL_PRECISION)
+
+        # Leading zeros of the remaining bits, by halving the search window
+        zeros = np.zeros(len(hashes), dtype=np.uint8)
+        for shift in (32, 16, 8, 4, 2, 1):
+            empty = rest < (np.uint64(1) << np.uint64(64 - shift))
+            zeros[empty] += shift
+            rest = np.where(empty, rest << np.uint64(shift), rest)
+        rank = np.minimum(zeros, 64 - HLL_PRECISION) + 1
+
+        np.maximum.at(sketch.registers, index, rank.astype(np.uint8))
+        return sketch
+
+    @classmethod
+    def merge(cls, sketches: Iterable["HyperLogLog"]) -> "HyperLogLog":
+        merged = cls()
+        for sketch in sketches:
+            np.maximum(merged.registers, sketch.registers, out=merged.registers)
+        return merged
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bson(self) -> Binary:
+        # Sparse days leave most registers at zero, which compresses well
+        return Binary(zlib.compress(self.registers.tobytes()))
+
+    @classmethod
+    def from_bson(cls, data: bytes) -> "HyperLogLog":
+        return cls(np.frombuffer(zlib.decompress(data), dtype=np.uint8).copy())
+
+
+class TopK:
+    """
+    Space-saving heavy hitters: item counts that overestimate by at most
+    their ``error``.
+
+    ``floor`` bounds the count of any item not kept. Merging treats an item
+    missing from a summary as having ``floor`` occurrences there, which is
+    how space-saving summaries merge without losing their guarantee.
+    """
+
+    def __init__(self, counts: Dict[str, int], errors: Dict[str, int], floor: int) -> None:
+        self.counts = counts
+        self.errors = errors
+        self.floor = floor
+
+    @classmethod
+    def from_items(cls, items: np.ndarray, capacity: int = TOP_ROUTES) -> "TopK":
+        counts = pd.Series(items, dtype=object).value_counts()
+        return cls._truncate(counts.to_dict(), dict.fromkeys(counts.index, 0), 0, capacity)
+
+    @classmethod
+    def merge(cls, summaries: Iterable["TopK"], capacity: int = TOP_ROUTES) -> "TopK":
+        summaries = list(summaries)
+        floor = sum(summary.floor for summary in summaries)
+
+        # Every item starts at the sum of the floors; a summary that keeps it
+        # swaps its floor for the item's own count and error
+        counts: Dict[str, int] = {}
+        errors: Dict[str, int] = {}
+        for summary in summaries:
+            for item, count in summary.counts.items():
+                counts[item] = counts.get(item, floor) + count - summary.floor
+                errors[item] = errors.get(item, floor) + summary.errors[item] - summary.floor
+        return cls._truncate(counts, errors, floor, capacity)
+
+    @classmethod
+    def _truncate(cls, counts: Dict, errors: Dict, floor: int, capacity: int) -> "TopK":
+        ranked = sorted(counts, key=lambda item: (-counts[item], item))
+        kept, dropped = ranked[:capacity], ranked[capacity:]
+        if dropped:
+            floor = max(floor, counts[dropped[0]])
+        return cls(
+            {item: counts[item] for item in kept},
+            {item: errors[item] for item in kept},
+            floor,
+        )
+
+    def top(self, k: int) -> List[Dict]:
+        ranked = sorted(self.counts, key=lambda item: (-self.counts[item], item))
+        return [
+            {"item": item, "count": self.counts[item], "max_error": self.errors[item]}
+            for item in ranked[:k]
+        ]
+
+    def to_bson(self) -> Dict:
+        items = list(self.counts)
+        return {
+            "items": items,
+            "counts": [self.counts[item] for item in items],
+            "errors": [self.errors[item] for item in items],
+            "floor": self.floor,
+        }
+
+    @classmethod
+    def from_bson(cls, doc: Dict) -> "TopK":
+        return cls(
+            dict(zip(doc["items"], doc["counts"])),
+            dict(zip(doc["items"], doc["errors"])),
+            doc["floor"],
+        )
+
+
+def build_partition_sketches(frame: pd.DataFrame) -> List[Dict]:
+    """
+    One sketch document per (flight_date, airline) of a clean flights frame.
+
+    Each holds a t-digest of arrival delays, HyperLogLogs of distinct flight
+    numbers and routes, and the top delayed routes.
+    """
+    if frame.empty:
+        return []
+
+    airline = frame["airline"].astype(str).to_numpy(dtype=object)
+    origin = frame["origin_airport"].astype(str).to_numpy(dtype=object)
+    destination = frame["destination_airport"].astype(str).to_numpy(dtype=object)
+    routes = origin + "-" + destination
+
+    flight_hashes = hash_strings(airline + frame["flight_number"].astype(str).to_numpy(dtype=object))
+    route_hashes = hash_strings(routes)
+    delays = frame["arrival_delay"].astype("float64").to_numpy()
+    delayed = frame["is_delayed"].astype(bool).to_numpy()
+
+    groups = frame.groupby(["flight_date", "airline"], observed=True, sort=True).indices
+
+    docs = []
+    for (flight_date, carrier), rows in groups.items():
+        row_delays = delays[rows]
+        docs.append(
+            {
+                "flight_date": pd.Timestamp(flight_date).to_pydatetime(),
+                "airline": carrier,
+                "flights": len(rows),
+                "delay_digest": TDigest.from_values(row_delays[~np.isnan(row_delays)]).to_bson(),
+                "flights_hll": HyperLogLog.from_hashes(flight_hashes[rows]).to_bson(),
+                "routes_hll": HyperLogLog.from_hashes(route_hashes[rows]).to_bson(),
+                "delayed_routes": TopK.from_items(routes[rows][delayed[rows]]).to_bson(),
+            }
+        )
+    return docs
+
+
+def merge_sketch_docs(docs: Iterable[Dict]) -> Dict:
+    """Fold sketch documents into one, e.g. an existing day with new flights."""
+    docs = list(docs)
+    return {
+        "flights": sum(doc["flights"] for doc in docs),
+        "delay_digest": TDigest.merge(TDigest.from_bson(doc["delay_digest"]) for doc in docs).to_bson(),
+        "flights_hll": HyperLogLog.merge(HyperLogLog.from_bson(doc["flights_hll"]) for doc in docs).to_bson(),
+        "routes_hll": HyperLogLog.merge(HyperLogLog.from_bson(doc["routes_hll"]) for doc in docs).to_bson(),
+        "delayed_routes": TopK.merge(TopK.from_bson(doc["delayed_routes"]) for doc in docs).to_bson(),
+    }
+
+
+def summarize_sketches(
+    sketches: Collection,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    airlines: List[str] | None = None,
+    quantiles: Iterable[float] = (0.5, 0.9, 0.95, 0.99),
+    top: int = 10,
+) -> Dict:
+    """
+    Delay quantiles, distinct counts and top delayed routes for flights in
+    ``[start, end)``, merged from the daily sketches without touching
+    clean_flights.
+    """
+    query: Dict = {}
+    dates: Dict = {}
+    if start is not None:
+        dates["$gte"] = start
+    if end is not None:
+        dates["$lt"] = end
+    if dates:
+        query["flight_date"] = dates
+    if airlines:
+        query["airline"] = {"$in": airlines}
+
+    docs = list(sketches.find(query, {"_id": 0}))
+    merged = merge_sketch_docs(docs) if docs else None
+    if merged is None:
+        return {"flights": 0, "partitions": 0}
+
+    digest = TDigest.from_bson(merged["delay_digest"])
+    quantiles = list(quantiles)
+    return {
+        "flights": merged["flights"],
+        "partitions": len(docs),
+        "arrival_delay_quantiles": dict(
+            zip((f"p{q * 100:g}" for q in quantiles), digest.quantile(quantiles).tolist())
+        ),
+        "distinct_flights": HyperLogLog.from_bson(merged["flights_hll"]).count(),
+        "distinct_routes": HyperLogLog.from_bson(merged["routes_hll"]).count(),
+        "top_delayed_routes": TopK.from_bson(merged["delayed_routes"]).top(top),
+    }
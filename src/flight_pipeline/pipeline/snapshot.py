@@ -0,0 +1,243 @@
+import logging
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bson import json_util
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.db.frames import CATEGORY_FIELDS, load_frame
+from flight_pipeline.db.mongo import get_analytics_database
+from flight_pipeline.db.partitions import month_partitions
+from flight_pipeline.logging_config import setup_logging
+from flight_pipeline.metrics import instrumented, step
+from flight_pipeline.pipeline.state import CLEAN_STAGE, get_gold_version, get_watermark
+
+
+SNAPSHOT_DIR = Path("data/snapshots")
+# What each snapshot was exported from: the clean watermark or gold version
+MANIFEST = "manifest.json"
+
+# Fixed clean schema, so every month partition and the Arrow file agree
+CLEAN_SCHEMA = pa.schema(
+    [
+        ("flight_date", pa.timestamp("ms")),
+        ("airline", pa.string()),
+        ("origin_airport", pa.string()),
+        ("destination_airport", pa.string()),
+        ("flight_number", pa.string()),
+        ("departure_delay", pa.int16()),
+        ("arrival_delay", pa.int16()),
+        ("is_delayed", pa.bool_()),
+        ("is_cancelled", pa.bool_()),
+        # Dimension enrichment; null for flights cleaned without it
+        ("airline_name", pa.string()),
+        ("origin_city", pa.string()),
+        ("origin_state", pa.string()),
+        ("destination_city", pa.string()),
+        ("destination_state", pa.string()),
+        ("unknown_airport", pa.bool_()),
+    ]
+)
+
+GOLD_COLLECTIONS = (
+    "agg_daily_summary",
+    "agg_airline_perf",
+    "agg_airport_stats",
+    "agg_delay_distribution",
+    "agg_delay_severity",
+    "agg_airline_weekday",
+    "agg_airline_rolling",
+    "agg_airport_rolling",
+)
+
+
+def snapshot_root() -> Path:
+    return Path(pipeline_settings.snapshot_dir or SNAPSHOT_DIR)
+
+
+def _write_manifest(directory: Path, **fields: Any) -> None:
+    # Extended JSON keeps watermark types (ObjectId, int) for comparisons
+    (directory / MANIFEST).write_text(json_util.dumps(fields))
+
+
+def read_manifest(name: str, root: Path | None = None) -> Dict | None:
+    path = (root or snapshot_root()) / name / MANIFEST
+    return json_util.loads(path.read_text()) if path.exists() else None
+
+
+def _replace_dir(staging: Path, target: Path) -> None:
+    """Swap a fully written staging directory in place of ``target``."""
+    if target.exists():
+        shutil.rmtree(target)
+    staging.rename(target)
+
+
+def export_clean_snapshot(db: Database, root: Path, clean_watermark: Any = None) -> int:
+    """
+    Write clean_flights as year/month Parquet partitions plus one Arrow file.
+
+    Each month is loaded with its own pushed-down date filter, from its
+    month partition when the layout is current, so memory holds one month of
+    flights at a time.
+    """
+    staging = root / f"{mongo_settings.clean_flights}.staging"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    fields = CLEAN_SCHEMA.names
+    rows = 0
+
+    with pa.OSFile(str(staging / f"{mongo_settings.clean_flights}.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, CLEAN_SCHEMA) as arrow_file:
+            for year, month, date_range, flights in month_partitions(db):
+                frame = load_frame(
+                    flights, fields, filter={"flight_date": date_range}, categories=()
+                )
+                if frame.empty:
+                    continue
+
+                table = pa.Table.from_pandas(frame, schema=CLEAN_SCHEMA, preserve_index=False)
+                partition = staging / "parquet" / f"year={year}" / f"month={month}"
+                partition.mkdir(parents=True)
+                pq.write_table(table, partition / "part-0.parquet")
+                arrow_file.write_table(table)
+
+                rows += table.num_rows
+                logging.info(f"Snapshot | {year}-{month:02d} | {table.num_rows:,} flights")
+
+    _write_manifest(staging, rows=rows, clean_watermark=clean_watermark)
+    _replace_dir(staging, root / mongo_settings.clean_flights)
+    return rows
+
+
+def export_gold_snapshot(
+    collection: Collection,
+    root: Path,
+    gold_version: int | None = None,
+) -> int:
+    """Write a gold collection as one Parquet file plus one Arrow file."""
+    sample = collection.find_one({}, {"_id": 0})
+    if sample is None:
+        return 0
+
+    frame = load_frame(collection, list(sample))
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+
+    staging = root / f"{collection.name}.staging"
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+
+    pq.write_table(table, staging / f"{collection.name}.parquet")
+    with pa.OSFile(str(staging / f"{collection.name}.arrow"), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as arrow_file:
+            arrow_file.write_table(table)
+
+    _write_manifest(staging, rows=table.num_rows, gold_version=gold_version)
+    _replace_dir(staging, root / collection.name)
+    return table.num_rows
+
+
+def load_snapshot(
+    name: str,
+    columns: List[str] | None = None,
+    filter: ds.Expression | None = None,
+    root: Path | None = None,
+) -> pd.DataFrame:
+    """
+    Read a snapshotted collection into a DataFrame.
+
+    Without ``filter`` the Arrow file is memory-mapped, so the load costs
+    page faults rather than a network scan and BSON decode. A ``filter`` on
+    ``year``/``month`` (e.g. ``ds.field("month") == 7``) reads only the
+    matching clean_flights Parquet partitions.
+    """
+    directory = (root or snapshot_root()) / name
+
+    if filter is not None:
+        dataset = ds.dataset(directory / "parquet", format="parquet", partitioning="hive")
+        table = dataset.to_table(columns=columns, filter=filter)
+    else:
+        with pa.memory_map(str(directory / f"{name}.arrow")) as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+
+    categories = [field for field in CATEGORY_FIELDS if field in table.column_names]
+    return table.to_pandas(categories=categories)
+
+
+def load_clean_month(
+    year: int,
+    month: int,
+    columns: List[str] | None = None,
+    root: Path | None = None,
+) -> pd.DataFrame:
+    """One month of the clean snapshot, read from its Parquet partition."""
+    month_filter = (ds.field("year") == year) & (ds.field("month") == month)
+    return load_snapshot(mongo_settings.clean_flights, columns, month_filter, root)
+
+
+def has_snapshot(
+    name: str,
+    root: Path | None = None,
+    gold_version: int | None = None,
+) -> bool:
+    """
+    Whether ``name`` was snapshotted, and with ``gold_version`` given,
+    exported at that gold version (a newer aggregation makes it stale).
+    """
+    directory = (root or snapshot_root()) / name
+    if not (directory / f"{name}.arrow").exists():
+        return False
+    if gold_version is None:
+        return True
+    return (read_manifest(name, root) or {}).get("gold_version") == gold_version
+
+
+def clean_snapshot_is_current(db: Database, root: Path | None = None) -> bool:
+    """
+    Whether the clean snapshot was exported at the current clean watermark.
+
+    Without a watermark (e.g. after a fused run without a raw archive) the
+    clean layer's progress is unknown, so no snapshot counts as current.
+    """
+    watermark = get_watermark(db, CLEAN_STAGE)
+    if watermark is None or not has_snapshot(mongo_settings.clean_flights, root):
+        return False
+    manifest = read_manifest(mongo_settings.clean_flights, root) or {}
+    return manifest.get("clean_watermark") == watermark
+
+
+@instrumented("snapshot")
+def run_snapshot_export() -> None:
+    setup_logging()
+    db = get_analytics_database()
+    root = snapshot_root()
+
+    # Read first: if either moves on mid-export the snapshot counts as stale
+    watermark = get_watermark(db, CLEAN_STAGE)
+    gold_version = get_gold_version(db)
+    logging.info(f"Exporting snapshots to {root} | gold version {gold_version}")
+
+    with step(mongo_settings.clean_flights) as timer:
+        timer.rows = export_clean_snapshot(db, root, clean_watermark=watermark)
+    logging.info(f"Clean snapshot completed | {timer.rows:,} flights")
+
+    for setting in GOLD_COLLECTIONS:
+        collection = db[getattr(mongo_settings, setting)]
+        with step(collection.name) as timer:
+            timer.rows = export_gold_snapshot(collection, root, gold_version)
+        logging.info(f"Gold snapshot {collection.name} | {timer.rows:,} rows")
+
+
+if __name__ == "__main__":
+    run_snapshot_export()
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from pymongo import ReturnDocument
+from pymongo.database import Database
+
+from flight_pipeline.config.settings import mongo_settings
+
+
+# Stage names used as _id in the pipeline_state collection
+INGEST_STAGE = "ingest"
+CLEAN_STAGE = "clean"
+LAYOUT_STAGE = "layout"
+# How the clean layer was sampled from raw_flights
+SAMPLE_STAGE = "sample"
+AGGREGATE_STAGE = "aggregate"
+
+# Counter bumped whenever the gold collections change, for result caches
+GOLD_VERSION = "gold_version"
+
+
+def get_state(db: Database, stage: str) -> Dict | None:
+    """Return a stage's state document, if it has one."""
+    return db[mongo_settings.pipeline_state].find_one({"_id": stage})
+
+
+def update_state(db: Database, stage: str, **fields: Any) -> None:
+    """Set fields on a stage's state document."""
+    db[mongo_settings.pipeline_state].update_one(
+        {"_id": stage},
+        {"$set": {"updated_at": datetime.now(timezone.utc), **fields}},
+        upsert=True,
+    )
+
+
+def get_watermark(db: Database, stage: str) -> Any:
+    """Return the last source key a stage has fully processed, if any."""
+    state = get_state(db, stage)
+    return state.get("watermark") if state else None
+
+
+def advance_watermark(db: Database, stage: str, watermark: Any, **details: Any) -> None:
+    """Move a stage's watermark forward; never moves it backwards."""
+    db[mongo_settings.pipeline_state].update_one(
+        {"_id": stage},
+        {
+            "$max": {"watermark": watermark},
+            "$set": {"updated_at": datetime.now(timezone.utc), **details},
+        },
+        upsert=True,
+    )
+
+
+def reset_watermark(db: Database, stage: str) -> None:
+    """Forget a stage's progress, e.g. before a full rebuild."""
+    db[mongo_settings.pipeline_state].delete_one({"_id": stage})
+
+
+def bump_gold_version(db: Database, **details: Any) -> int:
+    """Record that the gold collections changed; returns the new version."""
+    state = db[mongo_settings.pipeline_state].find_one_and_update(
+        {"_id": GOLD_VERSION},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc), **details}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return state["version"]
+
+
+def get_gold_version(db: Database) -> int:
+    """The current gold version; 0 before any aggregation run recorded one."""
+    state = get_state(db, GOLD_VERSION)
+    return state.get("version", 0) if state else 0
+
+
+def get_checkpoint(db: Database, stage: str, partition: Any) -> Dict | None:
+    """Return a stage's checkpoint for one partition, if it has one."""
+    return db[mongo_settings.pipeline_checkpoints].find_one(
+        {"_id": {"stage": stage, "partition": partition}}
+    )
+
+
+def save_checkpoint(db: Database, stage: str, partition: Any, **fields: Any) -> None:
+    """Record (or update) a stage's progress on one partition."""
+    db[mongo_settings.pipeline_checkpoints].update_one(
+        {"_id": {"stage": stage, "partition": partition}},
+        {"$set": {"updated_at": datetime.now(timezone.utc), **fields}},
+        upsert=True,
+    )
+
+
+def list_checkpoints(db: Database, stage: str) -> List[Dict]:
+    """All of a stage's partition checkpoints, in partition order."""
+    return list(
+        db[mongo_settings.pipeline_checkpoints]
+        .find({"_id.stage": stage})
+        .sort("_id.partition", 1)
+    )
+
+
+def reset_checkpoints(db: Database, stage: str | None = None) -> None:
+    """Forget a stage's partition checkpoints (every stage's by default)."""
+    query = {"_id.stage": stage} if stage is not None else {}
+    db[mongo_settings.pipeline_checkpoints].delete_many(query)
@@ -0,0 +1,218 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from flight_pipeline.pipeline.dimensions import DimensionCache
+
+
+# Column types the fast path knows how to cast exactly like ``int()``/``bool()``
+NUMERIC_KINDS = {"integer", "floating", "mixed-integer-float", "empty"}
+
+_MISSING = object()
+
+
+def _column(docs: List[Dict], key: str, default: object = None) -> np.ndarray:
+    """Pull one field out of a batch of documents as an object array."""
+    return np.array([doc.get(key, default) for doc in docs], dtype=object)
+
+
+def _is_numeric(values: np.ndarray) -> bool:
+    return pd.api.types.infer_dtype(values, skipna=True) in NUMERIC_KINDS
+
+
+def _to_float(values: np.ndarray, is_none: np.ndarray) -> np.ndarray:
+    return np.where(is_none, np.nan, values).astype(np.float64)
+
+
+def _to_str(values: np.ndarray, normalize: bool = False) -> np.ndarray:
+    """Apply ``str()`` (and optionally upper/strip) to every value."""
+    # Codes repeat heavily, so convert each distinct value once. Only safe
+    # when equal values also print the same (1 == 1.0 == True, but not as str)
+    if pd.api.types.infer_dtype(values, skipna=False) in {"string", "integer"}:
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        converted = [str(value) for value in uniques]
+        if normalize:
+            converted = [value.upper().strip() for value in converted]
+        return np.array(converted, dtype=object)[codes]
+
+    converted = [str(value) for value in values]
+    if normalize:
+        converted = [value.upper().strip() for value in converted]
+    return np.array(converted, dtype=object)
+
+
+def _assemble_dates(
+    year: np.ndarray, month: np.ndarray, day: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Build datetime64 flight dates and a mask of the valid calendar dates."""
+    valid = np.isfinite(year) & np.isfinite(month) & np.isfinite(day)
+    y = np.where(valid, np.trunc(year), 1970).astype(np.int64)
+    m = np.where(valid, np.trunc(month), 1).astype(np.int64)
+    d = np.where(valid, np.trunc(day), 1).astype(np.int64)
+
+    valid &= (y >= 1) & (y <= 9999) & (m >= 1) & (m <= 12) & (d >= 1) & (d <= 31)
+    y = np.where(valid, y, 1970)
+    m = np.where(valid, m, 1)
+    d = np.where(valid, d, 1)
+
+    first = (y - 1970).astype("M8[Y]") + (m - 1).astype("m8[M]")
+    dates = first.astype("M8[D]") + (d - 1).astype("m8[D]")
+
+    # Days past the end of the month roll into the next one
+    valid &= dates.astype("M8[M]") == first
+    return dates.astype("M8[us]"), valid
+
+
+def transform_raw_batch(
+    docs: List[Dict], dimensions: DimensionCache | None = None
+) -> List[Dict] | None:
+    """
+    Transform a batch of raw flight documents column by column.
+
+    Produces exactly the records the row engine would for the same documents
+    (source ``_id`` and ``dimensions`` enrichment included), in the same order. Returns None when a column holds types the
+    fast path does not cover, so the caller can fall back to the row path.
+    """
+    if not docs:
+        return []
+
+    year = _column(docs, "YEAR", _MISSING)
+    month = _column(docs, "MONTH", _MISSING)
+    day = _column(docs, "DAY", _MISSING)
+    airline = _column(docs, "AIRLINE", _MISSING)
+    origin = _column(docs, "ORIGIN_AIRPORT", _MISSING)
+    destination = _column(docs, "DESTINATION_AIRPORT", _MISSING)
+    flight_number = _column(docs, "FLIGHT_NUMBER")
+    cancelled = _column(docs, "CANCELLED", 0)
+    dep_raw = _column(docs, "DEPARTURE_DELAY")
+    arr_raw = _column(docs, "ARRIVAL_DELAY")
+    ids = _column(docs, "_id", _MISSING)
+
+    # Rows missing a required field raise KeyError in the row path
+    valid = np.ones(len(docs), dtype=bool)
+    for values in (year, month, day, airline, origin, destination):
+        missing = np.equal(values, _MISSING)
+        valid &= ~missing
+        values[missing] = None
+
+    numeric = (year, month, day, cancelled, dep_raw, arr_raw)
+    if not all(_is_numeric(values) for values in numeric):
+        return None
+
+    # Casting
+    cancelled_none = np.equal(cancelled, None)
+    cancelled_f = _to_float(cancelled, cancelled_none)
+    is_cancelled = ~cancelled_none & ((cancelled_f != 0) | np.isnan(cancelled_f))
+
+    dep_none = np.equal(dep_raw, None)
+    arr_none = np.equal(arr_raw, None)
+    dep_f = _to_float(dep_raw, dep_none)
+    arr_f = _to_float(arr_raw, arr_none)
+
+    # Delays: flown flights truncate to int (missing -> 0), cancelled flights
+    # keep the raw value, which must validate as an optional int
+    flown = ~is_cancelled
+    dep_finite = np.isfinite(dep_f)
+    arr_finite = np.isfinite(arr_f)
+    dep_whole = dep_finite & (np.trunc(dep_f) == dep_f)
+    arr_whole = arr_finite & (np.trunc(arr_f) == arr_f)
+    valid &= dep_none | np.where(flown, dep_finite, dep_whole)
+    valid &= arr_none | np.where(flown, arr_finite, arr_whole)
+
+    dep_delay = np.where(dep_none | ~dep_finite, 0, np.trunc(dep_f))
+    arr_delay = np.where(arr_none | ~arr_finite, 0, np.trunc(arr_f))
+    dep_null = is_cancelled & dep_none
+    arr_null = is_cancelled & arr_none
+
+    is_delayed = ~arr_null & (arr_delay > 15)
+
+    # Date assembly
+    year_f = _to_float(year, np.equal(year, None))
+    month_f = _to_float(month, np.equal(month, None))
+    day_f = _to_float(day, np.equal(day, None))
+    flight_date, date_valid = _assemble_dates(year_f, month_f, day_f)
+    valid &= date_valid
+
+    # Normalization
+    airline_codes = _to_str(airline[valid], normalize=True)
+    origin_codes = _to_str(origin[valid], normalize=True)
+    destination_codes = _to_str(destination[valid], normalize=True)
+    flight_numbers = _to_str(flight_number[valid])
+
+    dep_out = dep_delay[valid].astype(np.int64).tolist()
+    arr_out = arr_delay[valid].astype(np.int64).tolist()
+    for i in np.flatnonzero(dep_null[valid]):
+        dep_out[i] = None
+    for i in np.flatnonzero(arr_null[valid]):
+        arr_out[i] = None
+
+    # Enrichment: one dimension lookup per distinct code in the batch
+    rows = len(airline_codes)
+    if dimensions is not None:
+        airline_names = dimensions.airline_names(airline_codes).tolist()
+        origin_city, origin_state, origin_known = dimensions.airport_places(origin_codes)
+        dest_city, dest_state, dest_known = dimensions.airport_places(destination_codes)
+        places = [array.tolist() for array in (origin_city, origin_state, dest_city, dest_state)]
+        unknown_airport = (~(origin_known & dest_known)).tolist()
+    else:
+        airline_names = [None] * rows
+        places = [[None] * rows] * 4
+        unknown_airport = [None] * rows
+
+    # Same keys, order and Python types as CleanFlight.model_dump()
+    records = [
+        {
+            "flight_date": date,
+            "airline": airline_code,
+            "origin_airport": origin_code,
+            "destination_airport": destination_code,
+            "flight_number": number,
+            "departure_delay": dep,
+            "arrival_delay": arr,
+            "is_delayed": delayed,
+            "is_cancelled": cancelled_flag,
+            "airline_name": airline_name,
+            "origin_city": origin_city_name,
+            "origin_state": origin_state_code,
+            "destination_city": dest_city_name,
+            "destination_state": dest_state_code,
+            "unknown_airport": unknown,
+        }
+        for (
+            date,
+            airline_code,
+            origin_code,
+            destination_code,
+            number,
+            dep,
+            arr,
+            delayed,
+            cancelled_flag,
+            airline_name,
+            origin_city_name,
+            origin_state_code,
+            dest_city_name,
+            dest_state_code,
+            unknown,
+        ) in zip(
+            flight_date[valid].tolist(),
+            airline_codes.tolist(),
+            origin_codes.tolist(),
+            destination_codes.tolist(),
+            flight_numbers.tolist(),
+            dep_out,
+            arr_out,
+            is_delayed[valid].tolist(),
+            is_cancelled[valid].tolist(),
+            airline_names,
+            *places,
+            unknown_airport,
+        )
+    ]
+
+    for record, _id in zip(records, ids[valid].tolist()):
+        if _id is not _MISSING:
+            record["_id"] = _id
+
+    return records
@@ -0,0 +1,92 @@
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+
+def result_bytes(value: Any) -> int:
+    """Approximate in-memory size of a cached result."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResultCache:
+    """
+    Bounded LRU cache for query results and frames derived from them.
+
+    Entries belong to one data version (the gold version for the
+    dashboard): the first lookup under a newer version drops every entry,
+    so results are invalidated exactly when the data changes rather than
+    after a TTL. Lookups under an older version (e.g. read from a lagging
+    secondary) are computed but never cached. The least recently used
+    entries are evicted to stay under ``max_bytes``. Thread-safe, so one
+    instance can serve every session.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.version: int | None = None
+        self.entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _set_version(self, version: int) -> None:
+        if self.version is None or version > self.version:
+            self.version = version
+            self.evictions += len(self.entries)
+            self.entries.clear()
+            self.bytes = 0
+
+    def get(self, version: int, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        The result for ``key`` under ``version``, computing it on a miss.
+
+        ``compute`` runs outside the lock, so a slow query does not block
+        hits on other keys. Cached results are shared: do not mutate them.
+        """
+        with self._lock:
+            self._set_version(version)
+            if version == self.version and key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+
+        value = compute()
+        size = result_bytes(value)
+
+        with self._lock:
+            # Too big to keep, or the data changed while computing
+            if size > self.max_bytes or version != self.version:
+                return value
+
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,15 @@
+# tests/conftest.py
+
+import mongomock
+import pytest
+
+import mongomock_shims
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """An empty mongomock database that runs the pipeline's aggregations."""
+    mongomock_shims.install(
+        lambda target, name, value: monkeypatch.setattr(target, name, value, raising=False)
+    )
+    return mongomock.MongoClient().db
@@ -0,0 +1,134 @@
+# tests/mongomock_shims.py
+
+"""
+mongomock gaps the pipeline relies on, filled in for tests and for the
+in-process benchmark (benchmarks/bench_pipeline.py --in-process).
+"""
+
+from types import SimpleNamespace
+
+import bson
+import mongomock
+import mongomock.aggregate
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+
+def find_raw_batches(self, filter=None, projection=None, sort=None, limit=0, batch_size=100):
+    """What load_frame reads; mongomock has no raw batches."""
+    docs = list(self.find(filter or {}, projection, sort=sort, limit=limit))
+    for start in range(0, len(docs), batch_size):
+        yield b"".join(bson.encode(doc) for doc in docs[start : start + batch_size])
+
+
+def bulk_write(self, requests, ordered=True, **options):
+    """Apply each request in turn (mongomock's bulk API predates pymongo 4.9)."""
+    counts = dict.fromkeys(("inserted", "matched", "modified", "upserted", "deleted"), 0)
+    for request in requests:
+        if isinstance(request, InsertOne):
+            self.insert_one(request._doc)
+            counts["inserted"] += 1
+            continue
+        if isinstance(request, (DeleteOne, DeleteMany)):
+            delete = self.delete_one if isinstance(request, DeleteOne) else self.delete_many
+            counts["deleted"] += delete(request._filter).deleted_count
+            continue
+
+        if isinstance(request, ReplaceOne):
+            result = self.replace_one(request._filter, request._doc, upsert=request._upsert)
+        elif isinstance(request, UpdateOne):
+            result = self.update_one(request._filter, request._doc, upsert=request._upsert)
+        elif isinstance(request, UpdateMany):
+            result = self.update_many(request._filter, request._doc, upsert=request._upsert)
+        else:
+            raise NotImplementedError(type(request).__name__)
+        counts["matched"] += result.matched_count
+        counts["modified"] += result.modified_count
+        counts["upserted"] += result.upserted_id is not None
+
+    return SimpleNamespace(**{f"{name}_count": count for name, count in counts.items()})
+
+
+def _bind_new(expression, new):
+    """Replace ``$$new`` references in a $merge pipeline with literal values."""
+    if isinstance(expression, str) and expression.startswith("$$new"):
+        path = expression[len("$$new.") :] if expression.startswith("$$new.") else ""
+        value = new
+        for part in filter(None, path.split(".")):
+            value = value.get(part) if isinstance(value, dict) else None
+        return {"$literal": value}
+    if isinstance(expression, dict):
+        return {key: _bind_new(value, new) for key, value in expression.items()}
+    if isinstance(expression, list):
+        return [_bind_new(value, new) for value in expression]
+    return expression
+
+
+def _merge_into(collection, docs, spec):
+    target = collection.database[spec["into"]]
+    on = spec.get("on", "_id")
+    on = [on] if isinstance(on, str) else on
+    when_matched = spec.get("whenMatched", "merge")
+    when_not_matched = spec.get("whenNotMatched", "insert")
+
+    for new in docs:
+        existing = target.find_one({field: new.get(field) for field in on})
+        if existing is None:
+            if when_not_matched == "insert":
+                target.insert_one(new)
+            continue
+
+        if when_matched == "merge":
+            merged = {**existing, **new, "_id": existing["_id"]}
+        elif when_matched == "replace":
+            merged = {**new, "_id": existing["_id"]}
+        elif when_matched == "keepExisting":
+            continue
+        else:
+            scratch = collection.database["_merge_scratch"]
+            scratch.drop()
+            scratch.insert_one(existing)
+            (merged,) = scratch.aggregate(_bind_new(when_matched, new))
+            scratch.drop()
+        target.replace_one({"_id": existing["_id"]}, merged)
+
+
+def aggregate(self, pipeline, *args, _original=mongomock.collection.Collection.aggregate, **kwargs):
+    """Run a trailing $merge in Python; mongomock has no $merge stage."""
+    if pipeline and "$merge" in pipeline[-1]:
+        docs = list(_original(self, pipeline[:-1], *args, **kwargs))
+        _merge_into(self, docs, pipeline[-1]["$merge"])
+        return iter([])
+    return _original(self, pipeline, *args, **kwargs)
+
+
+def handle_arithmetic(self, operator, values, _original=mongomock.aggregate._Parser._handle_arithmetic_operator):
+    if operator != "$round":
+        return _original(self, operator, values)
+    number = self.parse(values[0])
+    if number is None:
+        return None
+    return round(number, values[1] if len(values) > 1 else 0)
+
+
+def handle_date(self, operator, values, _original=mongomock.aggregate._Parser._handle_date_operator):
+    if operator != "$isoDayOfWeek":
+        return _original(self, operator, values)
+    return self.parse(values).isoweekday()
+
+
+def install(patch=setattr):
+    """
+    Patch mongomock with the shims above.
+
+    ``patch(target, name, value)`` defaults to setattr; tests pass a
+    monkeypatch-based one so every test gets back the stock mongomock.
+    """
+    collection = mongomock.collection.Collection
+    patch(collection, "find_raw_batches", find_raw_batches)
+    patch(collection, "bulk_write", bulk_write)
+    patch(collection, "aggregate", aggregate)
+
+    parser = mongomock.aggregate
+    patch(parser, "arithmetic_operators", parser.arithmetic_operators | {"$round"})
+    patch(parser._Parser, "_handle_arithmetic_operator", handle_arithmetic)
+    patch(parser._Parser, "_handle_date_operator", handle_date)
@@ -1,6 +1,33 @@
 # tests/test_aggregation_outputs.py
 
+from datetime import datetime
+
+from flight_pipeline.config.settings import mongo_settings
 from flight_pipeline.db.mongo import get_database
+from flight_pipeline.pipeline.aggregate import (
+    SEVERITY_BUCKETS,
+    aggregate_airline_weekday,
+    aggregate_delay_severity,
+    incremental_airline_performance,
+    incremental_daily_summary,
+    incremental_delay_severity,
+)
+
+
+def clean_flight(_id, arrival_delay, airline="AA", day=1):
+    return {
+        "_id": _id,
+        "flight_date": datetime(2015, 1, day),
+        "airline": airline,
+        "origin_airport": "ANC",
+        "destination_airport": "SEA",
+        "departure_delay": arrival_delay,
+        "arrival_delay": arrival_delay,
+        # The clean stage's rule: more than 15 minutes late on arrival
+        "is_delayed": arrival_delay is not None and arrival_delay > 15,
+        "is_cancelled": arrival_delay is None,
+    }
+
 
 def test_daily_aggregation_exists():
     db = get_database()
@@ -30,3 +57,93 @@ def test_airport_delay_stats():
     assert doc is not None, "Airport delay stats missing"
 
     assert 0 <= doc["pct_delayed"] <= 100
+
+
+def test_delay_severity_buckets(mongo_db):
+    mongo_db.clean_flights.insert_many(
+        [clean_flight(1, -30), clean_flight(2, 10), clean_flight(3, 10), clean_flight(4, 500)]
+    )
+
+    aggregate_delay_severity(mongo_db)
+
+    docs = list(mongo_db[mongo_settings.agg_delay_severity].find().sort("position", 1))
+    # Every bin is kept, empty or not, in bin order
+    assert [doc["bucket"] for doc in docs] == [label for label, _, _ in SEVERITY_BUCKETS]
+    flights = {doc["bucket"]: doc["flights"] for doc in docs}
+    assert flights["Very Early"] == 1
+    assert flights["On-Time"] == 2
+    assert sum(flights.values()) == 3
+
+
+def test_airline_weekday_delays(mongo_db):
+    # 2015-01-01 was a Thursday, 2015-01-05 a Monday
+    mongo_db.clean_flights.insert_many(
+        [
+            clean_flight(1, 20),
+            clean_flight(2, 10),
+            clean_flight(3, 40, day=5),
+            clean_flight(4, 5, airline="DL"),
+        ]
+    )
+
+    aggregate_airline_weekday(mongo_db)
+
+    rows = {
+        (doc["airline"], doc["day_name"]): doc
+        for doc in mongo_db[mongo_settings.agg_airline_weekday].find({}, {"_id": 0})
+    }
+    assert set(rows) == {("AA", "Thursday"), ("AA", "Monday"), ("DL", "Thursday")}
+    assert rows["AA", "Thursday"]["day_of_week"] == 4
+    assert rows["AA", "Thursday"]["pct_delayed"] == 50.0
+    assert rows["AA", "Monday"]["pct_delayed"] == 100.0
+    assert rows["DL", "Thursday"]["pct_delayed"] == 0.0
+
+
+def test_incremental_severity_skips_unbinned_delays(mongo_db):
+    db = mongo_db
+    # Cancelled flights have no delay; 500 minutes is past the last bin
+    db.clean_flights.insert_many(
+        [clean_flight(1, None), clean_flight(2, 500), clean_flight(3, 20), clean_flight(4, -5)]
+    )
+
+    incremental_delay_severity(db, None, 4)
+
+    flights = {doc["bucket"]: doc["flights"] for doc in db[mongo_settings.agg_delay_severity].find()}
+    assert flights["Minor Delay"] == 1
+    assert flights["Early"] == 1
+    assert sum(flights.values()) == 2
+
+
+def test_replayed_range_is_not_counted_twice(mongo_db):
+    db = mongo_db
+    db.clean_flights.insert_many(
+        [
+            clean_flight(1, 20),
+            clean_flight(2, -5, airline="DL"),
+            clean_flight(3, 30, day=2),
+            clean_flight(4, None, airline="DL", day=2),
+            clean_flight(5, 10),
+        ]
+    )
+
+    incremental_daily_summary(db, None, 2)
+    incremental_airline_performance(db, None, 2)
+    # A run that dies before advancing the watermark replays (2, 5]
+    for _ in range(2):
+        incremental_daily_summary(db, 2, 5)
+        incremental_airline_performance(db, 2, 5)
+
+    daily = {
+        doc["flight_date"].day: doc
+        for doc in db[mongo_settings.agg_daily_summary].find({}, {"_id": 0})
+    }
+    assert daily[1]["total_flights"] == 3
+    assert daily[1]["delayed_flights"] == 1
+    assert daily[2]["total_flights"] == 2
+    assert daily[2]["cancelled_flights"] == 1
+
+    airlines = {
+        doc["airline"]: doc["total_flights"]
+        for doc in db[mongo_settings.agg_airline_perf].find({}, {"_id": 0})
+    }
+    assert airlines == {"AA": 3, "DL": 2}
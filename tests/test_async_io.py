@@ -0,0 +1,95 @@
+# tests/test_async_io.py
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from flight_pipeline.pipeline import async_io
+from flight_pipeline.pipeline.clean import transform_rows
+
+
+class SlowCollection:
+    """Records inserts, each one yielding to the event loop a few times."""
+
+    def __init__(self):
+        self.docs = []
+        self.active = 0
+        self.peak = 0
+
+    async def insert_many(self, records, ordered=True):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        for _ in range(len(self.docs) % 3 + 1):
+            await asyncio.sleep(0)
+        self.docs.extend(records)
+        self.active -= 1
+        return SimpleNamespace(inserted_ids=[record["_id"] for record in records])
+
+
+class AsyncCursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def raw_flight(i):
+    return {
+        "_id": i,
+        "YEAR": 2015,
+        "MONTH": 1,
+        "DAY": 1 + i % 28,
+        "AIRLINE": "AA",
+        "FLIGHT_NUMBER": 100 + i,
+        "ORIGIN_AIRPORT": "ANC",
+        "DESTINATION_AIRPORT": "SEA",
+        "DEPARTURE_DELAY": float(i % 40),
+        "ARRIVAL_DELAY": float(i % 50 - 10),
+        "CANCELLED": 0,
+    }
+
+
+def test_clean_cursor_async_matches_sync_output(monkeypatch):
+    monkeypatch.setattr(async_io, "BATCH_SIZE", 7)
+    docs = [raw_flight(i) for i in range(100)]
+    clean = SlowCollection()
+    finished = []
+
+    processed, inserted, duplicates = asyncio.run(
+        async_io.clean_cursor_async(
+            AsyncCursor(docs),
+            clean,
+            transform_rows,
+            in_flight=3,
+            on_batch=lambda batch: finished.append(batch[-1]["_id"]),
+        )
+    )
+
+    assert (processed, inserted, duplicates) == (100, 100, 0)
+    # Writes overlapped, but never beyond the in-flight limit
+    assert 1 < clean.peak <= 3
+    key = lambda record: record["_id"]
+    assert sorted(clean.docs, key=key) == sorted(transform_rows(docs), key=key)
+    # Batches are reported in cursor order, whatever order they finished in
+    assert finished == [min(i + 6, 99) for i in range(0, 100, 7)]
+
+
+def test_async_writer_reraises_first_error():
+    async def fail():
+        raise ValueError("write failed")
+
+    async def run():
+        writer = async_io.AsyncWriter(in_flight=2)
+        await writer.submit(fail())
+        await writer.close()
+
+    with pytest.raises(ValueError, match="write failed"):
+        asyncio.run(run())
@@ -0,0 +1,129 @@
+# tests/test_batching.py
+
+import threading
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from flight_pipeline.pipeline.batching import (
+    BatchController,
+    payload_bytes,
+    replication_lag,
+    write_in_batches,
+)
+
+
+RECORD = {"airline": "AA", "flight_number": "98", "arrival_delay": 12}
+
+
+def controller(**options):
+    settings = {
+        "initial": 1_000,
+        "min_rows": 100,
+        "max_rows": 100_000,
+        "target_seconds": 1.0,
+        "max_bytes": 10**9,
+    }
+    settings.update(options)
+    return BatchController(**settings)
+
+
+def test_batch_size_moves_toward_target_latency():
+    batches = controller()
+
+    # 0.1s for 1,000 rows: 10,000 rows hit 1s, but growth is capped at 2x
+    batches.record(1_000, 0.1)
+    assert batches.size == 2_000
+
+    # 2s for 2,000 rows: 1,000 rows hit 1s
+    batches.record(2_000, 2.0)
+    assert batches.size < 2_000
+
+
+def test_batch_size_respects_payload_budget_and_bounds():
+    records = [RECORD] * 1_000
+    one_row = payload_bytes([RECORD])
+
+    batches = controller(max_bytes=one_row * 1_500)
+    for _ in range(5):
+        batches.record(len(records), 0.001, records)
+    assert batches.size == 1_500
+
+    slow = controller(min_rows=800)
+    slow.record(1_000, 100.0)
+    assert slow.size == 800
+
+
+def test_replication_lag_pauses_writes_until_caught_up():
+    lags = iter([30.0, 12.0, 2.0])
+    batches = controller(lag=lambda: next(lags), max_lag_seconds=10.0)
+
+    batches.record(1_000, 1.0)
+
+    assert batches.size == 250
+    assert next(lags, None) is None
+
+    unavailable = controller(lag=lambda: None, max_lag_seconds=10.0)
+    unavailable.record(1_000, 1.0)
+    assert unavailable.lag is None
+
+
+def test_write_in_batches_follows_resized_batches():
+    written = []
+    batches = controller(initial=100, target_seconds=10**9)
+
+    records = [dict(RECORD, _id=i) for i in range(1_000)]
+    write_in_batches(records, lambda batch: written.append(len(batch)), batches)
+
+    assert written == [100, 200, 400, 300]
+
+
+def test_lag_poll_does_not_block_other_writers():
+    polling = threading.Event()
+    release = threading.Event()
+
+    def slow_lag():
+        polling.set()
+        release.wait(5)
+        return 0.0
+
+    batches = controller(lag=slow_lag, max_lag_seconds=10.0)
+    poller = threading.Thread(target=batches.record, args=(1_000, 1.0))
+    poller.start()
+    assert polling.wait(5)
+
+    # A second writer records its batch while replSetGetStatus is outstanding
+    writer = threading.Thread(target=batches.record, args=(1_000, 1.0))
+    writer.start()
+    writer.join(2)
+    assert not writer.is_alive()
+
+    release.set()
+    poller.join(5)
+    assert not poller.is_alive()
+
+
+def test_replication_lag_ignores_delayed_and_hidden_members():
+    now = datetime(2015, 1, 1, 12)
+    replies = {
+        "replSetGetStatus": {
+            "members": [
+                {"name": "a:27017", "stateStr": "PRIMARY", "optimeDate": now},
+                {"name": "b:27017", "stateStr": "SECONDARY", "optimeDate": now - timedelta(seconds=3)},
+                {"name": "c:27017", "stateStr": "SECONDARY", "optimeDate": now - timedelta(hours=1)},
+                {"name": "d:27017", "stateStr": "SECONDARY", "optimeDate": now - timedelta(minutes=5)},
+            ]
+        },
+        "replSetGetConfig": {
+            "config": {
+                "members": [
+                    {"host": "a:27017"},
+                    {"host": "b:27017", "secondaryDelaySecs": 0},
+                    {"host": "c:27017", "secondaryDelaySecs": 3600, "hidden": True, "priority": 0},
+                    {"host": "d:27017", "hidden": True, "priority": 0},
+                ]
+            }
+        },
+    }
+    client = SimpleNamespace(admin=SimpleNamespace(command=replies.__getitem__))
+
+    assert replication_lag(client) == 3.0
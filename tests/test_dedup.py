@@ -0,0 +1,65 @@
+# tests/test_dedup.py
+
+from datetime import datetime
+
+from flight_pipeline import metrics
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.pipeline import clean
+from flight_pipeline.pipeline.clean import dedup_records
+from flight_pipeline.pipeline.state import CLEAN_STAGE, get_watermark
+
+
+def flight(_id, flight_number="98", arrival_delay=0):
+    return {
+        "flight_date": datetime(2015, 1, 1),
+        "airline": "AA",
+        "origin_airport": "ANC",
+        "destination_airport": "SEA",
+        "flight_number": flight_number,
+        "arrival_delay": arrival_delay,
+        "_id": _id,
+    }
+
+
+def test_dedup_records_keeps_first_of_each_key():
+    records = [flight(1), flight(2, "99"), flight(3, arrival_delay=12), flight(4, "99")]
+
+    unique = dedup_records(records)
+
+    assert [record["_id"] for record in unique] == [1, 2]
+    assert unique[0]["arrival_delay"] == 0
+
+
+def test_incremental_clean_is_capped_like_a_rebuild(monkeypatch, mongo_db):
+    mongo_db[mongo_settings.raw_flights].insert_many(
+        [
+            {
+                "_id": index,
+                "YEAR": 2015,
+                "MONTH": 1,
+                "DAY": 1,
+                "AIRLINE": "AA",
+                "FLIGHT_NUMBER": index,
+                "ORIGIN_AIRPORT": "ANC",
+                "DESTINATION_AIRPORT": "SEA",
+                "CANCELLED": 0,
+            }
+            for index in range(12)
+        ]
+    )
+    monkeypatch.setattr(pipeline_settings, "batch_sizing", "fixed")
+    monkeypatch.setattr(clean, "MAX_RECORDS", 5)
+    monkeypatch.setattr(clean, "get_database", lambda: mongo_db)
+    monkeypatch.setattr(metrics, "get_database", lambda: mongo_db)
+
+    clean.run_clean_pipeline(engine="row", io="sync", sample="head")
+    assert get_watermark(mongo_db, CLEAN_STAGE) == 4
+
+    # The raw flights the capped rebuild skipped are cleaned five at a time
+    clean.run_incremental_clean(engine="row")
+    assert get_watermark(mongo_db, CLEAN_STAGE) == 9
+    assert mongo_db[mongo_settings.clean_flights].count_documents({}) == 10
+
+    clean.run_incremental_clean(engine="row")
+    assert get_watermark(mongo_db, CLEAN_STAGE) == 11
+    assert mongo_db[mongo_settings.clean_flights].count_documents({}) == 12
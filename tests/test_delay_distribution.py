@@ -0,0 +1,47 @@
+# tests/test_delay_distribution.py
+
+import numpy as np
+import pandas as pd
+
+from flight_pipeline.pipeline.distribution import build_delay_distribution, weighted_quantile
+
+
+def test_weighted_quantile_matches_pandas():
+    rng = np.random.default_rng(7)
+    data = rng.integers(1, 300, size=1_000)
+    values, counts = np.unique(data, return_counts=True)
+    q = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+    expected = pd.Series(data).quantile(q).to_numpy()
+    assert np.allclose(weighted_quantile(values.astype(float), counts, q), expected)
+
+
+def test_delay_distribution_matches_capped_flights():
+    rng = np.random.default_rng(11)
+    flights = pd.DataFrame(
+        {
+            "airline": rng.choice(["WN", "DL", "AA"], size=3_000, p=[0.5, 0.3, 0.2]),
+            "arrival_delay": rng.exponential(35, size=3_000).astype(int) + 1,
+        }
+    )
+    histogram = [
+        {"_id": {"airline": airline, "arrival_delay": int(delay)}, "flights": int(n)}
+        for (airline, delay), n in flights.groupby(["airline", "arrival_delay"]).size().items()
+    ]
+
+    results = build_delay_distribution(histogram)
+    cap = flights["arrival_delay"].quantile(0.99)
+
+    assert [row["airline"] for row in results] == ["WN", "DL", "AA"]
+    for row in results:
+        delays = flights.loc[flights["airline"] == row["airline"], "arrival_delay"]
+        capped = delays.clip(upper=cap)
+
+        assert row["delayed_flights"] == len(delays)
+        assert np.isclose(row["cap"], cap)
+        assert np.isclose(row["median"], capped.median())
+        assert np.isclose(row["q1"], capped.quantile(0.25))
+        assert np.isclose(row["q3"], capped.quantile(0.75))
+        assert np.allclose(row["percentiles"], delays.quantile(np.arange(1, 100) / 100))
+        assert row["upper_fence"] <= row["q3"] + 1.5 * (row["q3"] - row["q1"])
+        assert all(o["arrival_delay"] > row["upper_fence"] for o in row["outliers"])
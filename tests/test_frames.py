@@ -0,0 +1,81 @@
+# tests/test_frames.py
+
+from datetime import datetime
+
+import bson
+import pandas as pd
+
+from flight_pipeline.db.frames import load_frame
+
+
+class RawBatchCollection:
+    """Serves documents the way find_raw_batches does: concatenated BSON."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find_raw_batches(self, filter, projection, sort=None, limit=0, batch_size=100):
+        docs = [{field: doc[field] for field in projection if field in doc} for doc in self.docs]
+        for start in range(0, len(docs), batch_size):
+            yield b"".join(bson.encode(doc) for doc in docs[start:start + batch_size])
+
+
+def test_load_frame_compact_dtypes():
+    docs = [
+        {
+            "airline": ["AA", "DL", "WN"][i % 3],
+            "arrival_delay": None if i % 10 == 0 else i - 20,
+            "distance": 100 + i,
+            "flight_date": datetime(2015, 1, 1 + i % 28),
+            "avg_arrival_delay": i / 3,
+        }
+        for i in range(50)
+    ]
+    fields = ["airline", "arrival_delay", "distance", "flight_date", "avg_arrival_delay"]
+
+    frame = load_frame(RawBatchCollection(docs), fields, batch_size=7)
+
+    assert list(frame.columns) == fields
+    assert isinstance(frame["airline"].dtype, pd.CategoricalDtype)
+    assert str(frame["arrival_delay"].dtype) == "Int8"
+    assert str(frame["distance"].dtype) == "int16"
+    assert frame["avg_arrival_delay"].dtype == "float64"
+
+    expected = pd.DataFrame(docs)
+    assert frame["airline"].astype(object).tolist() == expected["airline"].tolist()
+    assert frame["arrival_delay"].isna().sum() == 5
+    assert frame["flight_date"].tolist() == expected["flight_date"].tolist()
+
+
+def test_load_frame_null_only_batches():
+    docs = [{"airline": None}] * 4 + [{"airline": "AA"}] * 4
+
+    frame = load_frame(RawBatchCollection(docs), ["airline"], batch_size=4)
+
+    assert frame["airline"].isna().sum() == 4
+    assert frame["airline"].cat.categories.tolist() == ["AA"]
+
+
+def test_load_frame_keeps_mixed_batches_of_category_fields():
+    # A numeric airport code (as in the raw 2015 data) makes its batch mixed
+    docs = [{"origin_airport": "ANC"}, {"origin_airport": "SEA"}]
+    docs += [{"origin_airport": "ANC"}, {"origin_airport": 10397}]
+    docs += [{"origin_airport": None}, {"origin_airport": None}]
+
+    frame = load_frame(RawBatchCollection(docs), ["origin_airport"], batch_size=2)
+
+    assert frame["origin_airport"].tolist()[:4] == ["ANC", "SEA", "ANC", 10397]
+    assert frame["origin_airport"].isna().sum() == 2
+
+
+def test_load_frame_keeps_list_fields_one_per_row():
+    # Equal-length lists in a batch must not become a 2-D array
+    docs = [{"airline": "AA", "outliers": [i, i + 1]} for i in range(6)] + [
+        {"airline": "DL", "outliers": [1, 2, 3]},
+        {"airline": "DL", "outliers": []},
+    ]
+
+    frame = load_frame(RawBatchCollection(docs), ["airline", "outliers"], batch_size=3)
+
+    assert len(frame) == 8
+    assert frame["outliers"].tolist() == [doc["outliers"] for doc in docs]
@@ -0,0 +1,88 @@
+# tests/test_ingest.py
+
+import threading
+
+import pandas as pd
+import pytest
+
+from flight_pipeline import metrics
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.pipeline import fused, ingest
+from flight_pipeline.pipeline.ingest import WriterPool
+from flight_pipeline.pipeline.state import CLEAN_STAGE, get_watermark
+
+
+def write_flights(path, rows):
+    pd.DataFrame(
+        {
+            "YEAR": 2015,
+            "MONTH": 1,
+            "DAY": [1 + row % 28 for row in range(rows)],
+            "AIRLINE": "AA",
+            "FLIGHT_NUMBER": range(rows),
+            "ORIGIN_AIRPORT": "ANC",
+            "DESTINATION_AIRPORT": "SEA",
+            "CANCELLED": 0,
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("parser", ["pyarrow", "pandas"])
+def test_typed_chunks_follow_chunk_size(tmp_path, parser):
+    if parser == "pyarrow":
+        pytest.importorskip("pyarrow")
+    path = write_flights(tmp_path / "flights.csv", 5_000)
+
+    chunks = list(ingest.read_typed_csv_chunks(path, 500, ["FLIGHT_NUMBER"], parser))
+
+    # Rows here are shorter than flights.csv rows, so pyarrow chunks run long
+    assert sum(len(chunk) for chunk in chunks) == 5_000
+    assert len(chunks) > 1
+
+
+def test_parallel_ingest_stops_its_writers_when_parsing_fails(monkeypatch, mongo_db, tmp_path):
+    def failing_chunks(*args):
+        yield pd.DataFrame({"FLIGHT_NUMBER": [1, 2]})
+        raise ValueError("bad row")
+
+    monkeypatch.setattr(pipeline_settings, "batch_sizing", "fixed")
+    monkeypatch.setattr(ingest, "read_typed_csv_chunks", failing_chunks)
+    threads = threading.active_count()
+
+    with pytest.raises(ValueError, match="bad row"):
+        ingest.ingest_large_csv_parallel(tmp_path / "flights.csv", mongo_db.raw_flights, writers=3)
+
+    assert threading.active_count() == threads
+    assert mongo_db.raw_flights.count_documents({}) == 2
+
+
+class FailingCollection:
+    def insert_many(self, records, ordered=True):
+        raise ValueError("archive write failed")
+
+
+def test_fused_watermark_waits_for_the_raw_archive(monkeypatch, mongo_db, tmp_path):
+    write_flights(tmp_path / "flights.csv", 20)
+    pd.DataFrame({"IATA_CODE": ["AA"], "AIRLINE": ["American Airlines Inc."]}).to_csv(
+        tmp_path / "airlines.csv", index=False
+    )
+    pd.DataFrame(
+        {"IATA_CODE": ["ANC"], "AIRPORT": ["Anchorage"], "CITY": ["Anchorage"], "STATE": ["AK"]}
+    ).to_csv(tmp_path / "airports.csv", index=False)
+    monkeypatch.setattr(fused, "get_database", lambda: mongo_db)
+    monkeypatch.setattr(fused, "RAW_DATA_DIR", tmp_path)
+    monkeypatch.setattr(metrics, "get_database", lambda: mongo_db)
+
+    fused.run_fused_ingestion(archive="async")
+    last_id = mongo_db[mongo_settings.raw_flights].find_one(sort=[("_id", -1)])["_id"]
+    assert get_watermark(mongo_db, CLEAN_STAGE) == last_id
+
+    # The clean records are written, but their raw rows never reach the archive
+    monkeypatch.setattr(
+        fused, "WriterPool", lambda collection, *args: WriterPool(FailingCollection(), *args)
+    )
+    with pytest.raises(ValueError, match="archive write failed"):
+        fused.run_fused_ingestion(archive="async")
+    assert mongo_db[mongo_settings.clean_flights].count_documents({}) == 20
+    assert get_watermark(mongo_db, CLEAN_STAGE) is None
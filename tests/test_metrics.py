@@ -0,0 +1,27 @@
+# tests/test_metrics.py
+
+from types import SimpleNamespace
+
+from flight_pipeline.metrics import CommandLatencyMonitor
+
+
+def test_command_latency_histogram():
+    monitor = CommandLatencyMonitor()
+    for request_id, millis in enumerate([0.4, 3, 3, 40, 12_000]):
+        monitor.started(
+            SimpleNamespace(
+                command={"insert": "clean_flights"},
+                command_name="insert",
+                request_id=request_id,
+            )
+        )
+        monitor.succeeded(
+            SimpleNamespace(request_id=request_id, duration_micros=int(millis * 1000))
+        )
+
+    [stats] = monitor.snapshot()
+
+    assert stats["command"] == "insert clean_flights"
+    assert stats["count"] == 5
+    assert stats["max_ms"] == 12_000
+    assert stats["histogram"] == {"le_1ms": 1, "le_5ms": 2, "le_50ms": 1, "gt_10000ms": 1}
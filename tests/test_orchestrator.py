@@ -0,0 +1,121 @@
+# tests/test_orchestrator.py
+
+import mongomock
+import pandas as pd
+
+from flight_pipeline import main, metrics
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.pipeline.state import (
+    AGGREGATE_STAGE,
+    CLEAN_STAGE,
+    INGEST_STAGE,
+    get_watermark,
+    list_checkpoints,
+    save_checkpoint,
+)
+
+
+def write_sources(directory, rows=30):
+    directory.mkdir(exist_ok=True)
+    pd.DataFrame(
+        {"IATA_CODE": ["AA", "DL"], "AIRLINE": ["American Airlines Inc.", "Delta Air Lines Inc."]}
+    ).to_csv(directory / "airlines.csv", index=False)
+    pd.DataFrame(
+        {
+            "IATA_CODE": ["ANC", "SEA"],
+            "AIRPORT": ["Anchorage", "Seattle"],
+            "CITY": ["Anchorage", "Seattle"],
+            "STATE": ["AK", "WA"],
+        }
+    ).to_csv(directory / "airports.csv", index=False)
+    pd.DataFrame(
+        {
+            "YEAR": 2015,
+            "MONTH": 1,
+            "DAY": [1 + row % 28 for row in range(rows)],
+            "DAY_OF_WEEK": 4,
+            "AIRLINE": ["AA", "DL"] * (rows // 2),
+            "FLIGHT_NUMBER": range(rows),
+            "ORIGIN_AIRPORT": "ANC",
+            "DESTINATION_AIRPORT": "SEA",
+            "DEPARTURE_DELAY": [row - 5 for row in range(rows)],
+            "ARRIVAL_DELAY": [row - 10 for row in range(rows)],
+            "DIVERTED": 0,
+            "CANCELLED": 0,
+        }
+    ).to_csv(directory / "flights.csv", index=False)
+    return directory
+
+
+def pipeline_db(monkeypatch, tmp_path):
+    db = mongomock.MongoClient()[mongo_settings.database]
+    monkeypatch.setattr(main, "get_database", lambda: db)
+    monkeypatch.setattr(metrics, "get_database", lambda: db)
+    monkeypatch.setattr(pipeline_settings, "metrics_dir", str(tmp_path / "runs"))
+    return db
+
+
+def clean_ids(db):
+    return sorted(doc["_id"] for doc in db[mongo_settings.clean_flights].find({}, {"_id": 1}))
+
+
+def test_rerun_resumes_from_checkpoints(monkeypatch, tmp_path):
+    db = pipeline_db(monkeypatch, tmp_path)
+    data_dir = write_sources(tmp_path / "raw")
+
+    main.run_pipeline([INGEST_STAGE, CLEAN_STAGE], data_dir=data_dir)
+    first = clean_ids(db)
+    watermark = get_watermark(db, CLEAN_STAGE)
+    assert len(first) == 30
+    assert watermark == first[-1]
+    # Clean waits for the small CSVs before it loads the dimension cache
+    flight = db[mongo_settings.clean_flights].find_one({"airline": "DL"})
+    assert flight["airline_name"] == "Delta Air Lines Inc."
+    assert flight["origin_city"] == "Anchorage"
+
+    main.run_pipeline([INGEST_STAGE, CLEAN_STAGE], data_dir=data_dir)
+
+    assert clean_ids(db) == first
+    assert get_watermark(db, CLEAN_STAGE) == watermark
+    assert len(list_checkpoints(db, CLEAN_STAGE)) == 1
+
+
+def test_fresh_restarts_under_a_new_epoch(monkeypatch, tmp_path):
+    db = pipeline_db(monkeypatch, tmp_path)
+    data_dir = write_sources(tmp_path / "raw")
+
+    main.run_pipeline([INGEST_STAGE, CLEAN_STAGE], data_dir=data_dir)
+    first = clean_ids(db)
+
+    main.run_pipeline([INGEST_STAGE, CLEAN_STAGE], fresh=True, data_dir=data_dir)
+    second = clean_ids(db)
+
+    assert len(second) == len(first)
+    assert set(second).isdisjoint(first)
+    assert db[mongo_settings.raw_flights].count_documents({}) == 30
+
+
+def test_stage_subsets_keep_other_stages_data(monkeypatch, tmp_path):
+    db = pipeline_db(monkeypatch, tmp_path)
+    data_dir = write_sources(tmp_path / "raw")
+
+    main.run_pipeline([INGEST_STAGE, CLEAN_STAGE], data_dir=data_dir)
+    first = clean_ids(db)
+    save_checkpoint(db, AGGREGATE_STAGE, main.GOLD, status="done")
+
+    # A changed (or missing) source is never looked at without ingest
+    (data_dir / "flights.csv").unlink()
+    main.prepare_run(db, data_dir, [CLEAN_STAGE, AGGREGATE_STAGE], fresh=False)
+    assert clean_ids(db) == first
+    assert db[mongo_settings.raw_flights].count_documents({}) == 30
+    assert list_checkpoints(db, AGGREGATE_STAGE)
+
+    # Re-ingesting a changed source leaves the clean layer until clean runs
+    write_sources(data_dir, rows=40)
+    main.run_pipeline([INGEST_STAGE], data_dir=data_dir)
+    assert clean_ids(db) == first
+    assert db[mongo_settings.raw_flights].count_documents({}) == 40
+
+    main.run_pipeline([CLEAN_STAGE], data_dir=data_dir)
+    assert len(clean_ids(db)) == 40
+    assert set(clean_ids(db)).isdisjoint(first)
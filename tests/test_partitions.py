@@ -0,0 +1,76 @@
+# tests/test_partitions.py
+
+from datetime import datetime
+
+import mongomock
+
+from flight_pipeline.config.settings import mongo_settings
+from flight_pipeline.db.partitions import (
+    month_collection_name,
+    month_partitions,
+    prune_partitions,
+)
+from flight_pipeline.pipeline.state import (
+    CLEAN_STAGE,
+    LAYOUT_STAGE,
+    advance_watermark,
+    reset_watermark,
+    update_state,
+)
+
+
+def test_month_collection_name():
+    assert month_collection_name(2015, 3) == "clean_flights_2015_03"
+
+
+def layout_db():
+    """Clean flights in Jan-Mar 2015, partitioned at clean watermark 3."""
+    db = mongomock.MongoClient().db
+    db[mongo_settings.clean_flights].insert_many(
+        [{"_id": month, "flight_date": datetime(2015, month, 10)} for month in (1, 2, 3)]
+    )
+    advance_watermark(db, CLEAN_STAGE, 3)
+    update_state(db, LAYOUT_STAGE, clean_watermark=3, months=[[2015, 1], [2015, 2], [2015, 3]])
+    return db
+
+
+def names(collections):
+    return [collection.name for collection in collections]
+
+
+def test_prune_partitions_uses_current_months_in_range():
+    db = layout_db()
+
+    assert names(prune_partitions(db, datetime(2015, 1, 20), datetime(2015, 3, 1))) == [
+        "clean_flights_2015_01",
+        "clean_flights_2015_02",
+    ]
+    assert names(prune_partitions(db, start=datetime(2015, 3, 1))) == ["clean_flights_2015_03"]
+    assert len(prune_partitions(db)) == 3
+    assert prune_partitions(db, datetime(2016, 1, 1)) == []
+
+    assert [(month, collection.name) for _, month, _, collection in month_partitions(db)] == [
+        (1, "clean_flights_2015_01"),
+        (2, "clean_flights_2015_02"),
+        (3, "clean_flights_2015_03"),
+    ]
+
+
+def test_prune_partitions_falls_back_to_clean_flights_when_stale():
+    db = layout_db()
+    # Clean moved on after the partitions were built
+    advance_watermark(db, CLEAN_STAGE, 4)
+
+    assert names(prune_partitions(db, datetime(2015, 2, 1), datetime(2015, 3, 1))) == [
+        "clean_flights"
+    ]
+    assert [collection.name for *_, collection in month_partitions(db)] == ["clean_flights"] * 3
+
+    # No layout at all
+    db.pipeline_state.delete_one({"_id": LAYOUT_STAGE})
+    assert names(prune_partitions(db)) == ["clean_flights"]
+
+    # A layout recorded without a clean watermark never matches a missing one
+    update_state(db, LAYOUT_STAGE, clean_watermark=None, months=[[2015, 1]])
+    reset_watermark(db, CLEAN_STAGE)
+    assert names(prune_partitions(db)) == ["clean_flights"]
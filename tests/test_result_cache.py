@@ -0,0 +1,49 @@
+# tests/test_result_cache.py
+
+import pandas as pd
+
+from flight_pipeline.result_cache import ResultCache, result_bytes
+
+
+def frame(rows):
+    return pd.DataFrame({"airline": ["AA"] * rows, "flights": range(rows)})
+
+
+def test_hits_until_gold_version_changes():
+    cache = ResultCache(max_bytes=10**6)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return frame(3)
+
+    cache.get(1, "daily", compute)
+    cache.get(1, "daily", compute)
+    assert len(calls) == 1
+
+    # A newer version drops every entry; an older one is never cached
+    cache.get(2, "daily", compute)
+    cache.get(1, "daily", compute)
+    cache.get(2, "daily", compute)
+    assert len(calls) == 3
+
+    stats = cache.stats()
+    assert (stats["version"], stats["hits"], stats["misses"]) == (2, 2, 3)
+
+
+def test_evicts_least_recently_used_within_budget():
+    size = result_bytes(frame(100))
+    cache = ResultCache(max_bytes=size * 2)
+
+    cache.get(1, "a", lambda: frame(100))
+    cache.get(1, "b", lambda: frame(100))
+    cache.get(1, "a", lambda: frame(100))
+    cache.get(1, "c", lambda: frame(100))
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.bytes <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+
+    # Too big to keep: returned, not stored
+    assert len(cache.get(1, "big", lambda: frame(1_000))) == 1_000
+    assert "big" not in cache.entries
@@ -0,0 +1,86 @@
+# tests/test_rolling.py
+
+import random
+from datetime import datetime, timedelta
+
+from flight_pipeline.pipeline.rolling import (
+    PARTIAL_FIELDS,
+    WINDOWS,
+    refresh_span,
+    rolling_rows,
+)
+
+
+START = datetime(2015, 1, 1)
+
+
+def make_days(seed, count=90):
+    rng = random.Random(seed)
+    days = []
+    for offset in range(count):
+        # Gaps: the key has no flights on some days
+        if rng.random() < 0.2:
+            continue
+        flights = rng.randint(1, 50)
+        delay_count = rng.randint(0, flights)
+        days.append(
+            {
+                "flight_date": START + timedelta(days=offset),
+                "flights": flights,
+                "delayed": rng.randint(0, flights),
+                "delay_sum": rng.randint(-200, 2_000) if delay_count else 0,
+                "delay_count": delay_count,
+            }
+        )
+    return days
+
+
+def brute_force(days, day, window):
+    inside = [
+        other for other in days
+        if day - timedelta(days=window) < other["flight_date"] <= day
+    ]
+    return {field: sum(other[field] for other in inside) for field in PARTIAL_FIELDS}
+
+
+def test_sliding_windows_match_a_full_regroup():
+    days = make_days(seed=7)
+    rows = rolling_rows("airline", "AA", list(reversed(days)), "arrival_delay")
+
+    assert [row["flight_date"] for row in rows] == [day["flight_date"] for day in days]
+    for row in rows:
+        for window in WINDOWS:
+            sums = brute_force(days, row["flight_date"], window)
+            assert row[f"flights_{window}d"] == sums["flights"]
+            assert row[f"delayed_{window}d"] == sums["delayed"]
+            assert row[f"pct_delayed_{window}d"] == round(sums["delayed"] / sums["flights"] * 100, 2)
+            if sums["delay_count"]:
+                expected = round(sums["delay_sum"] / sums["delay_count"], 2)
+                assert row[f"avg_arrival_delay_{window}d"] == expected
+            else:
+                assert row[f"avg_arrival_delay_{window}d"] is None
+
+
+def test_refresh_span_recomputes_only_affected_rows():
+    days = make_days(seed=11)
+    before = {
+        row["flight_date"]: row
+        for row in rolling_rows("origin_airport", "ANC", days, "departure_delay")
+    }
+
+    # A late batch adds flights to two days
+    touched = [days[20]["flight_date"], days[25]["flight_date"]]
+    changed = [
+        dict(day, flights=day["flights"] + 5, delayed=day["delayed"] + 5)
+        if day["flight_date"] in touched else day
+        for day in days
+    ]
+
+    load_from, start, end = refresh_span(touched)
+    loaded = [day for day in changed if load_from <= day["flight_date"] <= end]
+    refreshed = rolling_rows("origin_airport", "ANC", loaded, "departure_delay", start, end)
+
+    merged = {**before, **{row["flight_date"]: row for row in refreshed}}
+    full = rolling_rows("origin_airport", "ANC", changed, "departure_delay")
+    assert sorted(merged.values(), key=lambda row: row["flight_date"]) == full
+    assert end == touched[-1] + timedelta(days=max(WINDOWS) - 1)
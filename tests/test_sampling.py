@@ -0,0 +1,161 @@
+# tests/test_sampling.py
+
+import mongomock
+import pandas as pd
+
+from flight_pipeline.pipeline import fused
+from flight_pipeline.pipeline.sampling import (
+    ALL_STRATA,
+    FlightSampler,
+    build_sample_estimates,
+    check_unsampled_append,
+    flight_key,
+    get_sample_design,
+    is_probability_sample,
+    record_sample_design,
+    scale_count,
+    scale_ratio,
+)
+
+
+def raw_flight(flight_number, airline="AA", month=1):
+    return {
+        "YEAR": 2015,
+        "MONTH": month,
+        "DAY": 1 + flight_number % 28,
+        "AIRLINE": airline,
+        "FLIGHT_NUMBER": flight_number,
+        "ORIGIN_AIRPORT": "ANC",
+        "DESTINATION_AIRPORT": "SEA",
+    }
+
+
+FLIGHTS = [
+    raw_flight(number, airline, month)
+    for number in range(500)
+    for airline in ("AA", "DL")
+    for month in (1, 2)
+]
+
+
+def test_flight_key_ignores_ingest_types():
+    typed = raw_flight(98)
+    untyped = dict(typed, YEAR=2015.0, MONTH=1.0, DAY=15.0, FLIGHT_NUMBER=98.0, AIRLINE=" aa")
+
+    assert flight_key(typed) == flight_key(untyped)
+    assert flight_key(typed)[0] == ("2015-01", "AA")
+
+
+def test_hash_sample_is_deterministic_and_stratified():
+    sampler = FlightSampler(0.1, {"DL": 0.5, "2015-02/DL": 1.0})
+    kept = list(sampler.filter(FLIGHTS))
+
+    assert kept == list(FlightSampler(0.1, {"DL": 0.5, "2015-02/DL": 1.0}).filter(FLIGHTS))
+
+    design = sampler.design("stratified")
+    strata = {stratum["stratum"]: stratum for stratum in design["strata"]}
+    assert [strata[key]["rate"] for key in sorted(strata)] == [0.1, 0.5, 0.1, 1.0]
+    assert strata["2015-02/DL"]["sampled"] == strata["2015-02/DL"]["population"] == 500
+    assert 20 < strata["2015-01/AA"]["sampled"] < 80
+    assert design["population"] == len(FLIGHTS)
+    assert design["sampled"] == len(kept)
+
+
+def test_scaled_estimates_carry_error_bounds():
+    design = {"mode": "hash", "rate": 0.25, "strata": []}
+
+    estimate, half_width = scale_count({ALL_STRATA: 100}, design)
+    assert estimate == 400
+    assert round(half_width, 2) == round(1.96 * (100 * 0.75 / 0.0625) ** 0.5, 2)
+
+    stratified = {
+        "strata": [
+            {"stratum": "2015-01/AA", "rate": 0.5},
+            {"stratum": "2015-01/DL", "rate": 0.1},
+        ]
+    }
+    # AA: 50 of 100 sampled delayed (of ~200); DL: 10 of 100 (of ~1,000)
+    ratio, half_width = scale_ratio(
+        {"2015-01/AA": 50, "2015-01/DL": 10},
+        {"2015-01/AA": 100, "2015-01/DL": 100},
+        stratified,
+    )
+    assert round(ratio, 4) == round((100 + 100) / (200 + 1000), 4)
+    assert 0 < half_width < 0.1
+
+
+def test_estimates_weight_each_stratum_by_its_rate():
+    design = {
+        "mode": "stratified",
+        "rate": 0.1,
+        "strata": [
+            {"stratum": "2015-01/AA", "rate": 0.5},
+            {"stratum": "2015-01/DL", "rate": 0.1},
+        ],
+    }
+    rows = [
+        {"_id": {"key": "ANC", "year": 2015, "month": 1, "airline": "AA"}, "flights": 100, "delayed": 50},
+        {"_id": {"key": "ANC", "year": 2015, "month": 1, "airline": "DL"}, "flights": 100, "delayed": 10},
+        {"_id": {"key": "SEA", "year": 2015, "month": 1, "airline": "DL"}, "flights": 10, "delayed": 0},
+    ]
+
+    anc, sea = build_sample_estimates(rows, "airport", "origin_airport", design)
+
+    assert anc["origin_airport"] == "ANC"
+    assert (anc["flights"], anc["delayed_flights"]) == (1_200, 200)
+    assert anc["pct_delayed"] == round(200 / 1_200 * 100, 2)
+    assert anc["flights_half_width"] > 0
+    assert (sea["flights"], sea["pct_delayed"]) == (100, 0)
+
+
+def test_sampled_clean_layer_is_not_appended_to():
+    db = mongomock.MongoClient().db
+    check_unsampled_append(db, "an incremental clean")
+
+    sampler = FlightSampler(0.25)
+    list(sampler.filter(FLIGHTS))
+    record_sample_design(db, "hash", sampler, sampler.design("hash")["sampled"])
+
+    try:
+        check_unsampled_append(db, "an incremental clean")
+    except ValueError as exc:
+        assert "'hash' sample" in str(exc)
+    else:
+        raise AssertionError("appending to a sampled clean layer was allowed")
+
+
+def test_rebuilds_replace_a_stale_sample_design(monkeypatch, tmp_path, mongo_db):
+    sampler = FlightSampler(0.25)
+    list(sampler.filter(FLIGHTS))
+    record_sample_design(mongo_db, "hash", sampler, sampler.design("hash")["sampled"])
+
+    pd.DataFrame({"IATA_CODE": ["AA"], "AIRLINE": ["American Airlines Inc."]}).to_csv(
+        tmp_path / "airlines.csv", index=False
+    )
+    pd.DataFrame(
+        {"IATA_CODE": ["ANC"], "AIRPORT": ["Anchorage"], "CITY": ["Anchorage"], "STATE": ["AK"]}
+    ).to_csv(tmp_path / "airports.csv", index=False)
+    pd.DataFrame(
+        [
+            dict(
+                raw_flight(number),
+                DAY_OF_WEEK=4,
+                DEPARTURE_DELAY=5,
+                ARRIVAL_DELAY=20,
+                DIVERTED=0,
+                CANCELLED=0,
+            )
+            for number in range(20)
+        ]
+    ).to_csv(tmp_path / "flights.csv", index=False)
+    monkeypatch.setattr(fused, "get_database", lambda: mongo_db)
+    monkeypatch.setattr(fused, "RAW_DATA_DIR", tmp_path)
+
+    # A full fused load is not a sample of anything: its counts are not scaled
+    fused.run_fused_ingestion(archive="none")
+
+    design = get_sample_design(mongo_db)
+    assert design["mode"] == "head"
+    assert design["sampled"] == 20
+    assert not is_probability_sample(design)
+    check_unsampled_append(mongo_db, "an incremental clean")
@@ -0,0 +1,120 @@
+# tests/test_sketches.py
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from flight_pipeline.config.settings import mongo_settings
+from flight_pipeline.pipeline.aggregate import aggregate_daily_sketches, incremental_daily_sketches
+from flight_pipeline.pipeline.sketches import (
+    HyperLogLog,
+    TDigest,
+    TopK,
+    build_partition_sketches,
+    hash_strings,
+    merge_sketch_docs,
+)
+
+
+def test_merged_digest_matches_exact_quantiles():
+    rng = np.random.default_rng(7)
+    delays = np.round(rng.lognormal(2, 1, 50_000) - 15)
+
+    merged = TDigest.merge(TDigest.from_values(part) for part in np.array_split(delays, 365))
+    restored = TDigest.from_bson(merged.to_bson())
+
+    assert restored.count == len(delays)
+    exact = np.quantile(delays, [0.5, 0.9, 0.99])
+    assert np.allclose(restored.quantile([0.5, 0.9, 0.99]), exact, rtol=0.05, atol=1)
+
+
+def test_hyperloglog_union_count():
+    first = HyperLogLog.from_hashes(hash_strings(np.array([f"AA{i}" for i in range(3000)])))
+    second = HyperLogLog.from_hashes(hash_strings(np.array([f"AA{i}" for i in range(2000, 6000)])))
+
+    merged = HyperLogLog.from_bson(HyperLogLog.merge([first, second]).to_bson())
+
+    assert abs(merged.count() - 6000) < 6000 * 0.05
+
+
+def test_top_k_merge_bounds_counts():
+    routes = np.array(["SEA-ANC"] * 50 + ["LAX-SFO"] * 30 + [f"R{i}" for i in range(40)])
+    parts = [TopK.from_items(part, capacity=5) for part in np.array_split(routes, 4)]
+
+    top = TopK.from_bson(TopK.merge(parts, capacity=5).to_bson()).top(2)
+
+    assert [row["item"] for row in top] == ["SEA-ANC", "LAX-SFO"]
+    for row, exact in zip(top, (50, 30)):
+        assert row["count"] - row["max_error"] <= exact <= row["count"]
+
+
+def test_sketches_merged_across_batches_stay_within_bounds():
+    rng = np.random.default_rng(11)
+    size = 20_000
+    delays = np.round(rng.lognormal(2, 1, size) - 15)
+    frame = pd.DataFrame(
+        {
+            "flight_date": datetime(2015, 1, 1),
+            "airline": "AA",
+            "flight_number": rng.integers(0, 5_000, size).astype(str),
+            "origin_airport": rng.choice(["SEA", "ANC", "LAX", "SFO"], size, p=[0.4, 0.3, 0.2, 0.1]),
+            "destination_airport": rng.choice(["PDX", "DEN"] + [f"X{i}" for i in range(60)], size),
+            "arrival_delay": delays,
+            "is_delayed": delays > 15,
+        }
+    )
+
+    (full,) = build_partition_sketches(frame)
+    halves = [build_partition_sketches(part)[0] for part in (frame[: size // 2], frame[size // 2 :])]
+    merged = merge_sketch_docs(halves)
+
+    # Counts and HyperLogLog registers merge exactly
+    assert merged["flights"] == full["flights"] == size
+    assert merged["flights_hll"] == full["flights_hll"]
+    assert merged["routes_hll"] == full["routes_hll"]
+
+    # Quantiles and heavy hitters are approximate: bounded, not identical
+    exact = np.quantile(delays, [0.5, 0.9, 0.99])
+    for digest in (full, merged):
+        quantiles = TDigest.from_bson(digest["delay_digest"]).quantile([0.5, 0.9, 0.99])
+        assert np.allclose(quantiles, exact, rtol=0.05, atol=1)
+
+    routes = frame["origin_airport"] + "-" + frame["destination_airport"]
+    delayed_counts = routes[frame["is_delayed"]].value_counts()
+    for row in TopK.from_bson(merged["delayed_routes"]).top(3):
+        assert row["count"] - row["max_error"] <= delayed_counts.get(row["item"], 0) <= row["count"]
+
+
+def test_full_rebuild_between_incremental_runs_counts_each_flight_once(mongo_db):
+    mongo_db.clean_flights.insert_many(
+        [
+            {
+                "_id": index,
+                "flight_date": datetime(2015, 1 + index % 2, 1 + index % 28),
+                "airline": ["AA", "DL", "WN"][index % 3],
+                "flight_number": str(index),
+                "origin_airport": "ANC",
+                "destination_airport": "SEA",
+                "arrival_delay": index % 50 - 10,
+                "is_delayed": index % 50 > 25,
+            }
+            for index in range(120)
+        ]
+    )
+    sketches = mongo_db[mongo_settings.agg_daily_sketches]
+
+    incremental_daily_sketches(mongo_db, None, 59)
+    # The orchestrator rebuilds gold in full without moving the aggregate watermark
+    aggregate_daily_sketches(mongo_db)
+    assert sum(doc["flights"] for doc in sketches.find()) == 120
+
+    incremental_daily_sketches(mongo_db, 59, 119)
+    incremental_daily_sketches(mongo_db, 59, 119)
+    assert sum(doc["flights"] for doc in sketches.find()) == 120
+    assert "as_of" not in sketches.find_one()
+
+    # Sketches merged before their partials existed are re-sketched once in full
+    mongo_db[mongo_settings.agg_daily_sketch_partials].drop()
+    incremental_daily_sketches(mongo_db, 59, 119)
+    assert sum(doc["flights"] for doc in sketches.find()) == 120
@@ -0,0 +1,115 @@
+# tests/test_snapshot.py
+
+from datetime import datetime
+
+import pandas as pd
+
+from flight_pipeline.config.settings import mongo_settings, pipeline_settings
+from flight_pipeline.pipeline import aggregate
+from flight_pipeline.pipeline.snapshot import (
+    clean_snapshot_is_current,
+    export_clean_snapshot,
+    export_gold_snapshot,
+    has_snapshot,
+    load_clean_month,
+    load_snapshot,
+    read_manifest,
+)
+from flight_pipeline.pipeline.state import CLEAN_STAGE, advance_watermark, reset_watermark
+
+
+def snapshot_db(db):
+    db[mongo_settings.clean_flights].insert_many(
+        [
+            {
+                "_id": index,
+                "flight_date": datetime(2015, 1 + index % 2, 1 + index % 28),
+                "airline": ["AA", "DL", "WN"][index % 3],
+                "origin_airport": "ANC",
+                "destination_airport": ["SEA", "PDX"][index % 2],
+                "flight_number": str(index),
+                "departure_delay": index % 40 - 5,
+                "arrival_delay": None if index % 10 == 0 else index % 50 - 10,
+                "is_delayed": index % 50 > 10,
+                "is_cancelled": index % 10 == 0,
+                "airline_name": "American Airlines Inc." if index % 3 == 0 else None,
+            }
+            for index in range(120)
+        ]
+    )
+    advance_watermark(db, CLEAN_STAGE, 119)
+    return db
+
+
+def partition_sketches(db):
+    return {
+        (sketch["flight_date"], sketch["airline"]): sketch
+        for frame in aggregate.sketch_frames(db)
+        for sketch in aggregate.build_partition_sketches(frame)
+    }
+
+
+def test_clean_snapshot_round_trip(mongo_db, tmp_path):
+    db = snapshot_db(mongo_db)
+
+    assert export_clean_snapshot(db, tmp_path, clean_watermark=119) == 120
+    assert read_manifest(mongo_settings.clean_flights, tmp_path) == {
+        "rows": 120,
+        "clean_watermark": 119,
+    }
+
+    frame = load_snapshot(mongo_settings.clean_flights, root=tmp_path)
+    expected = pd.DataFrame(list(db[mongo_settings.clean_flights].find().sort("flight_date", 1)))
+    frame = frame.sort_values(["flight_date", "flight_number"]).reset_index(drop=True)
+    expected = expected.sort_values(["flight_date", "flight_number"]).reset_index(drop=True)
+    assert frame["flight_number"].tolist() == expected["flight_number"].tolist()
+    assert frame["arrival_delay"].isna().sum() == 12
+    assert frame["airline_name"].notna().sum() == 40
+    assert frame["origin_city"].isna().all()
+
+    february = load_clean_month(2015, 2, ["flight_date", "airline"], root=tmp_path)
+    assert len(february) == 60
+    assert (february["flight_date"].dt.month == 2).all()
+
+
+def test_gold_snapshot_is_skipped_after_a_newer_aggregation(mongo_db, tmp_path):
+    db = snapshot_db(mongo_db)
+    gold = db[mongo_settings.agg_airline_perf]
+    gold.insert_many(
+        [
+            {"airline": "AA", "total_flights": 40, "pct_delayed": 20.5},
+            {"airline": "DL", "total_flights": 80, "pct_delayed": 31.25},
+        ]
+    )
+
+    assert export_gold_snapshot(gold, tmp_path, gold_version=3) == 2
+
+    assert has_snapshot(gold.name, tmp_path)
+    assert has_snapshot(gold.name, tmp_path, gold_version=3)
+    assert not has_snapshot(gold.name, tmp_path, gold_version=4)
+    assert not has_snapshot("agg_missing", tmp_path)
+
+    frame = load_snapshot(gold.name, ["airline", "pct_delayed"], root=tmp_path)
+    assert frame["airline"].astype(object).tolist() == ["AA", "DL"]
+    assert frame["pct_delayed"].tolist() == [20.5, 31.25]
+
+
+def test_sketches_from_a_current_snapshot_match_mongo(monkeypatch, mongo_db, tmp_path):
+    db = snapshot_db(mongo_db)
+    monkeypatch.setattr(pipeline_settings, "snapshot_dir", str(tmp_path))
+
+    export_clean_snapshot(db, tmp_path, clean_watermark=119)
+    assert clean_snapshot_is_current(db)
+
+    from_mongo = partition_sketches(db)
+    monkeypatch.setattr(pipeline_settings, "aggregate_snapshot", True)
+    assert partition_sketches(db) == from_mongo
+
+    # Clean moved on: the snapshot is stale and MongoDB is read instead
+    advance_watermark(db, CLEAN_STAGE, 120)
+    assert not clean_snapshot_is_current(db)
+
+    # Without a watermark the clean layer's progress is unknown
+    export_clean_snapshot(db, tmp_path, clean_watermark=None)
+    reset_watermark(db, CLEAN_STAGE)
+    assert not clean_snapshot_is_current(db)
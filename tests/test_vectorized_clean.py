@@ -0,0 +1,79 @@
+# tests/test_vectorized_clean.py
+
+import math
+
+from flight_pipeline.pipeline.clean import transform_rows, transform_vectorized
+from flight_pipeline.pipeline.dimensions import DimensionCache
+
+
+RAW_SAMPLE = [
+    {"YEAR": 2015, "MONTH": 1, "DAY": 1, "AIRLINE": "AA", "FLIGHT_NUMBER": 98,
+     "ORIGIN_AIRPORT": "ANC", "DESTINATION_AIRPORT": "SEA",
+     "DEPARTURE_DELAY": -11.0, "ARRIVAL_DELAY": -22.0, "CANCELLED": 0},
+    {"YEAR": 2015, "MONTH": 2, "DAY": 28, "AIRLINE": " dl ", "FLIGHT_NUMBER": 2336,
+     "ORIGIN_AIRPORT": "lax", "DESTINATION_AIRPORT": "PBI",
+     "DEPARTURE_DELAY": 42.0, "ARRIVAL_DELAY": 16.0, "CANCELLED": 0},
+    # Diverted flight: no arrival delay on a flown flight is rejected
+    {"YEAR": 2015, "MONTH": 3, "DAY": 4, "AIRLINE": "UA", "FLIGHT_NUMBER": 840,
+     "ORIGIN_AIRPORT": "SFO", "DESTINATION_AIRPORT": "CLT",
+     "DEPARTURE_DELAY": 5.0, "ARRIVAL_DELAY": math.nan, "CANCELLED": 0},
+    # Cancelled flights keep their raw delays
+    {"YEAR": 2015, "MONTH": 4, "DAY": 5, "AIRLINE": "AS", "FLIGHT_NUMBER": 258,
+     "ORIGIN_AIRPORT": "LAX", "DESTINATION_AIRPORT": "MIA",
+     "DEPARTURE_DELAY": math.nan, "ARRIVAL_DELAY": math.nan, "CANCELLED": 1},
+    {"YEAR": 2015, "MONTH": 4, "DAY": 5, "AIRLINE": "AS", "FLIGHT_NUMBER": 259,
+     "ORIGIN_AIRPORT": "LAX", "DESTINATION_AIRPORT": "MIA", "CANCELLED": 1},
+    {"YEAR": 2015, "MONTH": 5, "DAY": 6, "AIRLINE": "B6", "FLIGHT_NUMBER": 1,
+     "ORIGIN_AIRPORT": 10397, "DESTINATION_AIRPORT": "JFK",
+     "DEPARTURE_DELAY": 30.0, "CANCELLED": 1},
+    # Missing delays on a flown flight default to zero
+    {"YEAR": 2015, "MONTH": 6, "DAY": 7, "AIRLINE": "WN",
+     "ORIGIN_AIRPORT": "MDW", "DESTINATION_AIRPORT": "DAL", "CANCELLED": 0},
+    # Invalid calendar date and missing required field
+    {"YEAR": 2015, "MONTH": 2, "DAY": 30, "AIRLINE": "NK", "FLIGHT_NUMBER": 7,
+     "ORIGIN_AIRPORT": "FLL", "DESTINATION_AIRPORT": "LAS",
+     "DEPARTURE_DELAY": 0.0, "ARRIVAL_DELAY": 0.0, "CANCELLED": 0},
+    {"YEAR": 2015, "MONTH": 7, "DAY": 8, "FLIGHT_NUMBER": 7,
+     "ORIGIN_AIRPORT": "FLL", "DESTINATION_AIRPORT": "LAS",
+     "DEPARTURE_DELAY": 0.0, "ARRIVAL_DELAY": 0.0, "CANCELLED": 0},
+]
+
+
+def test_vectorized_matches_row_engine():
+    assert transform_vectorized(RAW_SAMPLE) == transform_rows(RAW_SAMPLE)
+
+
+def test_vectorized_preserves_types_and_field_order():
+    rows = transform_rows(RAW_SAMPLE)
+    vectorized = transform_vectorized(RAW_SAMPLE)
+
+    assert len(vectorized) == 5
+    for expected, actual in zip(rows, vectorized):
+        assert list(actual) == list(expected)
+        assert [type(v) for v in actual.values()] == [type(v) for v in expected.values()]
+
+
+def test_vectorized_falls_back_on_unexpected_types():
+    docs = [dict(RAW_SAMPLE[0], CANCELLED="0"), RAW_SAMPLE[1]]
+    assert transform_vectorized(docs) == transform_rows(docs)
+
+
+DIMENSIONS = DimensionCache.from_records(
+    [{"IATA_CODE": "AA", "AIRLINE": "American Airlines Inc."},
+     {"IATA_CODE": "DL", "AIRLINE": "Delta Air Lines Inc."}],
+    [{"IATA_CODE": code, "AIRPORT": f"{code} Airport", "CITY": city, "STATE": state,
+      "LATITUDE": 0.0, "LONGITUDE": 0.0}
+     for code, city, state in [("ANC", "Anchorage", "AK"), ("SEA", "Seattle", "WA"),
+                               ("LAX", "Los Angeles", "CA"), ("MIA", "Miami", "FL")]],
+)
+
+
+def test_enrichment_matches_row_engine():
+    rows = transform_rows(RAW_SAMPLE, DIMENSIONS)
+
+    assert transform_vectorized(RAW_SAMPLE, DIMENSIONS) == rows
+    assert rows[0]["airline_name"] == "American Airlines Inc."
+    assert (rows[0]["origin_city"], rows[0]["destination_state"]) == ("Anchorage", "WA")
+    assert rows[0]["unknown_airport"] is False
+    # PBI is missing from the airport table
+    assert (rows[1]["destination_city"], rows[1]["unknown_airport"]) == (None, True)